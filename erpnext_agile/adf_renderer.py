@@ -0,0 +1,252 @@
+# erpnext_agile/adf_renderer.py
+"""
+Atlassian Document Format -> HTML
+Renders Jira ADF bodies (descriptions, comments, worklog notes) with an
+explicit stack instead of recursion, so deeply nested documents cannot hit
+the recursion limit. Each node type has one renderer in a dispatch table
+and output is collected in a list and joined once. Rendered bodies are
+memoized by content hash because imports see the same text repeatedly
+(templates, bot comments).
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from html import escape
+
+CACHE_SIZE = 2048
+
+PANEL_ICONS = {
+	"info": "\u2139\ufe0f",
+	"note": "📝",
+	"warning": "⚠️",
+	"error": "⛔",
+	"success": "✅",
+	"tip": "💡",
+}
+
+
+def _attr(value):
+	return escape(str(value or ""), quote=True)
+
+
+# ============================================
+# MARKS
+# ============================================
+
+MARK_TAGS = {"strong": "strong", "em": "em", "code": "code", "underline": "u", "strike": "s"}
+
+
+def _apply_marks(text, marks):
+	"""Wrap escaped text in its marks, innermost first"""
+	for mark in marks or []:
+		t = mark.get("type", "")
+		attrs = mark.get("attrs") or {}
+		if t in MARK_TAGS:
+			text = f"<{MARK_TAGS[t]}>{text}</{MARK_TAGS[t]}>"
+		elif t == "subsup":
+			tag = "sup" if attrs.get("type") == "sup" else "sub"
+			text = f"<{tag}>{text}</{tag}>"
+		elif t == "textColor":
+			text = f'<span style="color: {_attr(attrs.get("color"))}">{text}</span>'
+		elif t == "link":
+			text = f'<a href="{_attr(attrs.get("href"))}">{text}</a>'
+	return text
+
+
+# ============================================
+# NODE RENDERERS
+# ============================================
+# Each renderer returns (opening html, closing html); the node's children
+# are rendered between the two.
+
+
+def _wrap(tag):
+	return lambda node: (f"<{tag}>", f"</{tag}>")
+
+
+def _text(node):
+	return _apply_marks(escape(node.get("text", ""), quote=False), node.get("marks")), ""
+
+
+def _heading(node):
+	level = min(max(int((node.get("attrs") or {}).get("level") or 2), 1), 6)
+	return f"<h{level}>", f"</h{level}>"
+
+
+def _ordered_list(node):
+	start = (node.get("attrs") or {}).get("order")
+	return (f'<ol start="{int(start)}">' if start and int(start) != 1 else "<ol>"), "</ol>"
+
+
+def _code_block(node):
+	language = (node.get("attrs") or {}).get("language")
+	cls = f' class="language-{_attr(language)}"' if language else ""
+	return f"<pre><code{cls}>", "</code></pre>"
+
+
+def _table_cell(tag):
+	def render(node):
+		attrs = node.get("attrs") or {}
+		span = "".join(
+			f' {name}="{int(attrs[key])}"'
+			for key, name in (("colspan", "colspan"), ("rowspan", "rowspan"))
+			if attrs.get(key) and int(attrs[key]) > 1
+		)
+		return f"<{tag}{span}>", f"</{tag}>"
+
+	return render
+
+
+def _panel(node):
+	panel_type = (node.get("attrs") or {}).get("panelType") or "info"
+	icon = PANEL_ICONS.get(panel_type, "")
+	return (
+		f'<div class="jira-panel jira-panel-{_attr(panel_type)}"><span class="jira-panel-icon">{icon}</span>',
+		"</div>",
+	)
+
+
+def _expand(node):
+	title = (node.get("attrs") or {}).get("title") or ""
+	return f"<details><summary>{escape(title, quote=False)}</summary>", "</details>"
+
+
+def _media(node):
+	attrs = node.get("attrs") or {}
+	label = attrs.get("alt") or attrs.get("id") or "attachment"
+	if attrs.get("type") == "external" and attrs.get("url"):
+		return f'<img src="{_attr(attrs["url"])}" alt="{_attr(label)}">', ""
+	return f'<span class="jira-media">[{escape(str(label), quote=False)}]</span>', ""
+
+
+def _status(node):
+	attrs = node.get("attrs") or {}
+	color = attrs.get("color") or "neutral"
+	return (
+		f'<span class="jira-status jira-status-{_attr(color)}">{escape(attrs.get("text") or "", quote=False)}</span>',
+		"",
+	)
+
+
+def _emoji(node):
+	attrs = node.get("attrs") or {}
+	return escape(attrs.get("text") or attrs.get("shortName") or "", quote=False), ""
+
+
+def _mention(node):
+	attrs = node.get("attrs") or {}
+	return f"@{escape(str(attrs.get('text') or attrs.get('id') or ''), quote=False)}", ""
+
+
+def _inline_card(node):
+	url = _attr((node.get("attrs") or {}).get("url"))
+	return f'<a href="{url}">{url}</a>', ""
+
+
+def _date(node):
+	timestamp = (node.get("attrs") or {}).get("timestamp")
+	try:
+		return datetime.fromtimestamp(int(timestamp) / 1000, tz=timezone.utc).strftime("%Y-%m-%d"), ""
+	except (TypeError, ValueError):
+		return "", ""
+
+
+def _task_item(node):
+	checked = " checked" if (node.get("attrs") or {}).get("state") == "DONE" else ""
+	return f'<li><input type="checkbox" disabled{checked}> ', "</li>"
+
+
+NODE_RENDERERS = {
+	"doc": lambda node: ("", ""),
+	"paragraph": _wrap("p"),
+	"text": _text,
+	"heading": _heading,
+	"bulletList": _wrap("ul"),
+	"orderedList": _ordered_list,
+	"listItem": _wrap("li"),
+	"taskList": lambda node: ('<ul class="jira-task-list">', "</ul>"),
+	"taskItem": _task_item,
+	"decisionList": _wrap("ul"),
+	"decisionItem": _wrap("li"),
+	"codeBlock": _code_block,
+	"blockquote": _wrap("blockquote"),
+	"hardBreak": lambda node: ("<br>", ""),
+	"rule": lambda node: ("<hr>", ""),
+	"table": lambda node: ("<table><tbody>", "</tbody></table>"),
+	"tableRow": _wrap("tr"),
+	"tableHeader": _table_cell("th"),
+	"tableCell": _table_cell("td"),
+	"panel": _panel,
+	"expand": _expand,
+	"nestedExpand": _expand,
+	"mediaSingle": lambda node: ('<div class="jira-media-single">', "</div>"),
+	"mediaGroup": lambda node: ('<div class="jira-media-group">', "</div>"),
+	"media": _media,
+	"mediaInline": _media,
+	"status": _status,
+	"emoji": _emoji,
+	"mention": _mention,
+	"inlineCard": _inline_card,
+	"blockCard": _inline_card,
+	"date": _date,
+}
+
+
+# ============================================
+# RENDERING
+# ============================================
+
+
+def _render(doc):
+	out = []
+	stack = [doc]
+	while stack:
+		item = stack.pop()
+		# Closing html is pushed as a 1-tuple, so stray strings in `content` are never emitted raw
+		if isinstance(item, tuple):
+			out.append(item[0])
+			continue
+		if not isinstance(item, dict):
+			continue
+
+		renderer = NODE_RENDERERS.get(item.get("type"))
+		children = item.get("content") or []
+		if renderer:
+			opening, closing = renderer(item)
+		else:
+			# Unknown nodes keep their children, or their text when they have none
+			opening = "" if children else escape(item.get("text") or "", quote=False)
+			closing = ""
+
+		out.append(opening)
+		if closing:
+			stack.append((closing,))
+		stack.extend(reversed(children))
+	return "".join(out)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def render_adf(doc):
+	"""HTML for an ADF document, memoized by the document's content hash"""
+	try:
+		key = hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode()).hexdigest()
+	except (RecursionError, ValueError):
+		return _render(doc)
+
+	with _cache_lock:
+		if key in _cache:
+			_cache.move_to_end(key)
+			return _cache[key]
+
+	html = _render(doc)
+	with _cache_lock:
+		_cache[key] = html
+		if len(_cache) > CACHE_SIZE:
+			_cache.popitem(last=False)
+	return html
@@ -31,6 +31,10 @@ def setup_agile():
     
     # Create default workflow scheme
     create_default_workflow_scheme()
+
+    # Index issue keys used by Jira imports and key lookups
+    from erpnext_agile.patches.add_task_issue_key_index import ensure_issue_key_index
+    ensure_issue_key_index()
     
     print("ERPNext Agile setup completed successfully!")
 
@@ -1,6 +1,5 @@
 import frappe
 from frappe import _
-from frappe.share import add_docshare
 
 def task_validate(doc, method):
     """Extend Task validation for agile features"""
@@ -129,27 +128,111 @@ def add_reviewer_to_watchers(doc):
 def share_doc_with_watchers(doc):
     """
     Share the document with all users listed in the watchers table.
+    Reconciles against existing DocShare rows so only the difference is written.
     """
-    if not getattr(doc, "watchers", None):
+    desired = frozenset(watcher.user for watcher in doc.get("watchers", []) if watcher.user)
+
+    # Nested saves (e.g. sprint history) re-run on_update; reconcile once per watcher set
+    if doc.flags.shared_watchers == desired:
         return
+    doc.flags.shared_watchers = desired
+
+    try:
+        reconcile_watcher_shares(doc, desired)
+    except Exception as e:
+        frappe.log_error(
+            title=f"Failed to share {doc.doctype} {doc.name} with watchers",
+            message=str(e)
+        )
+
+def reconcile_watcher_shares(doc, desired):
+    """
+    Diff the desired watcher set against existing DocShare rows in one query,
+    bulk insert the missing shares and delete shares of watchers removed in this save.
+    """
+    removed = set()
+    old_doc = doc.get_doc_before_save()
+    if old_doc:
+        removed = {w.user for w in old_doc.get("watchers", []) if w.user} - desired
+
+    candidates = desired | removed
+    if not candidates:
+        return
+
+    existing = frappe.get_all(
+        "DocShare",
+        filters={
+            "share_doctype": doc.doctype,
+            "share_name": doc.name,
+            "user": ["in", list(candidates)]
+        },
+        fields=["name", "user", "read", "write"]
+    )
+
+    shared = {row.user: row for row in existing}
+
+    # Existing shares that lack read/write get upgraded in place
+    to_upgrade = [
+        row.name for user, row in shared.items()
+        if user in desired and not (row.read and row.write)
+    ]
+    to_insert = sorted(desired - set(shared))
 
-    for watcher in doc.watchers:
-        if watcher.user:
-            try:
-                add_docshare(
-                    doctype=doc.doctype,
-                    name=doc.name,
-                    user=watcher.user,
-                    read=1,      
-                    write=1,     
-                    share=0,     
-                    notify=0     
-                )
-            except Exception as e:
-                frappe.log_error(
-                    title=f"Failed to share {doc.doctype} with {watcher.user}", 
-                    message=str(e)
-                )
+    # Only revoke shares this reconciler owns: users that are still assigned,
+    # reviewing, owning or reporting the Task keep theirs
+    keep = other_share_holders(doc)
+    to_delete = {user: row.name for user, row in shared.items() if user in removed and user not in keep}
+
+    if to_insert:
+        insert_watcher_shares(doc.doctype, [(doc.name, user) for user in to_insert])
+
+    if to_upgrade:
+        frappe.db.sql("""
+            UPDATE `tabDocShare`
+            SET `read` = 1, `write` = 1
+            WHERE name IN %(names)s
+        """, {"names": to_upgrade})
+
+    if to_delete:
+        frappe.db.delete("DocShare", {"name": ["in", list(to_delete.values())]})
+
+    upgraded = {user for user, row in shared.items() if row.name in to_upgrade}
+    for user in upgraded | set(to_delete):
+        frappe.clear_cache(user=user)
+
+def other_share_holders(doc):
+    """Users with a reason other than watching to keep their share of the document"""
+    holders = set(frappe.parse_json(doc.get("_assign") or "[]") or [])
+    for fieldname in ("custom_reviewer", "custom_original_owner", "custom_bug_raised_by"):
+        if doc.get(fieldname):
+            holders.add(doc.get(fieldname))
+    return holders
+
+def insert_watcher_shares(doctype, shares):
+    """Bulk insert read/write DocShare rows for (docname, user) pairs"""
+    if not shares:
+        return
+
+    now = frappe.utils.now()
+    session_user = frappe.session.user
+    fields = [
+        "name", "creation", "modified", "owner", "modified_by",
+        "user", "share_doctype", "share_name",
+        "read", "write", "share", "submit", "everyone", "notify_by_email"
+    ]
+    values = [
+        (
+            frappe.generate_hash(length=10), now, now, session_user, session_user,
+            user, doctype, name,
+            1, 1, 0, 0, 0, 0
+        )
+        for name, user in shares
+    ]
+    frappe.db.bulk_insert("DocShare", fields=fields, values=values)
+
+    # bulk_insert skips DocShare's hooks; drop the cached permissions they would have cleared
+    for user in {user for _name, user in shares}:
+        frappe.clear_cache(user=user)
 
 def add_bug_reporter_to_watchers(doc):
     """
@@ -186,6 +269,11 @@ def task_after_insert(doc, method):
 def task_on_trash(doc, method):
     """Actions on task deletion"""
     if doc.is_agile:
-        # Clean up related records
+        from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+            discard_issue_activities,
+        )
+
+        # Clean up related records, including rows still waiting in the activity buffer
+        discard_issue_activities(doc.name)
         frappe.db.delete('Agile Issue Activity', {'issue': doc.name})
         frappe.db.delete('Agile Work Timer', {'task': doc.name})
\ No newline at end of file
@@ -0,0 +1,524 @@
+# erpnext_agile/bulk_task_import.py
+"""
+Bulk Task import for migrations
+Validates payloads in Python and writes Tasks, their child tables and
+side records (assignments, activity, visibility, shares) with multi-row
+INSERTs instead of one ORM insert per issue. Hooks and notifications do
+not run; root Tasks are given a tree interval on insert and the caller
+renumbers the touched trees once at the end of the import. Work logs are
+appended to existing Tasks the same way, with time_spent recomputed in SQL.
+"""
+
+import json
+from collections import Counter, defaultdict
+
+import frappe
+from frappe.model.naming import parse_naming_series
+from frappe.utils import cint, getdate
+
+from erpnext_agile.agile_doctype_controllers import insert_watcher_shares
+from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+	bulk_log_issue_activities,
+)
+from erpnext_agile.overrides.task import (
+	format_seconds,
+	map_agile_priority_to_task_priority,
+	map_agile_status_to_task_status,
+)
+from erpnext_agile.permission_context import clear_permission_context
+from erpnext_agile.task_tree import allocate_root_intervals
+from erpnext_agile.task_visibility import get_task_audience, insert_visibility_rows
+
+INSERT_CHUNK_SIZE = 1000
+
+
+# ============================================
+# NAMING
+# ============================================
+
+
+def reserve_names(doctype, count):
+	"""
+	Reserve a contiguous block of naming-series names with a single
+	`tabSeries` update instead of one increment per document.
+	"""
+	if count <= 0:
+		return []
+
+	meta = frappe.get_meta(doctype)
+	series = meta.autoname or ""
+	if series.startswith("naming_series:"):
+		df = meta.get_field("naming_series")
+		series = (df.default or (df.options or "").split("\n")[0]) if df else ""
+
+	if not series or series in ("hash", "autoincrement") or ":" in series:
+		return [frappe.generate_hash(length=10) for _ in range(count)]
+
+	parts = [p for p in series.split(".") if p]
+	hashes = [p for p in parts if set(p) == {"#"}]
+	digits = len(hashes[0]) if hashes else 5
+	prefix = parse_naming_series([p for p in parts if set(p) != {"#"}])
+
+	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", prefix)
+	if current and current[0][0] is not None:
+		start = cint(current[0][0])
+		frappe.db.sql("UPDATE `tabSeries` SET `current` = %s WHERE `name` = %s", (start + count, prefix))
+	else:
+		start = 0
+		frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count))
+
+	return [f"{prefix}{str(start + i).zfill(digits)}" for i in range(1, count + 1)]
+
+
+# ============================================
+# VALIDATION
+# ============================================
+
+
+class ImportContext:
+	"""Per-import lookups shared by every payload of a batch"""
+
+	def __init__(self):
+		self._projects = {}
+		self._default_status = {}
+
+	def get_project(self, project):
+		if project not in self._projects:
+			self._projects[project] = (
+				frappe.get_cached_doc("Project", project)
+				if project and frappe.db.exists("Project", project)
+				else None
+			)
+		return self._projects[project]
+
+	def get_default_status(self, project_doc):
+		if project_doc.name not in self._default_status:
+			from erpnext_agile.agile_issue_manager import AgileIssueManager
+
+			self._default_status[project_doc.name] = AgileIssueManager().get_default_status(project_doc)
+		return self._default_status[project_doc.name]
+
+
+def validate_task_doc(doc, ctx):
+	"""Python equivalent of the Task validate hooks; returns an error message or None"""
+	if not doc.subject:
+		return "Subject is mandatory"
+
+	if not doc.is_agile:
+		return None
+
+	project_doc = ctx.get_project(doc.project)
+	if not project_doc:
+		return "Project is mandatory for agile issues"
+	if not project_doc.enable_agile:
+		return f"Project {doc.project} is not agile-enabled"
+	if not doc.issue_key:
+		return "Issue key is required for bulk import"
+
+	allowed_types = [row.issue_type for row in project_doc.get("issue_types_allowed") or []]
+	if doc.issue_type and allowed_types and doc.issue_type not in allowed_types:
+		return f"Issue Type '{doc.issue_type}' is not allowed in project '{doc.project}'"
+
+	return None
+
+
+def depends_on_itself(doc):
+	"""Self-dependency check of Task.validate; needs the name reserved for the doc"""
+	return any(d.task in (doc.name, doc.issue_key) for d in doc.get("depends_on") or [] if d.task)
+
+
+def find_missing_links(docs):
+	"""Check every Link value of the batch (parents and children) with one query per target doctype"""
+	wanted = defaultdict(set)
+	for doc in docs:
+		for d in [doc, *doc.get_all_children()]:
+			for df in d.meta.get_link_fields():
+				value = d.get(df.fieldname)
+				if value:
+					wanted[df.options].add(value)
+
+	found = {
+		doctype: set(frappe.get_all(doctype, filters={"name": ["in", list(values)]}, pluck="name"))
+		for doctype, values in wanted.items()
+	}
+
+	missing = {}
+	for doc in docs:
+		for d in [doc, *doc.get_all_children()]:
+			for df in d.meta.get_link_fields():
+				value = d.get(df.fieldname)
+				if value and value not in found[df.options]:
+					missing.setdefault(id(doc), []).append(f"{df.options} {value}")
+	return missing
+
+
+def apply_derived_fields(doc, ctx):
+	"""Mirror the field syncing done by AgileTask.validate and task_validate"""
+	if doc.is_agile and not doc.issue_status:
+		doc.issue_status = ctx.get_default_status(ctx.get_project(doc.project))
+
+	doc.parent_task = doc.parent_issue or None
+	doc.old_parent = doc.parent_task
+
+	if doc.issue_status:
+		doc.status = map_agile_status_to_task_status(doc.issue_status) or doc.status
+	if doc.issue_type in ["Story", "Epic"]:
+		doc.is_group = 1
+		if ctx.get_project(doc.project).get("issue_types_allowed"):
+			doc.story_points = 0
+	if doc.issue_priority:
+		doc.priority = map_agile_priority_to_task_priority(doc.issue_priority)
+
+	if doc.original_estimate:
+		doc.custom_original_estimated_time = format_seconds(doc.original_estimate)
+	if doc.time_spent:
+		doc.custom_total_time_spent = format_seconds(doc.time_spent)
+	if doc.remaining_estimate:
+		doc.custom_remaining_estimated_time = format_seconds(doc.remaining_estimate)
+
+	depends_on_tasks = ""
+	for d in doc.get("depends_on") or []:
+		if d.task and d.task not in depends_on_tasks:
+			depends_on_tasks += d.task + ","
+	doc.depends_on_tasks = depends_on_tasks
+
+	assignees = sorted({d.user for d in doc.get("assigned_to_users") or [] if d.user})
+	doc._assign = json.dumps(assignees) if assignees else None
+
+
+# ============================================
+# BULK INSERT
+# ============================================
+
+
+def bulk_insert_tasks(payloads, chunk_size=INSERT_CHUNK_SIZE):
+	"""
+	Insert Task payloads (dicts as accepted by frappe.get_doc) in bulk.
+
+	Returns:
+	    (inserted, rejected): issue_key -> Task name for written rows, and
+	    (payload, reason) pairs that failed validation and were not written
+	"""
+	if not payloads:
+		return {}, []
+
+	ctx = ImportContext()
+	now = frappe.utils.now()
+	session_user = frappe.session.user
+
+	keys = [p.get("issue_key") for p in payloads if p.get("issue_key")]
+	taken = (
+		set(frappe.get_all("Task", filters={"issue_key": ["in", keys]}, pluck="issue_key")) if keys else set()
+	)
+
+	docs, rejected = [], []
+	for payload in payloads:
+		doc = frappe.new_doc("Task")
+		doc.update({k: v for k, v in payload.items() if k != "doctype"})
+
+		error = validate_task_doc(doc, ctx)
+		if not error and doc.issue_key in taken:
+			error = f"Duplicate issue key {doc.issue_key}"
+		if error:
+			rejected.append((payload, error))
+			continue
+
+		taken.add(doc.issue_key)
+		docs.append((payload, doc))
+
+	missing = find_missing_links([doc for _payload, doc in docs])
+	if missing:
+		rejected.extend(
+			(payload, "Missing links: " + ", ".join(missing[id(doc)]))
+			for payload, doc in docs
+			if id(doc) in missing
+		)
+		docs = [(payload, doc) for payload, doc in docs if id(doc) not in missing]
+
+	if not docs:
+		return {}, rejected
+
+	valid = []
+	for (payload, doc), name in zip(docs, reserve_names("Task", len(docs)), strict=True):
+		doc.name = name
+		if depends_on_itself(doc):
+			rejected.append((payload, "Task cannot depend on itself"))
+			continue
+
+		apply_derived_fields(doc, ctx)
+		# Document.insert would sanitize HTML (e.g. the Text Editor description) in _validate
+		for d in [doc, *doc.get_all_children()]:
+			d._sanitize_content()
+		valid.append(doc)
+
+	docs = valid
+	if not docs:
+		return {}, rejected
+
+	# Root Tasks get their tree interval now; children are placed by the scoped rebuild.
+	# Counted after apply_derived_fields, which derives parent_task from parent_issue.
+	intervals = iter(allocate_root_intervals(sum(1 for doc in docs if not doc.parent_task)))
+
+	rows = defaultdict(list)
+	for doc in docs:
+		doc.creation = doc.modified = now
+		doc.owner = doc.modified_by = session_user
+		doc.lft, doc.rgt = (0, 0) if doc.parent_task else next(intervals)
+		rows["Task"].append(doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+		for d in doc.get_all_children():
+			d.name = frappe.generate_hash(length=10)
+			d.parent, d.parenttype = doc.name, "Task"
+			d.creation = d.modified = now
+			d.owner = d.modified_by = session_user
+			rows[d.doctype].append(d.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+	for doctype, dicts in rows.items():
+		fields = list(dicts[0].keys())
+		frappe.db.bulk_insert(
+			doctype,
+			fields=fields,
+			values=[tuple(row.get(f) for f in fields) for row in dicts],
+			chunk_size=chunk_size,
+		)
+
+	insert_side_records(docs)
+
+	return {doc.issue_key: doc.name for doc in docs}, rejected
+
+
+def insert_side_records(docs):
+	"""Write what the Task hooks would have created: ToDos, activity, visibility and shares"""
+	now = frappe.utils.now()
+	session_user = frappe.session.user
+
+	assignees = {doc.name: json.loads(doc._assign) for doc in docs if doc._assign}
+	full_names = (
+		dict(
+			frappe.get_all(
+				"User",
+				filters={"name": ["in", list({u for users in assignees.values() for u in users})]},
+				fields=["name", "full_name"],
+				as_list=True,
+			)
+		)
+		if assignees
+		else {}
+	)
+
+	todos, activities, visibility, shares = [], [], [], []
+	for doc in docs:
+		if doc.is_agile:
+			activities.append({"issue": doc.name, "action": "created this issue"})
+
+		users = assignees.get(doc.name)
+		if users:
+			todos.extend(
+				(
+					frappe.generate_hash(length=10),
+					now,
+					now,
+					session_user,
+					session_user,
+					"Open",
+					"Medium",
+					user,
+					doc.subject,
+					"Task",
+					doc.name,
+					session_user,
+				)
+				for user in users
+			)
+			if doc.is_agile:
+				activities.append(
+					{
+						"issue": doc.name,
+						"action": f"assigned to {', '.join(full_names.get(u) or u for u in users)}",
+						"data": {"assignees": users},
+					}
+				)
+
+		visibility.extend(
+			(user, doc.name, doc.project, is_assigned) for user, is_assigned in get_task_audience(doc).items()
+		)
+
+		watchers = {w.user for w in doc.get("watchers") or [] if w.user}
+		watchers.update(
+			filter(None, (doc.custom_reviewer, doc.custom_bug_raised_by, doc.custom_original_owner))
+		)
+		shares.extend((doc.name, user) for user in sorted(watchers))
+
+	if todos:
+		frappe.db.bulk_insert(
+			"ToDo",
+			fields=[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"status",
+				"priority",
+				"allocated_to",
+				"description",
+				"reference_type",
+				"reference_name",
+				"assigned_by",
+			],
+			values=todos,
+			chunk_size=INSERT_CHUNK_SIZE,
+		)
+		# bulk_insert skips the ToDo hooks that drop memoized assignments
+		clear_permission_context({u for users in assignees.values() for u in users})
+
+	bulk_log_issue_activities(activities)
+	insert_visibility_rows(visibility)
+	insert_watcher_shares("Task", shares)
+
+	for sprint in {doc.current_sprint for doc in docs if doc.current_sprint}:
+		try:
+			frappe.get_doc("Agile Sprint", sprint).calculate_metrics()
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), f"Sprint metrics failed after bulk import: {sprint}")
+
+
+# ============================================
+# WORK LOGS
+# ============================================
+
+WORK_LOG_FIELDS = [
+	"user",
+	"time_spent_seconds",
+	"time_spent_display",
+	"work_date",
+	"description",
+	"logged_at",
+	"jira_worklog_id",
+]
+
+
+def bulk_insert_work_logs(rows_by_task, chunk_size=INSERT_CHUNK_SIZE):
+	"""
+	Append Agile Issue Work Log rows (Task name -> list of row dicts) with
+	multi-row INSERTs and recompute time_spent of the touched agile Tasks with
+	one grouped UPDATE. Rows whose Jira worklog id is already logged on the
+	Task are skipped; rows without an id (and legacy rows stored without one)
+	are matched on user, date and duration instead. The work log hooks do not run.
+
+	Returns:
+	    set of projects whose Project User time metrics need a refresh
+	"""
+	task_names = [name for name, rows in rows_by_task.items() if rows]
+	if not task_names:
+		return set()
+
+	logged_ids = defaultdict(set)
+	logged = defaultdict(Counter)
+	last_idx = defaultdict(int)
+	for i in range(0, len(task_names), chunk_size):
+		for parent, user, work_date, seconds, worklog_id, idx in frappe.db.sql(
+			"""
+            SELECT parent, user, work_date, time_spent_seconds, jira_worklog_id, idx
+            FROM `tabAgile Issue Work Log`
+            WHERE parenttype = 'Task' AND parentfield = 'work_logs' AND parent IN %s
+        """,
+			[task_names[i : i + chunk_size]],
+		):
+			if worklog_id:
+				logged_ids[parent].add(worklog_id)
+			else:
+				logged[parent][(user, str(work_date), cint(seconds))] += 1
+			last_idx[parent] = max(last_idx[parent], cint(idx))
+
+	now = frappe.utils.now()
+	session_user = frappe.session.user
+	values, touched = [], set()
+	for task_name in task_names:
+		for row in rows_by_task[task_name]:
+			signature = (
+				row.get("user"),
+				str(getdate(row.get("work_date"))),
+				cint(row.get("time_spent_seconds")),
+			)
+			worklog_id = row.get("jira_worklog_id")
+			if worklog_id:
+				# Two identical worklogs are still two entries in Jira
+				if worklog_id in logged_ids[task_name]:
+					continue
+				logged_ids[task_name].add(worklog_id)
+				# Legacy rows were stored without an id: each one matches a single worklog
+				if logged[task_name][signature]:
+					logged[task_name][signature] -= 1
+					continue
+			elif logged[task_name][signature]:
+				continue
+			else:
+				logged[task_name][signature] += 1
+			last_idx[task_name] += 1
+			touched.add(task_name)
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					now,
+					now,
+					session_user,
+					session_user,
+					task_name,
+					"Task",
+					"work_logs",
+					last_idx[task_name],
+					*(row.get(f) for f in WORK_LOG_FIELDS),
+				)
+			)
+
+	if not values:
+		return set()
+
+	frappe.db.bulk_insert(
+		"Agile Issue Work Log",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"idx",
+			*WORK_LOG_FIELDS,
+		],
+		values=values,
+		chunk_size=chunk_size,
+	)
+
+	touched = list(touched)
+	projects = set()
+	for i in range(0, len(touched), chunk_size):
+		chunk = touched[i : i + chunk_size]
+		# Same rule as update_project_user_time_on_work_log: only agile Tasks with a project
+		frappe.db.sql(
+			"""
+            UPDATE `tabTask` t
+            INNER JOIN (
+                SELECT parent, SUM(time_spent_seconds) AS total
+                FROM `tabAgile Issue Work Log`
+                WHERE parenttype = 'Task' AND parentfield = 'work_logs' AND parent IN %(names)s
+                GROUP BY parent
+            ) wl ON wl.parent = t.name
+            SET t.time_spent = wl.total
+            WHERE t.is_agile = 1 AND IFNULL(t.project, '') != ''
+        """,
+			{"names": chunk},
+		)
+		projects.update(
+			frappe.get_all(
+				"Task",
+				filters={"name": ["in", chunk], "is_agile": 1, "project": ["is", "set"]},
+				distinct=True,
+				pluck="project",
+			)
+		)
+
+	return projects
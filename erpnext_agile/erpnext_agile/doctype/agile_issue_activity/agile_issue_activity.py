@@ -12,28 +12,147 @@ class AgileIssueActivity(Document):
             self.user = frappe.session.user
 
 
+ACTIVITY_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by",
+    "issue", "activity_type", "user", "timestamp", "data", "comment"
+]
+
+
 def log_issue_activity(issue, action, data=None, comment=None):
     """
     Helper function to log activity for an agile issue.
+    Rows are buffered for the current request and written with a single
+    multi-row INSERT right before the transaction commits. Task saves write
+    their own rows at the end of the save (see flush_issue_activities).
     
     Args:
         issue: Task document name
         action: Activity description (e.g., "created this issue", "set status to In Progress")
         data: Optional dict of additional data to store as JSON
         comment: Optional comment text
+
+    Returns:
+        The buffered row as a frappe._dict, not an Agile Issue Activity
+        document; it has no name until the buffer is flushed
     """
-    activity_doc = frappe.get_doc({
-        "doctype": "Agile Issue Activity",
+    activity = build_activity_row(issue, action, data=data, comment=comment)
+    get_activity_buffer().append(activity)
+    return activity
+
+
+def build_activity_row(issue, action=None, data=None, comment=None,
+                       activity_type=None, user=None, timestamp=None):
+    """Build a plain activity row dict ready for a bulk insert"""
+    return frappe._dict({
         "issue": issue,
-        "activity_type": determine_activity_type(action),
-        "user": frappe.session.user,
-        "timestamp": frappe.utils.now_datetime(),
-        "data": json.dumps(data) if data else None,
+        "activity_type": activity_type or determine_activity_type(action or ""),
+        "user": user or frappe.session.user,
+        "timestamp": timestamp or frappe.utils.now_datetime(),
+        "data": json.dumps(data) if data and not isinstance(data, str) else data,
         "comment": comment
     })
+
+
+def get_activity_buffer():
+    """Return the request-scoped activity buffer, registering the flush on first use"""
+    buffer = getattr(frappe.local, "agile_activity_buffer", None)
+    if buffer is None:
+        buffer = frappe.local.agile_activity_buffer = []
+        frappe.db.before_commit.add(flush_activity_buffer)
+        frappe.db.after_rollback.add(discard_activity_buffer)
+    return buffer
+
+
+def flush_activity_buffer():
+    """Write all buffered activity rows in one statement"""
+    buffer = getattr(frappe.local, "agile_activity_buffer", None)
+    frappe.local.agile_activity_buffer = None
+    if buffer:
+        bulk_insert_activities(buffer)
+
+
+def discard_activity_buffer():
+    """Drop buffered rows when the transaction is rolled back"""
+    frappe.local.agile_activity_buffer = None
+
+
+def flush_issue_activities(issue):
+    """
+    Write the buffered rows of one issue now. Called at the end of a Task
+    save so its rows belong to the same part of the transaction as the
+    change they describe: a savepoint rolled back around the save (bulk
+    edit, data import) takes them with it, while rows still sitting in the
+    buffer would outlive it.
+    """
+    buffer = getattr(frappe.local, "agile_activity_buffer", None)
+    if not buffer:
+        return 0
+    rows = [row for row in buffer if row.issue == issue]
+    if not rows:
+        return 0
+    buffer[:] = [row for row in buffer if row.issue != issue]
+    return bulk_insert_activities(rows)
+
+
+def discard_issue_activities(issue):
+    """Drop the buffered rows of an issue that is being deleted"""
+    buffer = getattr(frappe.local, "agile_activity_buffer", None)
+    if buffer:
+        buffer[:] = [row for row in buffer if row.issue != issue]
+
+
+def bulk_log_issue_activities(activities, chunk_size=5000):
+    """
+    Log many activities immediately with multi-row INSERTs.
+    Intended for bulk operations (imports, migrations, mass updates).
     
-    activity_doc.insert(ignore_permissions=True)
-    return activity_doc
+    Args:
+        activities: List of dicts with issue and either action or activity_type;
+            optional data, comment, user and timestamp
+        chunk_size: Rows per INSERT statement
+    
+    Returns:
+        Number of rows written
+    """
+    rows = [
+        build_activity_row(
+            a.get("issue"),
+            action=a.get("action"),
+            data=a.get("data"),
+            comment=a.get("comment"),
+            activity_type=a.get("activity_type"),
+            user=a.get("user"),
+            timestamp=a.get("timestamp")
+        )
+        for a in activities
+        if a.get("issue")
+    ]
+    return bulk_insert_activities(rows, chunk_size=chunk_size)
+
+
+def bulk_insert_activities(rows, chunk_size=5000):
+    """Insert prepared activity rows, bypassing per-document ORM overhead"""
+    if not rows:
+        return 0
+
+    now = frappe.utils.now()
+    session_user = frappe.session.user
+    values = [
+        (
+            frappe.generate_hash(length=10), now, now, session_user, session_user,
+            row.get("issue"), row.get("activity_type"), row.get("user") or session_user,
+            row.get("timestamp") or now, row.get("data"), row.get("comment")
+        )
+        for row in rows
+    ]
+
+    frappe.db.bulk_insert(
+        "Agile Issue Activity",
+        fields=ACTIVITY_FIELDS,
+        values=values,
+        chunk_size=chunk_size
+    )
+    return len(values)
 
 
 def determine_activity_type(action):
@@ -0,0 +1,14 @@
+# Copyright (c) 2026, Yanky and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AgileTaskVisibility(Document):
+	pass
+
+
+def on_doctype_update():
+	"""Composite index backing the Task permission query condition"""
+	frappe.db.add_index("Agile Task Visibility", ["user", "task"])
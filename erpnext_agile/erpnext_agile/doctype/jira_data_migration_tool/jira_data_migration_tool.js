@@ -3,6 +3,7 @@ frappe.ui.form.on('Jira Data Migration Tool', {
         // Kick off the UI and listeners safely
         setup_dashboard(frm);
         setup_buttons(frm);
+        setup_realtime(frm);
         auto_resume_polling(frm);
     }
 });
@@ -51,6 +52,7 @@ function setup_dashboard(frm) {
                     <div style="background: #1f2937; padding: 12px; border-radius: 8px;">
                         <div style="font-size: 12px; color: #9ca3af; margin-bottom: 4px;">ETA</div>
                         <div class="stat-eta" style="font-size: 20px; font-weight: bold;">--</div>
+                        <div class="stat-rate" style="font-size: 11px; color: #9ca3af; margin-top: 2px;"></div>
                     </div>
                 </div>
 
@@ -96,6 +98,7 @@ function update_dashboard(frm, d) {
     // Format ETA
     const eta_text = d.eta ? `${Math.floor(d.eta / 60)}m ${Math.floor(d.eta % 60)}s` : "--";
     w.find(".stat-eta").text(eta_text);
+    w.find(".stat-rate").text(d.items_per_sec ? `${d.items_per_sec} issues/s` : "");
 
     // Visual Progress
     w.find(".progress-fill").css("width", (d.percent || 0) + "%");
@@ -116,7 +119,41 @@ function update_dashboard(frm, d) {
 }
 
 // ─────────────────────────────────────────
-// 3. POLLING ENGINE (Smart & Resilient)
+// 3. REALTIME UPDATES (Pushed by the worker)
+// ─────────────────────────────────────────
+const TERMINAL_STATES = ["completed", "stopped", "failed"];
+
+function setup_realtime(frm) {
+    if (frm._progress_handler) return;
+
+    frm._progress_handler = (d) => {
+        if (!d || d.project_key !== frm.doc.project_key) return;
+        handle_progress(frm, d);
+        if (!TERMINAL_STATES.includes(d.status)) start_polling(frm);
+    };
+    frappe.realtime.on("jira_migration_progress", frm._progress_handler);
+}
+
+function realtime_connected() {
+    return Boolean(frappe.realtime.socket && frappe.realtime.socket.connected);
+}
+
+// Returns true once the migration reached a terminal state
+function handle_progress(frm, d) {
+    update_dashboard(frm, d);
+    if (!TERMINAL_STATES.includes(d.status)) return false;
+
+    stop_polling(frm);
+    // Fire completion alert only once
+    if (d.status === "completed" && !frm._notified_completion) {
+        frappe.show_alert({ message: "✅ Migration fully complete!", indicator: "blue" });
+        frm._notified_completion = true;
+    }
+    return true;
+}
+
+// ─────────────────────────────────────────
+// 4. POLLING FALLBACK (Slow while realtime is connected)
 // ─────────────────────────────────────────
 function start_polling(frm) {
     if (frm._is_polling) return;
@@ -124,7 +161,6 @@ function start_polling(frm) {
     
     let errorCount = 0;
     const MAX_ERRORS = 3;
-    const TERMINAL = ["completed", "stopped", "failed"];
 
     const poll = () => {
         if (!frm._is_polling) return;
@@ -140,21 +176,7 @@ function start_polling(frm) {
                     return;
                 }
 
-                update_dashboard(frm, d);
-
-                // Stop if we hit a terminal state and percent is 100%
-                if (TERMINAL.includes(d.status)) {
-                    stop_polling(frm);
-                    
-                    // Fire completion alert only once
-                    if (d.status === "completed" && !frm._notified_completion) {
-                        frappe.show_alert({ message: "✅ Migration fully complete!", indicator: "blue" });
-                        frm._notified_completion = true;
-                    }
-                    return;
-                }
-
-                schedule();
+                if (!handle_progress(frm, d)) schedule();
             },
             error: () => {
                 errorCount++;
@@ -170,7 +192,8 @@ function start_polling(frm) {
     };
 
     const schedule = () => {
-        frm._poll_timer = setTimeout(poll, 3000); // 3 second polling interval
+        // Pushed updates arrive every second; polling only covers a dropped socket
+        frm._poll_timer = setTimeout(poll, realtime_connected() ? 15000 : 3000);
     };
 
     poll(); // Kickoff
@@ -200,7 +223,7 @@ function auto_resume_polling(frm) {
 }
 
 // ─────────────────────────────────────────
-// 4. ACTION BUTTONS
+// 5. ACTION BUTTONS
 // ─────────────────────────────────────────
 function setup_buttons(frm) {
     frm.add_custom_button(__('Verify Connection'), () => {
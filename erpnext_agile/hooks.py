@@ -206,10 +206,19 @@ doc_events = {
         "on_update": [
             "erpnext_agile.agile_doctype_controllers.task_on_update",
             "erpnext_agile.project_time_tracking.update_project_user_time_on_task_update",
-            "erpnext_agile.test_management.events.task_check_test_coverage"
+            "erpnext_agile.test_management.events.task_check_test_coverage",
+            "erpnext_agile.task_visibility.sync_task_visibility",
+            "erpnext_agile.permission_context.on_task_update"
         ],
         "after_insert": "erpnext_agile.agile_doctype_controllers.task_after_insert",
-        "on_trash": "erpnext_agile.agile_doctype_controllers.task_on_trash"
+        "on_trash": [
+            "erpnext_agile.agile_doctype_controllers.task_on_trash",
+            "erpnext_agile.task_visibility.delete_task_visibility"
+        ]
+    },
+    "Project": {
+        "on_update": "erpnext_agile.task_visibility.on_project_update",
+        "on_trash": "erpnext_agile.task_visibility.on_project_trash"
     },
     "Agile Issue Work Log": {
         "after_insert": "erpnext_agile.project_time_tracking.update_project_user_time_on_work_log",
@@ -225,6 +234,14 @@ doc_events = {
     },
     "Comment": {
         "after_insert": "erpnext_agile.utils.task_watcher_sync_on_mention"
+    },
+    "ToDo": {
+        "after_insert": "erpnext_agile.permission_context.on_todo_change",
+        "on_update": "erpnext_agile.permission_context.on_todo_change",
+        "on_trash": "erpnext_agile.permission_context.on_todo_change"
+    },
+    "User": {
+        "on_update": "erpnext_agile.permission_context.on_user_update"
     }
 }
 
@@ -259,7 +276,8 @@ scheduler_events = {
     ],
     "daily": [
         "erpnext_agile.scheduler_events.daily.send_sprint_digest",
-        "erpnext_agile.scheduler_events.daily.cleanup_old_timers"
+        "erpnext_agile.scheduler_events.daily.cleanup_old_timers",
+        "erpnext_agile.jira_sync.scheduled_delta_sync"
     ],
     "weekly": [
         # "erpnext_agile.version_control.cleanup_all_old_versions",
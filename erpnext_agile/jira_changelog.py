@@ -0,0 +1,276 @@
+# erpnext_agile/jira_changelog.py
+"""
+Jira changelog import
+Turns the status and sprint transitions in each issue's changelog into
+Agile Issue Activity rows and Task Sprint History rows, so cycle time and
+status duration analytics cover migrated work. Sprints are only matched to
+existing Agile Sprints; history never creates one. The next chunk's changelogs
+are fetched by the run's sub-resource fetcher while the current chunk is
+written with multi-row INSERTs. Each committed chunk is trimmed from the
+phase queue, and histories that were already imported are recognised by
+their Jira history id.
+"""
+
+import json
+from collections import defaultdict
+
+import frappe
+from frappe.utils import cint, getdate
+
+from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+	bulk_log_issue_activities,
+)
+from erpnext_agile.jira_sync import IssueKeyIndex, JiraReferenceResolver, _jira_datetime, pulse_worker
+from erpnext_agile.overrides.task import update_sprint_counts
+
+CHUNK_SIZE = 200
+
+SPRINT_HISTORY_FIELDS = [
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"parent",
+	"parenttype",
+	"parentfield",
+	"idx",
+	"sprint",
+	"transferred_on",
+	"transferred_by",
+]
+
+
+def _split(value):
+	return [v.strip() for v in str(value or "").split(",") if v.strip()]
+
+
+def _sprint_labels(ids, names):
+	"""
+	Sprint id -> name of one side of a sprint change. Jira joins both lists
+	with commas; names only line up with the ids when none contains a comma.
+	"""
+	parts = _split(names)
+	if len(parts) == len(ids):
+		return dict(zip(ids, parts, strict=True))
+	if len(ids) == 1:
+		return {ids[0]: str(names or "").strip()}
+	return {}
+
+
+def history_transitions(history):
+	"""
+	Status and sprint transitions of one changelog history:
+	("status", from_status, to_status) and ("sprint", added, removed) with
+	(sprint id, name) pairs, diffed on the item's `from`/`to` id lists
+	"""
+	transitions = []
+	for item in history.get("items") or []:
+		field = str(item.get("field") or "").lower()
+		if item.get("fieldId") == "status" or field == "status":
+			transitions.append(("status", item.get("fromString"), item.get("toString")))
+		elif field == "sprint":
+			before, after = _split(item.get("from")), _split(item.get("to"))
+			labels = {
+				**_sprint_labels(before, item.get("fromString")),
+				**_sprint_labels(after, item.get("toString")),
+			}
+			transitions.append(
+				(
+					"sprint",
+					[(s, labels.get(s)) for s in after if s not in before],
+					[(s, labels.get(s)) for s in before if s not in after],
+				)
+			)
+	return transitions
+
+
+# ============================================
+# PRELOAD
+# ============================================
+
+
+def _imported_history_ids(task_names):
+	"""(task, jira history id) pairs already written as activity"""
+	imported = set()
+	for issue, data in frappe.db.sql(
+		"""
+        SELECT issue, data FROM `tabAgile Issue Activity`
+        WHERE issue IN %s AND data LIKE %s
+    """,
+		[task_names, '%"jira_history_id"%'],
+	):
+		try:
+			imported.add((issue, str(json.loads(data).get("jira_history_id"))))
+		except (TypeError, ValueError, AttributeError):
+			continue
+	return imported
+
+
+def _sprint_history_state(task_names):
+	"""Existing (sprint, date) rows and the last idx of each Task's sprint history"""
+	existing, last_idx = defaultdict(set), defaultdict(int)
+	for parent, sprint, transferred_on, idx in frappe.db.sql(
+		"""
+        SELECT parent, sprint, transferred_on, idx FROM `tabTask Sprint History`
+        WHERE parenttype = 'Task' AND parentfield = 'custom_task_sprint_history' AND parent IN %s
+    """,
+		[task_names],
+	):
+		existing[parent].add((sprint, str(transferred_on)))
+		last_idx[parent] = max(last_idx[parent], cint(idx))
+	return existing, last_idx
+
+
+def _project_sprints(projects):
+	"""(project, sprint_name) -> Agile Sprint of the existing sprints of `projects`"""
+	if not projects:
+		return {}
+	return {
+		(s.project, s.sprint_name): s.name
+		for s in frappe.get_all(
+			"Agile Sprint",
+			filters={"project": ["in", list(projects)]},
+			fields=["name", "project", "sprint_name"],
+		)
+	}
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+
+def process_changelog_queue(changelog_buffer, fetcher, project_key=None, index=None, queue_key=None):
+	"""
+	Import the changelogs of queued issues ({"jira_key": ...} items).
+	With `queue_key`, every committed chunk is removed from that Redis list.
+	"""
+	index = index or IssueKeyIndex(project_key)
+	resolver = JiraReferenceResolver(index)
+	chunks = [changelog_buffer[i : i + CHUNK_SIZE] for i in range(0, len(changelog_buffer), CHUNK_SIZE)]
+	targets = [
+		{
+			item.get("jira_key"): index.get(item.get("jira_key"))
+			for item in chunk
+			if index.get(item.get("jira_key"))
+		}
+		for chunk in chunks
+	]
+
+	touched_sprints = set()
+	stats = {"activities": 0, "sprint_history": 0}
+	if targets:
+		fetcher.submit("changelog", list(targets[0]))
+
+	for n, (chunk, tasks) in enumerate(zip(chunks, targets, strict=True)):
+		pulse_worker(project_key, f"Importing Changelogs ({n * CHUNK_SIZE}/{len(changelog_buffer)})...")
+		if n + 1 < len(targets):
+			fetcher.submit("changelog", list(targets[n + 1]))
+
+		if tasks:
+			histories = fetcher.fetch("changelog", list(tasks))
+			sprints = _write_chunk(tasks, histories, resolver, stats)
+			touched_sprints.update(sprints)
+			frappe.db.commit()
+
+		if queue_key:
+			frappe.cache().ltrim(queue_key, len(chunk), -1)
+
+	for sprint in touched_sprints:
+		update_sprint_counts(sprint)
+	frappe.db.commit()
+
+	return stats
+
+
+def _write_chunk(tasks, histories, resolver, stats):
+	"""Activity and sprint history rows of one chunk; returns the sprints a Task left"""
+	task_names = list(set(tasks.values()))
+	imported = _imported_history_ids(task_names)
+	projects = dict(
+		frappe.get_all("Task", filters={"name": ["in", task_names]}, fields=["name", "project"], as_list=True)
+	)
+	existing, last_idx = _sprint_history_state(task_names)
+	sprints = _project_sprints(set(filter(None, projects.values())))
+
+	now = frappe.utils.now()
+	session_user = frappe.session.user
+	activities, sprint_rows, left = [], [], set()
+
+	for jira_key, task_name in tasks.items():
+		# None: the fetch failed and was counted by the fetcher
+		for history in histories.get(jira_key) or []:
+			history_id = str(history.get("id"))
+			if (task_name, history_id) in imported:
+				continue
+			imported.add((task_name, history_id))
+
+			user = resolver.user((history.get("author") or {}).get("emailAddress"))
+			timestamp = _jira_datetime(history.get("created"))
+			for kind, first, second in history_transitions(history):
+				if kind == "status":
+					activities.append(
+						{
+							"issue": task_name,
+							"activity_type": "status_changed",
+							"user": user,
+							"timestamp": timestamp,
+							"data": {
+								"from_status": first,
+								"to_status": second,
+								"jira_history_id": history_id,
+							},
+						}
+					)
+					continue
+
+				project = projects.get(task_name)
+				for activity_type, changed in (("sprint_added", first), ("sprint_removed", second)):
+					for sprint_id, sprint_name in changed:
+						# Unmatched sprints keep their Jira name (or id) in the activity only
+						sprint = sprints.get((project, sprint_name)) if sprint_name else None
+						activities.append(
+							{
+								"issue": task_name,
+								"activity_type": activity_type,
+								"user": user,
+								"timestamp": timestamp,
+								"data": {
+									"sprint": sprint or sprint_name or sprint_id,
+									"jira_sprint_id": sprint_id,
+									"jira_history_id": history_id,
+								},
+							}
+						)
+						if activity_type != "sprint_removed" or not sprint:
+							continue
+
+						transferred_on = getdate(timestamp) if timestamp else getdate()
+						if (sprint, str(transferred_on)) in existing[task_name]:
+							continue
+						existing[task_name].add((sprint, str(transferred_on)))
+						last_idx[task_name] += 1
+						left.add(sprint)
+						sprint_rows.append(
+							(
+								frappe.generate_hash(length=10),
+								now,
+								now,
+								session_user,
+								session_user,
+								task_name,
+								"Task",
+								"custom_task_sprint_history",
+								last_idx[task_name],
+								sprint,
+								transferred_on,
+								user,
+							)
+						)
+
+	stats["activities"] += bulk_log_issue_activities(activities)
+	if sprint_rows:
+		frappe.db.bulk_insert("Task Sprint History", fields=SPRINT_HISTORY_FIELDS, values=sprint_rows)
+		stats["sprint_history"] += len(sprint_rows)
+	return left
@@ -0,0 +1,294 @@
+# erpnext_agile/jira_client.py
+"""
+Rate limited Jira REST client
+Every Jira call made by the migration goes through one pooled session per
+site with a shared token bucket, retries with exponential backoff and jitter,
+Retry-After handling and per-endpoint timeouts. Request counters are kept so
+the migration progress payload can show how the server is coping. Clients
+outlive a run, so each run resets their counters and sets its rate ceiling;
+sharded runs split the configured rate between their workers.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RATE = 10  # requests per second the bucket refills with
+DEFAULT_BURST = 20
+MIN_RATE = 1
+POOL_SIZE = 32
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# (connect, read) timeouts per endpoint class
+ENDPOINT_TIMEOUTS = {
+	"search": (10, 60),
+	"attachment": (10, 120),
+	"comment": (10, 30),
+	"worklog": (10, 30),
+	"changelog": (10, 30),
+	"default": (10, 30),
+}
+
+
+def classify_endpoint(url):
+	"""Map a Jira URL to the endpoint class used for timeouts and stats"""
+	path = urlparse(url).path
+	if path.endswith("/search") or "/search/" in path:
+		return "search"
+	if "/attachment" in path:
+		return "attachment"
+	for name in ("comment", "worklog", "changelog"):
+		if path.rstrip("/").endswith(name):
+			return name
+	return "default"
+
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket with an adaptive refill rate.
+	A 429 halves the rate; every success creeps it back up towards the ceiling,
+	so throughput settles at whatever the server currently allows.
+	"""
+
+	def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+		self.max_rate = float(rate)
+		self.rate = float(rate)
+		self.burst = float(burst)
+		self._tokens = float(burst)
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		while True:
+			with self._lock:
+				now = time.monotonic()
+				self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+				self._updated = now
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+				wait = (1 - self._tokens) / self.rate
+			time.sleep(wait)
+
+	def throttled(self):
+		with self._lock:
+			self.rate = max(MIN_RATE, self.rate / 2)
+			self._tokens = 0
+
+	def succeeded(self):
+		with self._lock:
+			if self.rate < self.max_rate:
+				self.rate = min(self.max_rate, self.rate + 0.1)
+
+	def configure(self, rate, burst=None):
+		"""New rate ceiling (and burst) for the next run"""
+		with self._lock:
+			self.max_rate = self.rate = max(float(MIN_RATE), float(rate))
+			if burst is not None:
+				self.burst = float(burst)
+			self._tokens = min(self._tokens, self.burst)
+
+
+class JiraClient:
+	"""Pooled, rate limited and retrying wrapper around a requests Session"""
+
+	def __init__(
+		self,
+		domain,
+		auth=None,
+		rate=DEFAULT_RATE,
+		burst=DEFAULT_BURST,
+		pool_size=POOL_SIZE,
+		max_retries=MAX_RETRIES,
+	):
+		self.domain = (domain or "").rstrip("/")
+		self.max_retries = max_retries
+		self.bucket = TokenBucket(rate, burst)
+
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+		self.session.mount("https://", adapter)
+		self.session.mount("http://", adapter)
+		self.session.headers.update({"Accept": "application/json"})
+		if auth:
+			self.session.auth = tuple(auth)
+
+		self._stats_lock = threading.Lock()
+		self._stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "latency": 0.0}
+		self._endpoints = {}
+
+	# ── HTTP verbs ──
+
+	def get(self, url, **kwargs):
+		return self.request("GET", url, **kwargs)
+
+	def post(self, url, **kwargs):
+		return self.request("POST", url, **kwargs)
+
+	def request(self, method, url, **kwargs):
+		"""
+		Send a request, retrying throttled (429), unavailable (502/503/504) and
+		connection-level failures. The final response is returned as is, so
+		callers keep using raise_for_status()/status_code like with requests.
+		"""
+		if url.startswith("/"):
+			url = f"{self.domain}{url}"
+		endpoint = classify_endpoint(url)
+		kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS[endpoint])
+
+		attempt = 0
+		while True:
+			self.bucket.acquire()
+			started = time.monotonic()
+			try:
+				response = self.session.request(method, url, **kwargs)
+			except (requests.ConnectionError, requests.Timeout):
+				self._record(endpoint, time.monotonic() - started, error=True)
+				if attempt >= self.max_retries:
+					raise
+				attempt += 1
+				self._count("retries")
+				time.sleep(self._backoff(attempt))
+				continue
+
+			self._record(endpoint, time.monotonic() - started, error=response.status_code >= 400)
+
+			if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+				if response.status_code < 400:
+					self.bucket.succeeded()
+				return response
+
+			if response.status_code == 429:
+				self._count("throttled")
+				self.bucket.throttled()
+
+			attempt += 1
+			self._count("retries")
+			delay = self._retry_after(response)
+			response.close()
+			time.sleep(delay if delay is not None else self._backoff(attempt))
+
+	# ── Backoff ──
+
+	@staticmethod
+	def _backoff(attempt):
+		"""Exponential backoff with full jitter"""
+		return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2**attempt)))
+
+	@staticmethod
+	def _retry_after(response):
+		value = response.headers.get("Retry-After")
+		if not value:
+			return None
+		try:
+			return min(BACKOFF_CAP, max(0.0, float(value)))
+		except ValueError:
+			pass
+		try:
+			retry_at = parsedate_to_datetime(value).timestamp()
+			return min(BACKOFF_CAP, max(0.0, retry_at - time.time()))
+		except (TypeError, ValueError):
+			return None
+
+	# ── Stats ──
+
+	def _count(self, key):
+		with self._stats_lock:
+			self._stats[key] += 1
+
+	def _record(self, endpoint, latency, error=False):
+		with self._stats_lock:
+			self._stats["requests"] += 1
+			self._stats["latency"] += latency
+			if error:
+				self._stats["errors"] += 1
+			ep = self._endpoints.setdefault(endpoint, {"requests": 0, "latency": 0.0})
+			ep["requests"] += 1
+			ep["latency"] += latency
+
+	def reset_stats(self):
+		with self._stats_lock:
+			self._stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "latency": 0.0}
+			self._endpoints = {}
+
+	def stats(self):
+		"""Counters for the progress payload; latencies in milliseconds"""
+		with self._stats_lock:
+			requests_made = self._stats["requests"]
+			return {
+				"requests": requests_made,
+				"retries": self._stats["retries"],
+				"throttled": self._stats["throttled"],
+				"errors": self._stats["errors"],
+				"avg_latency_ms": round(self._stats["latency"] * 1000 / requests_made, 1)
+				if requests_made
+				else 0,
+				"rate_limit": round(self.bucket.rate, 2),
+				"endpoints": {
+					name: {
+						"requests": ep["requests"],
+						"avg_latency_ms": round(ep["latency"] * 1000 / ep["requests"], 1)
+						if ep["requests"]
+						else 0,
+					}
+					for name, ep in self._endpoints.items()
+				},
+			}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_jira_client(domain, auth=None, **kwargs):
+	"""
+	Process-wide client per Jira site and user, so every phase and thread of a
+	migration shares one connection pool and one rate limit.
+	"""
+	key = (domain, auth[0] if auth else None)
+	with _clients_lock:
+		if key not in _clients:
+			_clients[key] = JiraClient(domain, auth, **kwargs)
+		return _clients[key]
+
+
+def start_client_run(domain, auth=None, workers=1, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+	"""
+	Client for a run that is starting: counters of earlier runs in this process
+	are dropped and the rate ceiling is set. `workers` processes talking to the
+	same site each get their share of the rate, so together they stay within it.
+	"""
+	workers = max(1, int(workers or 1))
+	client = get_jira_client(domain, auth)
+	client.reset_stats()
+	client.bucket.configure(rate / workers, max(1, burst // workers))
+	return client
+
+
+def get_client_stats(domain=None):
+	"""Combined stats of the clients in this process (optionally for one site)"""
+	with _clients_lock:
+		clients = [c for (d, _user), c in _clients.items() if domain is None or d == domain]
+	if not clients:
+		return None
+	if len(clients) == 1:
+		return clients[0].stats()
+
+	combined = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0}
+	latency = 0.0
+	for client in clients:
+		stats = client.stats()
+		for key in combined:
+			combined[key] += stats[key]
+		latency += stats["avg_latency_ms"] * stats["requests"]
+	combined["avg_latency_ms"] = round(latency / combined["requests"], 1) if combined["requests"] else 0
+	return combined
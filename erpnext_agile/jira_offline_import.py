@@ -0,0 +1,385 @@
+# erpnext_agile/jira_offline_import.py
+"""
+Offline Jira import
+Reads a Jira export from local disk instead of the REST API: a directory of
+saved /rest/api/2/search pages, a JSON issue dump or an XML (RSS) search
+export. Files are parsed incrementally and fed through the same
+transformation and write path as the live migration, which also makes a
+saved export a reproducible benchmark corpus.
+"""
+
+import os
+import time
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+
+import frappe
+import ijson
+from frappe import _
+
+from erpnext_agile.jira_sync import (
+	CommentWriter,
+	IssueKeyIndex,
+	JiraReferenceResolver,
+	_flush_inserts,
+	_flush_updates,
+	build_hierarchy_from_dependencies,
+	build_task_dict_from_jira,
+	check_control,
+	issue_content_hash,
+	process_worklogs_queue,
+	update_parent_end_dates,
+	weave_hierarchies,
+)
+from erpnext_agile.migration_progress import get_reporter
+from erpnext_agile.task_tree import rebuild_task_trees
+
+EXPORT_DIR = ("private", "jira_exports")
+BATCH_SIZE = 500
+
+
+# ============================================
+# READERS
+# ============================================
+
+
+class ExportReader:
+	"""
+	Iterates (issue, names_map) pairs from a file or a directory of files and
+	tracks how many bytes have been consumed, for progress reporting.
+	"""
+
+	def __init__(self, path):
+		if os.path.isdir(path):
+			self.files = sorted(
+				os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith((".json", ".xml"))
+			)
+		else:
+			self.files = [path]
+
+		self.total_bytes = sum(os.path.getsize(f) for f in self.files) or 1
+		self._done_bytes = 0
+		self._current = None
+
+	@property
+	def percent(self):
+		position = self._done_bytes
+		if self._current and not self._current.closed:
+			position += self._current.tell()
+		return min(round(position * 100 / self.total_bytes, 2), 100)
+
+	def __iter__(self):
+		for path in self.files:
+			with open(path, "rb") as f:
+				self._current = f
+				parser = iter_xml_issues if path.lower().endswith(".xml") else iter_json_issues
+				yield from parser(f)
+			self._done_bytes += os.path.getsize(path)
+			self._current = None
+
+
+def _first_char(f):
+	"""First non-whitespace byte of a JSON file: `[` for an issue list, `{` for a search page"""
+	while True:
+		ch = f.read(1)
+		if not ch or not ch.isspace():
+			f.seek(0)
+			return ch
+
+
+def iter_json_issues(f):
+	"""
+	Stream issues from a saved search page ({"issues": [...], "names": {...}})
+	or a plain JSON list of issues with ijson, so memory stays flat whatever
+	the size of the export.
+	"""
+	is_list = _first_char(f) == b"["
+
+	names_map = {}
+	if not is_list:
+		names_map = dict(ijson.kvitems(f, "names"))
+		f.seek(0)
+
+	for issue in ijson.items(f, "item" if is_list else "issues.item", use_float=True):
+		yield issue, names_map
+
+
+def iter_xml_issues(f):
+	"""Stream issues from a Jira XML (RSS) export with iterparse, discarding each <item> once read"""
+	channel = None
+	for event, elem in ET.iterparse(f, events=("start", "end")):
+		if event == "start":
+			if elem.tag == "channel":
+				channel = elem
+			continue
+
+		if elem.tag != "item":
+			continue
+
+		issue, names_map = xml_item_to_issue(elem)
+		elem.clear()
+		if channel is not None:
+			channel.remove(elem)
+		yield issue, names_map
+
+
+# ============================================
+# XML -> REST PAYLOAD
+# ============================================
+
+
+def _xml_date(value):
+	"""RSS dates (Mon, 5 Feb 2024 10:20:30 +0000) to the REST format build_task_dict_from_jira expects"""
+	if not value:
+		return None
+	try:
+		return parsedate_to_datetime(value).strftime("%Y-%m-%dT%H:%M:%S.000%z")
+	except (TypeError, ValueError):
+		return None
+
+
+def _xml_user(elem):
+	if elem is None or elem.get("username") == "-1":
+		return None
+	username = elem.get("username") or ""
+	return {
+		"emailAddress": username if "@" in username else None,
+		"displayName": (elem.text or "").strip() or username,
+	}
+
+
+def _xml_seconds(item, tag):
+	elem = item.find(tag)
+	return int(elem.get("seconds")) if elem is not None and elem.get("seconds") else None
+
+
+def _xml_links(item):
+	links = []
+	for link_type in item.findall("issuelinks/issuelinktype"):
+		for direction, side in (("outwardlinks", "outwardIssue"), ("inwardlinks", "inwardIssue")):
+			for group in link_type.findall(direction):
+				relation = group.get("description") or ""
+				for key in group.findall("issuelink/issuekey"):
+					links.append(
+						{
+							"type": {"inward": relation, "outward": relation},
+							side: {"key": (key.text or "").strip()},
+						}
+					)
+	return links
+
+
+def xml_item_to_issue(item):
+	"""Convert one RSS <item> into the REST issue shape plus a names map for its custom fields"""
+
+	def text(tag):
+		return (item.findtext(tag) or "").strip() or None
+
+	project = item.find("project")
+	reporter = _xml_user(item.find("reporter"))
+	comments = [
+		{
+			"body": c.text or "",
+			"created": _xml_date(c.get("created")),
+			"author": {
+				"emailAddress": c.get("author") if "@" in (c.get("author") or "") else None,
+				"displayName": c.get("author"),
+			},
+		}
+		for c in item.findall("comments/comment")
+	]
+
+	fields = {
+		"summary": text("summary"),
+		"description": text("description"),
+		"resolution": {"name": text("resolution")}
+		if text("resolution") not in (None, "Unresolved")
+		else None,
+		"created": _xml_date(text("created")),
+		"updated": _xml_date(text("updated")),
+		"duedate": _xml_date(text("due")),
+		"resolutiondate": _xml_date(text("resolved")),
+		"assignee": _xml_user(item.find("assignee")),
+		"creator": _xml_user(item.find("creator")) or reporter,
+		"project": {"key": project.get("key") if project is not None else None, "name": text("project")},
+		"labels": [l.text for l in item.findall("labels/label") if l.text],
+		"components": [{"name": c.text} for c in item.findall("component") if c.text],
+		"fixVersions": [{"name": v.text} for v in item.findall("fixVersion") if v.text],
+		"versions": [{"name": v.text} for v in item.findall("version") if v.text],
+		"timeoriginalestimate": _xml_seconds(item, "timeoriginalestimate"),
+		"timeestimate": _xml_seconds(item, "timeestimate"),
+		"timespent": _xml_seconds(item, "timespent"),
+		"aggregatetimespent": _xml_seconds(item, "aggregatetimespent"),
+		"parent": {"key": text("parent")} if text("parent") else None,
+		"issuelinks": _xml_links(item),
+		"comment": {"comments": comments, "total": len(comments)},
+		"attachment": [],
+	}
+	# Missing values are left out so the mapping falls back to its defaults
+	for field, tag in (("issuetype", "type"), ("status", "status"), ("priority", "priority")):
+		if text(tag):
+			fields[field] = {"name": text(tag)}
+
+	names_map = {}
+	for cf in item.findall("customfields/customfield"):
+		field_id = cf.get("id")
+		name = (cf.findtext("customfieldname") or "").strip()
+		values = [v.text for v in cf.findall("customfieldvalues/customfieldvalue") if v.text]
+		if not field_id or not values:
+			continue
+		names_map[field_id] = name
+		if name.lower() == "sprint":
+			fields[field_id] = [{"name": v} for v in values]
+		else:
+			fields[field_id] = values[0] if len(values) == 1 else values
+
+	return {"key": text("key"), "fields": fields}, names_map
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+
+def resolve_export_path(path):
+	"""Exports must live under the site's private/jira_exports folder"""
+	root = os.path.realpath(frappe.get_site_path(*EXPORT_DIR))
+	full = os.path.realpath(path if os.path.isabs(path) else os.path.join(root, path))
+	if os.path.commonpath([root, full]) != root:
+		frappe.throw(_("Export path must be inside {0}").format(root))
+	if not os.path.exists(full):
+		frappe.throw(_("Export not found: {0}").format(full))
+	return full
+
+
+def run_offline_import(project_key, path, use_bulk=1):
+	"""Import a Jira export for one project key; returns throughput stats"""
+	reader = ExportReader(resolve_export_path(path))
+	issue_index = IssueKeyIndex(project_key)
+	resolver = JiraReferenceResolver(issue_index)
+	use_bulk = bool(int(use_bulk))
+
+	hierarchy_key = f"jira_hierarchy_{project_key}"
+	frappe.cache().delete_value(hierarchy_key)
+
+	stats = {"processed": 0, "skipped": 0, "failed": 0}
+	started = time.monotonic()
+	buffers = {"insert": [], "update": [], "worklogs": [], "comments": {}}
+	progress = get_reporter(project_key)
+
+	def save_progress(status="running", phase="Importing Export...", percent=None):
+		progress.update(
+			status=status,
+			phase=phase,
+			processed=stats["processed"],
+			failed=stats["failed"],
+			percent=reader.percent if percent is None else percent,
+		)
+
+	def flush():
+		resolver.flush()
+		stats["failed"] += _flush_inserts(buffers["insert"], use_bulk, issue_index)
+		stats["failed"] += _flush_updates(buffers["update"])
+
+		if buffers["worklogs"]:
+			process_worklogs_queue(buffers["worklogs"], project_key, issue_index)
+		if buffers["comments"]:
+			targets = {issue_index.get(k): c for k, c in buffers["comments"].items() if issue_index.get(k)}
+			writer = CommentWriter(targets.keys(), resolver)
+			for task_name, comments in targets.items():
+				writer.add(task_name, comments)
+			writer.close()
+
+		buffers.update({"insert": [], "update": [], "worklogs": [], "comments": {}})
+		frappe.db.commit()
+		save_progress()
+
+	progress.reset(phase="Reading Export...")
+
+	try:
+		for issue, names_map in reader:
+			jira_key = issue.get("key")
+			if not jira_key or not jira_key.startswith(f"{project_key}-"):
+				continue
+
+			content_hash = issue_content_hash(issue)
+			if jira_key in issue_index and issue_index.hashes.get(jira_key) == content_hash:
+				stats["skipped"] += 1
+				continue
+
+			try:
+				task_dict, dyn_fields, _attachments, worklogs = build_task_dict_from_jira(
+					issue, None, None, names_map, resolver
+				)
+				task_dict["custom_jira_content_hash"] = content_hash
+				# Exports carry no watcher lists; leave existing watchers untouched
+				task_dict.pop("watchers", None)
+
+				if jira_key in issue_index:
+					buffers["update"].append({"name": issue_index.get(jira_key), "data": task_dict})
+				else:
+					buffers["insert"].append(task_dict)
+
+				if worklogs:
+					buffers["worklogs"].append({"jira_key": jira_key, "worklogs": worklogs})
+				comments = ((issue.get("fields") or {}).get("comment") or {}).get("comments")
+				if comments:
+					buffers["comments"][jira_key] = comments
+
+				parent_data = (issue.get("fields") or {}).get("parent")
+				std_parent = parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
+				target_parent = std_parent or dyn_fields.get("epic_link") or dyn_fields.get("parent_link")
+				if target_parent:
+					frappe.cache().hset(hierarchy_key, jira_key, target_parent)
+
+				stats["processed"] += 1
+			except Exception:
+				frappe.log_error(frappe.get_traceback(), f"Offline Import Issue Failed: {jira_key}")
+				stats["failed"] += 1
+
+			if len(buffers["insert"]) + len(buffers["update"]) >= BATCH_SIZE:
+				flush()
+				if check_control(project_key) == "stopped":
+					save_progress("stopped", "Import Halted by User")
+					return stats
+
+		flush()
+
+		save_progress(phase="Building Task Hierarchy...", percent=95.0)
+		weave_hierarchies(hierarchy_key, project_key)
+		build_hierarchy_from_dependencies(project_key)
+		update_parent_end_dates(project_key)
+		rebuild_task_trees({"issue_key": ["like", f"{project_key}-%"]})
+		frappe.db.commit()
+
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), f"Jira Offline Import Failed: {project_key}")
+		save_progress("failed", "Import Failed (Check Logs)")
+		return stats
+
+	elapsed = time.monotonic() - started
+	stats["elapsed_seconds"] = round(elapsed, 2)
+	stats["issues_per_second"] = round(stats["processed"] / elapsed, 2) if elapsed else 0
+	frappe.logger("jira_offline_import").info({"project_key": project_key, "path": path, **stats})
+
+	save_progress("completed", f"Import Complete ✅ ({stats['issues_per_second']} issues/s)", 100.0)
+	return stats
+
+
+@frappe.whitelist()
+def start_offline_import(project_key, path, use_bulk=1):
+	"""API: Import a Jira export stored under private/jira_exports (System Manager only)"""
+	frappe.only_for("System Manager")
+	resolve_export_path(path)
+
+	frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "running")
+	frappe.enqueue(
+		"erpnext_agile.jira_offline_import.run_offline_import",
+		queue="long",
+		timeout=14400,
+		project_key=project_key,
+		path=path,
+		use_bulk=use_bulk,
+	)
+	return "Offline import started in background"
@@ -0,0 +1,327 @@
+# erpnext_agile/jira_retry.py
+"""
+Retry queue for failed Jira issues
+Failed issue keys wait in a Redis list, next to a hash with the classified
+reason of their last failure. A retry pops the list in chunks, refetches each
+chunk with a single `key in (...)` search and writes through the same memoized
+resolver and bulk flush path as the migration engine. Permanent failures
+(deleted issues, validation errors, too many attempts) leave the queue.
+"""
+
+import json
+
+import frappe
+import requests
+from frappe.utils import now_datetime
+
+from erpnext_agile.jira_client import start_client_run
+from erpnext_agile.jira_subresources import SubResourceFetcher, fetch_watcher_emails
+from erpnext_agile.jira_sync import (
+	IssueKeyIndex,
+	JiraReferenceResolver,
+	_flush_inserts,
+	_flush_updates,
+	build_task_dict_from_jira,
+	get_sync_fields,
+	has_comments,
+	issue_content_hash,
+	process_attachments_queue,
+	process_changelog_queue,
+	process_comments_queue,
+	process_worklogs_queue,
+	update_parent_end_dates,
+	weave_hierarchies,
+)
+from erpnext_agile.migration_progress import get_reporter
+from erpnext_agile.task_tree import rebuild_task_trees
+
+CHUNK_SIZE = 50  # issue keys per search; keeps the JQL well below URL/body limits
+MAX_ATTEMPTS = 3
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+PERMANENT_HTTP_STATUSES = {400, 403, 404, 410}
+
+
+def failure_queue_key(project_key):
+	return f"jira_migration_failures_{project_key}"
+
+
+def failure_reasons_key(project_key):
+	return f"jira_migration_failure_reasons_{project_key}"
+
+
+def _decode(value):
+	return value.decode() if isinstance(value, bytes) else value
+
+
+# ============================================
+# CLASSIFICATION
+# ============================================
+
+
+def classify_failure(exc):
+	"""(reason, category) of an exception raised while fetching or writing an issue"""
+	if isinstance(exc, requests.HTTPError) and exc.response is not None:
+		status = exc.response.status_code
+		return f"http_{status}", PERMANENT if status in PERMANENT_HTTP_STATUSES else TRANSIENT
+	if isinstance(exc, requests.Timeout | requests.ConnectionError):
+		return "network", TRANSIENT
+	if isinstance(exc, frappe.QueryDeadlockError | frappe.QueryTimeoutError):
+		return "database", TRANSIENT
+	if isinstance(exc, frappe.ValidationError | frappe.DuplicateEntryError):
+		return "validation", PERMANENT
+	return "error", TRANSIENT
+
+
+def read_failure_reasons(project_key, jira_keys=None):
+	"""Stored failure reasons, all of them or only those of `jira_keys`"""
+	key = frappe.cache().make_key(failure_reasons_key(project_key))
+	if jira_keys is None:
+		raw = frappe.cache().execute_command("HGETALL", key) or {}
+		return {_decode(k): json.loads(_decode(v)) for k, v in raw.items()}
+
+	jira_keys = list(jira_keys)
+	if not jira_keys:
+		return {}
+	values = frappe.cache().execute_command("HMGET", key, *jira_keys) or []
+	return {k: json.loads(_decode(v)) for k, v in zip(jira_keys, values, strict=True) if v}
+
+
+def record_failure(project_key, jira_key, exc=None, reason=None, category=None):
+	"""
+	Store why `jira_key` failed and queue it for a retry unless the failure is
+	permanent. Issues that keep failing become permanent after MAX_ATTEMPTS.
+	"""
+	if exc is not None and not reason:
+		reason, category = classify_failure(exc)
+	reason = reason or "error"
+	category = category or TRANSIENT
+
+	previous = read_failure_reasons(project_key, [jira_key]).get(jira_key) or {}
+	attempts = (previous.get("attempts") or 0) + 1
+	if category == TRANSIENT and attempts >= MAX_ATTEMPTS:
+		category = PERMANENT
+
+	entry = {
+		"reason": reason,
+		"category": category,
+		"message": str(exc)[:500] if exc is not None else "",
+		"attempts": attempts,
+		"at": str(now_datetime()),
+	}
+	frappe.cache().execute_command(
+		"HSET", frappe.cache().make_key(failure_reasons_key(project_key)), jira_key, json.dumps(entry)
+	)
+	if category != PERMANENT:
+		frappe.cache().rpush(failure_queue_key(project_key), jira_key)
+	return entry
+
+
+def clear_failure(project_key, jira_keys):
+	if jira_keys:
+		frappe.cache().execute_command(
+			"HDEL", frappe.cache().make_key(failure_reasons_key(project_key)), *jira_keys
+		)
+
+
+def clear_failures(project_key):
+	frappe.cache().delete_value(failure_queue_key(project_key))
+	frappe.cache().delete_value(failure_reasons_key(project_key))
+
+
+def pop_failed_keys(project_key, count):
+	"""Take up to `count` keys from the head of the failure queue in one transaction"""
+	key = frappe.cache().make_key(failure_queue_key(project_key))
+	pipe = frappe.cache().pipeline()
+	pipe.lrange(key, 0, count - 1)
+	pipe.ltrim(key, count, -1)
+	keys, _trimmed = pipe.execute()
+	return list(dict.fromkeys(_decode(k) for k in keys or []))
+
+
+# ============================================
+# FETCH
+# ============================================
+
+
+def fetch_issues_by_key(client, domain, auth, jira_keys, fields):
+	"""
+	One search for a chunk of issue keys. `validateQuery: warn` turns keys
+	that no longer exist into warnings instead of failing the whole query.
+	"""
+	res = client.post(
+		f"{domain}/rest/api/2/search",
+		json={
+			"jql": f"key in ({', '.join(jira_keys)})",
+			"expand": ["names"],
+			"fields": fields,
+			"maxResults": len(jira_keys),
+			"validateQuery": "warn",
+		},
+		auth=auth,
+	)
+	res.raise_for_status()
+	return res.json()
+
+
+# ============================================
+# RETRY ENGINE
+# ============================================
+
+
+def run_failed_retry(project_key):
+	"""Reprocess the queued failed issues of a project in chunks"""
+	settings = frappe.get_single("Jira Data Migration Tool")
+	jira_domain = settings.jira_domain
+	auth = (settings.jira_email, settings.jira_api_token)
+	use_bulk = bool(settings.use_bulk_import)
+	issue_index = IssueKeyIndex(project_key)
+	resolver = JiraReferenceResolver(issue_index)
+	client = start_client_run(jira_domain, auth)
+	fetcher = SubResourceFetcher(jira_domain, auth)
+	fields = get_sync_fields(client, jira_domain, auth)
+	progress = get_reporter(project_key, jira_domain)
+
+	hierarchy_key = f"jira_retry_hierarchy_{project_key}"
+	frappe.cache().delete_value(hierarchy_key)
+
+	# Keys failing again are appended to the tail; only the entries queued now are taken
+	queued = frappe.cache().llen(failure_queue_key(project_key)) or 0
+	stats = {"retried": 0, "recovered": 0, "failed": 0, "skipped": 0}
+	attachments_buf, worklogs_buf, comments_buf, changelog_buf = [], [], [], []
+	has_hierarchy = False
+	taken = 0
+
+	progress.update(status="running", phase="Retrying Failed Issues...", percent=0)
+
+	try:
+		while taken < queued:
+			chunk = min(CHUNK_SIZE, queued - taken)
+			jira_keys = pop_failed_keys(project_key, chunk)
+			if not jira_keys:
+				break
+			taken += chunk
+
+			reasons = read_failure_reasons(project_key, jira_keys)
+			permanent = [k for k in jira_keys if (reasons.get(k) or {}).get("category") == PERMANENT]
+			jira_keys = [k for k in jira_keys if k not in permanent]
+			stats["skipped"] += len(permanent)
+			if not jira_keys:
+				continue
+
+			stats["retried"] += len(jira_keys)
+			try:
+				data = fetch_issues_by_key(client, jira_domain, auth, jira_keys, fields)
+			except Exception as e:
+				frappe.log_error(frappe.get_traceback(), f"Jira Retry Fetch Failed: {project_key}")
+				for jira_key in jira_keys:
+					record_failure(project_key, jira_key, e)
+				stats["failed"] += len(jira_keys)
+				continue
+
+			issues = data.get("issues", [])
+			names_map = data.get("names", {})
+			found = {issue.get("key") for issue in issues}
+			failures = {k: None for k in jira_keys if k not in found}
+			for jira_key in failures:
+				record_failure(project_key, jira_key, reason="not_found", category=PERMANENT)
+
+			raw_watcher_emails_map = fetch_watcher_emails(fetcher, issues)
+			insert_buf, update_buf = [], []
+
+			for issue in issues:
+				jira_key = issue.get("key")
+				try:
+					task_dict, dyn_fields, attachments, worklogs = build_task_dict_from_jira(
+						issue, jira_domain, auth, names_map, resolver
+					)
+					task_dict["custom_jira_content_hash"] = issue_content_hash(issue)
+					task_dict["watchers"] = [
+						{"user": resolver.user(email)} for email in raw_watcher_emails_map.get(jira_key, [])
+					]
+
+					if jira_key in issue_index:
+						update_buf.append({"name": issue_index.get(jira_key), "data": task_dict})
+					else:
+						insert_buf.append(task_dict)
+
+					if attachments:
+						attachments_buf.append({"jira_key": jira_key, "attachments": attachments})
+					if worklogs:
+						worklogs_buf.append({"jira_key": jira_key, "worklogs": worklogs})
+					if has_comments(issue):
+						comments_buf.append({"jira_key": jira_key})
+					if settings.import_changelog:
+						changelog_buf.append({"jira_key": jira_key})
+
+					parent_data = (issue.get("fields") or {}).get("parent")
+					std_parent = (
+						parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
+					)
+					target_parent = std_parent or dyn_fields.get("epic_link") or dyn_fields.get("parent_link")
+					if target_parent:
+						frappe.cache().hset(hierarchy_key, jira_key, target_parent)
+						has_hierarchy = True
+
+				except Exception as e:
+					frappe.log_error(frappe.get_traceback(), f"Retry Failed: {jira_key}")
+					failures[jira_key] = e
+					record_failure(project_key, jira_key, e)
+
+			resolver.flush()
+			write_failures = {}
+			_flush_inserts(insert_buf, use_bulk, issue_index, failures=write_failures)
+			_flush_updates(update_buf, failures=write_failures)
+			for jira_key, exc in write_failures.items():
+				failures[jira_key] = exc
+				record_failure(project_key, jira_key, exc)
+
+			recovered = [k for k in found if k not in failures]
+			clear_failure(project_key, recovered)
+			stats["recovered"] += len(recovered)
+			stats["failed"] += len(failures)
+
+			progress.update(
+				phase=f"Retrying Failed Issues ({taken}/{queued})...",
+				percent=round(taken / queued * 90, 2) if queued else 0,
+			)
+
+		if attachments_buf:
+			process_attachments_queue(attachments_buf, auth, project_key, issue_index)
+		if worklogs_buf:
+			process_worklogs_queue(worklogs_buf, project_key, issue_index)
+		if comments_buf:
+			process_comments_queue(comments_buf, jira_domain, auth, project_key, issue_index)
+		if changelog_buf:
+			process_changelog_queue(changelog_buf, fetcher, project_key, issue_index)
+
+		if has_hierarchy:
+			weave_hierarchies(hierarchy_key, project_key)
+			update_parent_end_dates(project_key)
+			rebuild_task_trees({"issue_key": ["like", f"{project_key}-%"]})
+		frappe.db.commit()
+
+		progress.update(
+			status="completed",
+			percent=100,
+			phase=f"Retry Complete: {stats['recovered']} recovered, {stats['failed']} failed, "
+			f"{stats['skipped']} permanent",
+		)
+
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), f"Jira Retry Failed: {project_key}")
+		progress.update(status="failed", phase="Retry Failed (Check Logs)")
+	finally:
+		fetcher.close()
+		frappe.cache().delete_value(hierarchy_key)
+
+	return stats
+
+
+@frappe.whitelist()
+def get_failed_issues(project_key):
+	"""API: Failed issue keys of a project with their last failure reason"""
+	return read_failure_reasons(project_key)
@@ -0,0 +1,604 @@
+# erpnext_agile/jira_shard_migration.py
+"""
+Sharded Jira migration
+Splits one project's JQL into created-date or issue key ranges and migrates
+each range in its own `long` worker. Shards share reference lookups and
+issue key claims through Redis and merge their counters into the regular
+migration progress hash. The last shard to finish enqueues a barrier job
+that links dependencies on issues another shard imported and runs the
+secondary phases and the hierarchy build of the regular migration engine.
+Shard state carries a heartbeat and a TTL, so a run whose workers died does
+not lock the project.
+"""
+
+import json
+import time
+from itertools import pairwise
+
+import frappe
+from frappe.utils import cint, get_datetime
+
+from erpnext_agile.jira_client import get_jira_client, start_client_run
+from erpnext_agile.jira_retry import record_failure
+from erpnext_agile.jira_subresources import SubResourceFetcher, fetch_watcher_emails
+from erpnext_agile.jira_sync import (
+	MAX_JOB_RUNTIME,
+	IssueKeyIndex,
+	JiraReferenceResolver,
+	_flush_inserts,
+	_flush_updates,
+	_jira_datetime,
+	build_task_dict_from_jira,
+	check_control,
+	fetch_search_page,
+	get_jira_timezone,
+	get_sync_fields,
+	has_comments,
+	issue_content_hash,
+	iter_dependency_links,
+	iter_search_pages,
+	load_checkpoint,
+	push_phase_item,
+	reset_checkpoint,
+	run_migration_engine,
+	save_checkpoint,
+)
+from erpnext_agile.migration_progress import get_reporter, progress_payload
+
+DEFAULT_SHARDS = 4
+MAX_SHARDS = 16
+BATCH_SIZE = 150
+CLAIM_WAIT = 30  # seconds a shard waits for another shard to create a shared record
+HEARTBEAT_TIMEOUT = 900  # seconds without shard progress before the run counts as dead
+STATE_TTL = 2 * 86400  # shard hashes expire this long after the last progress
+
+STATE_NAMES = ("progress", "claims", "refs", "links")
+
+
+# ============================================
+# SHARED REDIS STATE
+# ============================================
+
+
+def _key(name, project_key):
+	return frappe.cache().make_key(f"jira_shard_{name}_{project_key}")
+
+
+def _redis(command, name, project_key, *args):
+	"""
+	Raw command on one of the shard hashes (progress, claims, refs).
+	Counters and claims are plain Redis values, not pickled like cache values.
+	"""
+	value = frappe.cache().execute_command(command, _key(name, project_key), *args)
+	return value.decode() if isinstance(value, bytes) else value
+
+
+def _counters(project_key):
+	raw = frappe.cache().execute_command("HGETALL", _key("progress", project_key)) or {}
+	return {
+		(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+		for k, v in raw.items()
+	}
+
+
+def _clear_shard_state(project_key):
+	for name in STATE_NAMES:
+		frappe.cache().delete_value(f"jira_shard_{name}_{project_key}")
+
+
+def _beat(project_key):
+	"""Record shard activity and push back the expiry of every shard hash"""
+	pipe = frappe.cache().pipeline()
+	pipe.hset(_key("progress", project_key), "heartbeat", time.time())
+	for name in STATE_NAMES:
+		pipe.expire(_key(name, project_key), STATE_TTL)
+	pipe.execute()
+
+
+def migration_alive(project_key):
+	"""
+	Whether a migration of the project is still making progress: a sharded
+	run with a recent heartbeat, or a regular run whose progress heartbeat
+	has not expired. Runs whose workers were killed count as dead.
+	"""
+	counters = _counters(project_key)
+	if counters:
+		return time.time() - float(counters.get("heartbeat") or 0) < HEARTBEAT_TIMEOUT
+
+	checkpoint = load_checkpoint(project_key)
+	return bool(checkpoint and checkpoint.status == "Running") and (
+		progress_payload(project_key).get("status") == "running"
+	)
+
+
+def claim_issue(project_key, shard_id, issue_key):
+	"""Reserve an issue key for one shard; overlapping ranges never insert the same issue twice"""
+	field = f"issue::{issue_key}"
+	if _redis("HSETNX", "claims", project_key, field, shard_id):
+		return True
+	return _redis("HGET", "claims", project_key, field) == str(shard_id)
+
+
+class SharedReferenceResolver(JiraReferenceResolver):
+	"""
+	Resolver for one shard. Projects, sprints and versions missing from the
+	site are created by whichever shard claims them first; the others wait
+	for the published name instead of racing on the same record.
+	"""
+
+	def __init__(self, project_key, shard_id, issue_index=None):
+		super().__init__(issue_index)
+		self.project_key = project_key
+		self.shard_id = str(shard_id)
+
+	def _create(self, ref, create):
+		name = _redis("HGET", "refs", self.project_key, ref)
+		if name is not None:
+			return name or None
+
+		if _redis("HSETNX", "claims", self.project_key, f"ref::{ref}", self.shard_id):
+			name = create()
+			# Other shards link to the record as soon as its name is published
+			frappe.db.commit()
+			_redis("HSET", "refs", self.project_key, ref, name or "")
+			return name
+
+		deadline = time.monotonic() + CLAIM_WAIT
+		while time.monotonic() < deadline:
+			name = _redis("HGET", "refs", self.project_key, ref)
+			if name is not None:
+				return name or None
+			time.sleep(0.2)
+		return None
+
+
+# ============================================
+# PLANNING
+# ============================================
+
+
+def plan_shards(client, domain, auth, project_key, shards, split_by="created"):
+	"""
+	Split the project JQL into contiguous ranges holding about the same number
+	of issues, using the issue found at each shard's offset as the boundary.
+	Boundaries come from existing issues, so key ranges never reference a
+	deleted key.
+	"""
+	base = f"project = '{project_key}'"
+	field = "key" if split_by == "key" else "created"
+	order = f"ORDER BY {field} ASC"
+
+	total = fetch_search_page(client, domain, auth, f"{base} {order}", 0, 1, ["created"]).get("total", 0)
+	bounds = []
+	for i in range(1, shards if total else 1):
+		issues = (
+			fetch_search_page(
+				client, domain, auth, f"{base} {order}", (total * i) // shards, 1, ["created"]
+			).get("issues")
+			or []
+		)
+		if not issues:
+			continue
+		if field == "key":
+			bounds.append(issues[0]["key"])
+		else:
+			created = _jira_datetime(issues[0]["fields"].get("created"))
+			if created:
+				bounds.append(created.strftime("%Y/%m/%d %H:%M"))
+
+	edges = [None, *dict.fromkeys(bounds), None]
+	jqls = []
+	for low, high in pairwise(edges):
+		clauses = [base]
+		if low:
+			clauses.append(f'{field} >= "{low}"')
+		if high:
+			clauses.append(f'{field} < "{high}"')
+		jqls.append(f"{' AND '.join(clauses)} {order}")
+	return jqls
+
+
+# ============================================
+# PROGRESS
+# ============================================
+
+
+def publish_progress(project_key, status="running", phase="Fetching & Creating Tasks (Sharded)"):
+	"""Merge every shard's counters into the regular migration progress"""
+	_beat(project_key)
+	counters = _counters(project_key)
+	processed = cint(counters.get("processed"))
+	total = sum(cint(v) for k, v in counters.items() if k.startswith("total_"))
+	shards = cint(counters.get("shards"))
+
+	get_reporter(project_key).update(
+		status=status,
+		phase=phase,
+		processed=processed,
+		failed=cint(counters.get("failed")),
+		total=total,
+		percent=min(round((processed / total) * 70, 2), 70) if total else 0,
+		shards={"total": shards, "done": shards - cint(counters.get("remaining"))},
+	)
+
+
+# ============================================
+# COORDINATOR
+# ============================================
+
+
+@frappe.whitelist()
+def start_sharded_migration(project_key, shards=DEFAULT_SHARDS, split_by="created"):
+	"""API: Migrate a project with several workers, one per JQL range"""
+	settings = frappe.get_single("Jira Data Migration Tool")
+	if not settings.is_active:
+		frappe.throw("Jira integration is not active.")
+
+	if migration_alive(project_key):
+		frappe.throw(f"A migration of {project_key} is already running.")
+
+	domain = settings.jira_domain
+	auth = (settings.jira_email, settings.jira_api_token)
+	shards = max(1, min(cint(shards), MAX_SHARDS))
+	jqls = plan_shards(get_jira_client(domain, auth), domain, auth, project_key, shards, split_by)
+
+	reset_checkpoint(project_key)
+	frappe.db.commit()
+
+	_clear_shard_state(project_key)
+	_redis("HSET", "progress", project_key, "shards", len(jqls))
+	_redis("HSET", "progress", project_key, "remaining", len(jqls))
+	_beat(project_key)
+
+	frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "running")
+	get_reporter(project_key).reset(phase=f"Queued in Background ({len(jqls)} shards)...")
+
+	for shard_id, jql in enumerate(jqls):
+		frappe.enqueue(
+			"erpnext_agile.jira_shard_migration.run_migration_shard",
+			queue="long",
+			timeout=7200,
+			project_key=project_key,
+			shard_id=shard_id,
+			jql=jql,
+			max_runtime=MAX_JOB_RUNTIME,
+		)
+
+	return f"Migration started in {len(jqls)} shards"
+
+
+@frappe.whitelist()
+def reset_sharded_migration(project_key):
+	"""API: Abandon a sharded run whose workers died and unlock the project"""
+	frappe.only_for("System Manager")
+
+	# Workers that are still alive stop at their next page
+	frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "stopped")
+	_clear_shard_state(project_key)
+
+	checkpoint = load_checkpoint(project_key)
+	if checkpoint and checkpoint.status == "Running":
+		save_checkpoint(project_key, status="Stopped")
+		frappe.db.commit()
+	get_reporter(project_key).update(status="stopped", phase="Sharded Migration Reset")
+	return f"Sharded migration state of {project_key} cleared"
+
+
+def finish_shard(project_key, shard_id, failed=False):
+	"""Barrier: the last shard to finish enqueues the final phases"""
+	if failed:
+		_redis("HINCRBY", "progress", project_key, "failed_shards", 1)
+	remaining = _redis("HINCRBY", "progress", project_key, "remaining", -1)
+	publish_progress(project_key)
+
+	if remaining == 0:
+		frappe.enqueue(
+			"erpnext_agile.jira_shard_migration.finish_sharded_migration",
+			queue="long",
+			timeout=7200,
+			project_key=project_key,
+		)
+
+
+def finish_sharded_migration(project_key):
+	"""Barrier job: record the merged task phase and let the engine run the remaining phases"""
+	counters = _counters(project_key)
+
+	if check_control(project_key) == "stopped":
+		save_checkpoint(project_key, status="Stopped")
+		frappe.db.commit()
+		publish_progress(project_key, "stopped", "Migration Halted by User")
+		_clear_shard_state(project_key)
+		return
+
+	if cint(counters.get("failed_shards")):
+		save_checkpoint(project_key, status="Failed")
+		frappe.db.commit()
+		publish_progress(project_key, "failed", "Shard Failed (Check Logs)")
+		_clear_shard_state(project_key)
+		return
+
+	link_pending_dependencies(project_key)
+
+	watermarks = [v for k, v in counters.items() if k.startswith("watermark_") and v]
+	save_checkpoint(
+		project_key,
+		status="Running",
+		processed=cint(counters.get("processed")),
+		failed=cint(counters.get("failed")),
+		total=sum(cint(v) for k, v in counters.items() if k.startswith("total_")),
+		updated_watermark=max(watermarks) if watermarks else None,
+		tasks_phase="Completed",
+	)
+	frappe.db.commit()
+	_clear_shard_state(project_key)
+
+	run_migration_engine(project_key, resume=True, max_runtime=MAX_JOB_RUNTIME)
+
+
+def link_pending_dependencies(project_key):
+	"""
+	Add the depends_on rows a shard could not resolve because the issue they
+	point to was imported by another shard, once every shard has finished.
+	"""
+	raw = frappe.cache().execute_command("HGETALL", _key("links", project_key)) or {}
+	pending = {
+		(k.decode() if isinstance(k, bytes) else k): json.loads(v.decode() if isinstance(v, bytes) else v)
+		for k, v in raw.items()
+	}
+	if not pending:
+		return 0
+
+	keys = set(pending) | {dep for deps in pending.values() for dep in deps}
+	tasks = {
+		row.issue_key: row
+		for row in frappe.get_all(
+			"Task",
+			filters={"issue_key": ["in", list(keys)]},
+			fields=["name", "issue_key", "subject", "project"],
+		)
+	}
+	parents = [tasks[k].name for k in pending if k in tasks]
+	if not parents:
+		return 0
+
+	existing, last_idx = set(), {}
+	for parent, task, idx in frappe.db.sql(
+		"""
+        SELECT parent, task, idx FROM `tabTask Depends On`
+        WHERE parenttype = 'Task' AND parentfield = 'depends_on' AND parent IN %s
+    """,
+		[parents],
+	):
+		existing.add((parent, task))
+		last_idx[parent] = max(last_idx.get(parent, 0), cint(idx))
+
+	now = frappe.utils.now()
+	user = frappe.session.user
+	rows = []
+	for issue_key, deps in pending.items():
+		parent = tasks.get(issue_key)
+		if not parent:
+			continue
+		for dep_key in deps:
+			dep = tasks.get(dep_key)
+			if not dep or dep.name == parent.name or (parent.name, dep.name) in existing:
+				continue
+			existing.add((parent.name, dep.name))
+			last_idx[parent.name] = last_idx.get(parent.name, 0) + 1
+			rows.append(
+				(
+					frappe.generate_hash(length=10),
+					now,
+					now,
+					user,
+					user,
+					parent.name,
+					"depends_on",
+					"Task",
+					last_idx[parent.name],
+					dep.name,
+					dep.subject,
+					dep.project,
+				)
+			)
+
+	if rows:
+		frappe.db.bulk_insert(
+			"Task Depends On",
+			fields=[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"parent",
+				"parentfield",
+				"parenttype",
+				"idx",
+				"task",
+				"subject",
+				"project",
+			],
+			values=rows,
+		)
+		# Keep Task.depends_on_tasks in step with the rows, as Task.validate would
+		frappe.db.sql(
+			"""
+            UPDATE `tabTask` p
+            INNER JOIN (
+                SELECT parent, GROUP_CONCAT(DISTINCT task ORDER BY task SEPARATOR ',') AS tasks
+                FROM `tabTask Depends On`
+                WHERE parenttype = 'Task' AND parentfield = 'depends_on' AND parent IN %(parents)s
+                GROUP BY parent
+            ) deps ON deps.parent = p.name
+            SET p.depends_on_tasks = CONCAT(deps.tasks, ',')
+        """,
+			{"parents": list({row[5] for row in rows})},
+		)
+	frappe.db.commit()
+	return len(rows)
+
+
+# ============================================
+# SHARD WORKER
+# ============================================
+
+
+def run_migration_shard(project_key, shard_id, jql, max_runtime=None):
+	"""Phase 1 of the migration engine for one JQL range"""
+	settings = frappe.get_single("Jira Data Migration Tool")
+	jira_domain = settings.jira_domain
+	auth = (settings.jira_email, settings.jira_api_token)
+	use_bulk = bool(settings.use_bulk_import)
+	issue_index = IssueKeyIndex(project_key)
+	resolver = SharedReferenceResolver(project_key, shard_id, issue_index)
+	fetcher = SubResourceFetcher(jira_domain, auth)
+
+	redis_hierarchy_key = f"jira_hierarchy_{project_key}"
+
+	start_at = cint(_redis("HGET", "progress", project_key, f"start_at_{shard_id}"))
+	watermark = _redis("HGET", "progress", project_key, f"watermark_{shard_id}") or None
+	job_start = time.monotonic()
+	counts = {"processed": 0, "failed": 0}
+	insert_buf = []
+	update_buf = []
+
+	def flush():
+		"""Write buffered tasks, then publish this shard's position and counters"""
+		resolver.flush()
+		counts["failed"] += _flush_inserts(insert_buf, use_bulk, issue_index)
+		counts["failed"] += _flush_updates(update_buf)
+		insert_buf.clear()
+		update_buf.clear()
+
+		for field, value in counts.items():
+			if value:
+				_redis("HINCRBY", "progress", project_key, field, value)
+		counts.update({"processed": 0, "failed": 0})
+		_redis("HSET", "progress", project_key, f"start_at_{shard_id}", start_at)
+		if watermark:
+			_redis("HSET", "progress", project_key, f"watermark_{shard_id}", str(watermark))
+		publish_progress(project_key)
+
+	try:
+		# Every shard worker gets its share of the site's rate limit
+		client = start_client_run(
+			jira_domain, auth, workers=cint(_redis("HGET", "progress", project_key, "shards")) or 1
+		)
+		pages = iter_search_pages(
+			client,
+			jira_domain,
+			auth,
+			jql,
+			start_at=start_at,
+			fields=get_sync_fields(client, jira_domain, auth),
+		)
+		jira_tz = get_jira_timezone(client, jira_domain, auth)
+
+		for data in pages:
+			issues = data.get("issues", [])
+			if not issues:
+				break
+			_redis("HSET", "progress", project_key, f"total_{shard_id}", data.get("total", 0))
+			_beat(project_key)
+
+			if check_control(project_key) == "stopped":
+				pages.close()
+				flush()
+				finish_shard(project_key, shard_id)
+				return
+
+			names_map = data.get("names", {})
+			raw_watcher_emails_map = fetch_watcher_emails(fetcher, issues)
+
+			for issue in issues:
+				jira_key = issue.get("key")
+				fields = issue.get("fields", {})
+				content_hash = issue_content_hash(issue)
+				if jira_key in issue_index and issue_index.hashes.get(jira_key) == content_hash:
+					counts["processed"] += 1
+					continue
+				if jira_key not in issue_index and not claim_issue(project_key, shard_id, jira_key):
+					continue
+
+				try:
+					task_dict, dyn_fields, attachments, worklogs = build_task_dict_from_jira(
+						issue, jira_domain, auth, names_map, resolver
+					)
+					task_dict["custom_jira_content_hash"] = content_hash
+					task_dict["watchers"] = [
+						{"user": resolver.user(email)} for email in raw_watcher_emails_map.get(jira_key, [])
+					]
+
+					if jira_key in issue_index:
+						update_buf.append({"name": issue_index.get(jira_key), "data": task_dict})
+					else:
+						insert_buf.append(task_dict)
+
+					# Issues of a later range (or another shard's page) are linked by the barrier job
+					pending = [
+						dep_key
+						for dep_key, _summary in iter_dependency_links(fields.get("issuelinks"), jira_key)
+						if dep_key not in issue_index
+					]
+					if pending:
+						_redis("HSET", "links", project_key, jira_key, json.dumps(pending))
+
+					if attachments:
+						push_phase_item(
+							"attachments", project_key, {"jira_key": jira_key, "attachments": attachments}
+						)
+					if worklogs:
+						push_phase_item("worklogs", project_key, {"jira_key": jira_key, "worklogs": worklogs})
+					if has_comments(issue):
+						push_phase_item("comments", project_key, {"jira_key": jira_key})
+					if settings.import_changelog:
+						push_phase_item("changelog", project_key, {"jira_key": jira_key})
+
+					parent_data = fields.get("parent")
+					std_parent = (
+						parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
+					)
+					target_parent = std_parent or dyn_fields.get("epic_link") or dyn_fields.get("parent_link")
+					if target_parent:
+						frappe.cache().hset(redis_hierarchy_key, jira_key, target_parent)
+
+					updated = _jira_datetime(fields.get("updated"), jira_tz)
+					if updated and (not watermark or updated > get_datetime(watermark)):
+						watermark = updated
+
+					counts["processed"] += 1
+
+				except Exception as e:
+					frappe.log_error(frappe.get_traceback(), f"Issue Processing Failed: {jira_key}")
+					counts["failed"] += 1
+					record_failure(project_key, jira_key, e)
+
+			start_at += len(issues)
+
+			if len(insert_buf) + len(update_buf) >= BATCH_SIZE:
+				flush()
+
+				if max_runtime and (time.monotonic() - job_start) > max_runtime:
+					pages.close()
+					frappe.enqueue(
+						"erpnext_agile.jira_shard_migration.run_migration_shard",
+						queue="long",
+						timeout=7200,
+						project_key=project_key,
+						shard_id=shard_id,
+						jql=jql,
+						max_runtime=max_runtime,
+					)
+					return
+
+		flush()
+		finish_shard(project_key, shard_id)
+
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), f"Jira Migration Shard Failed: {project_key} #{shard_id}")
+		frappe.db.rollback()
+		finish_shard(project_key, shard_id, failed=True)
+	finally:
+		fetcher.close()
@@ -0,0 +1,162 @@
+# erpnext_agile/jira_subresources.py
+"""
+Per-issue Jira sub-resource fetching
+Watchers and changelogs are not part of the search payload and need one
+call per issue. A fetcher lives for a whole migration run: requests
+go through the pooled, rate limited Jira client on a fixed set of threads,
+paginated resources are followed to the end, identical requests from
+different pages share one call and failures are counted instead of being
+swallowed.
+"""
+
+import threading
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+from erpnext_agile.jira_client import get_jira_client
+
+FETCH_WORKERS = 10
+RESULT_CACHE = 2000  # finished results kept for requests repeated by later pages
+PAGE_SIZE = 100
+
+# path below /issue/{key}/, key of the item list in the response (None: the response is the list)
+Resource = namedtuple("Resource", "path items paginated")
+
+RESOURCES = {
+	"watchers": Resource("watchers", "watchers", False),
+	"changelog": Resource("changelog", "values", True),
+}
+
+
+class SubResourceFetcher:
+	"""Thread pool of sub-resource requests shared by every page of a run"""
+
+	def __init__(self, domain, auth, workers=FETCH_WORKERS):
+		self.domain = domain
+		self.auth = auth
+		self.client = get_jira_client(domain, auth)
+		self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jira-subresource")
+		self._lock = threading.Lock()
+		self._pending = {}  # (resource, key) -> Future
+		self._done = OrderedDict()  # (resource, key) -> items
+		self.requests = Counter()
+		self.failures = Counter()
+		self.coalesced = 0
+		self.errors = deque(maxlen=20)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	# ============================================
+	# REQUESTS
+	# ============================================
+
+	def submit(self, resource, keys):
+		"""Start fetching `resource` for `keys`; keys already requested are not fetched twice"""
+		with self._lock:
+			for key in keys:
+				ref = (resource, key)
+				if ref in self._pending or ref in self._done:
+					self.coalesced += 1
+					continue
+				self._pending[ref] = self._pool.submit(self._fetch, resource, key)
+
+	def fetch(self, resource, keys):
+		"""Items of `resource` for each key; None for keys whose request failed"""
+		keys = list(dict.fromkeys(k for k in keys if k))
+		self.submit(resource, keys)
+
+		result = {}
+		for key in keys:
+			ref = (resource, key)
+			with self._lock:
+				future = self._pending.get(ref)
+				if future is None and ref in self._done:
+					self._done.move_to_end(ref)
+					result[key] = self._done[ref]
+					continue
+				if future is None:
+					# Evicted from the result cache since submit()
+					future = self._pending[ref] = self._pool.submit(self._fetch, resource, key)
+			items = future.result()
+			with self._lock:
+				self._pending.pop(ref, None)
+				if items is not None:
+					self._done[ref] = items
+					while len(self._done) > RESULT_CACHE:
+						self._done.popitem(last=False)
+			result[key] = items
+		return result
+
+	def _fetch(self, resource, key):
+		"""Worker thread: every item of one issue's sub-resource, following pagination"""
+		spec = RESOURCES[resource]
+		url = f"{self.domain}/rest/api/2/issue/{key}/{spec.path}"
+		items, start_at = [], 0
+		try:
+			while True:
+				params = {"startAt": start_at, "maxResults": PAGE_SIZE} if spec.paginated else None
+				with self._lock:
+					self.requests[resource] += 1
+				res = self.client.get(url, params=params, auth=self.auth)
+				res.raise_for_status()
+				data = res.json()
+
+				page = data if spec.items is None else (data.get(spec.items) or [])
+				items.extend(page)
+				if not spec.paginated:
+					return items
+
+				start_at += len(page)
+				if not page or data.get("isLast") or start_at >= (data.get("total") or 0):
+					return items
+		except Exception as e:
+			with self._lock:
+				self.failures[resource] += 1
+				self.errors.append(f"{resource} {key}: {e}")
+			return None
+
+	# ============================================
+	# LIFECYCLE
+	# ============================================
+
+	def stats(self):
+		with self._lock:
+			return {
+				"requests": dict(self.requests),
+				"failures": dict(self.failures),
+				"coalesced": self.coalesced,
+			}
+
+	def close(self):
+		"""Stop the threads and log the failures of the run, if any"""
+		self._pool.shutdown(wait=True, cancel_futures=True)
+		if self.failures:
+			frappe.log_error(
+				f"{self.stats()}\n\n" + "\n".join(self.errors), "Jira Sub-resource Fetch Failures"
+			)
+
+
+# ============================================
+# WATCHERS
+# ============================================
+
+
+def has_watchers(issue):
+	"""Use the search payload's watches.watchCount to skip the watchers call for unwatched issues"""
+	watches = (issue.get("fields") or {}).get("watches")
+	return not isinstance(watches, dict) or (watches.get("watchCount") or 0) > 0
+
+
+def fetch_watcher_emails(fetcher, issues):
+	"""issue key -> watcher email addresses for the issues of a search page"""
+	result = {issue.get("key"): [] for issue in issues}
+	keys = [issue.get("key") for issue in issues if has_watchers(issue)]
+	for key, watchers in fetcher.fetch("watchers", keys).items():
+		result[key] = [w.get("emailAddress") for w in watchers or [] if w.get("emailAddress")]
+	return result
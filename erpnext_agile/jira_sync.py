@@ -1,11 +1,22 @@
 import frappe
-import requests
 import json
 import time
 import re
+import os
+import hashlib
+import threading
 from frappe.utils import getdate, now_datetime, get_datetime
+from collections import deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from frappe.utils.nestedset import rebuild_tree
+from urllib.parse import urlparse
+from erpnext_agile.adf_renderer import render_adf
+from erpnext_agile.jira_client import JiraClient, get_jira_client, start_client_run
+from erpnext_agile.jira_subresources import SubResourceFetcher, fetch_watcher_emails
+from erpnext_agile.migration_progress import get_reporter, progress_payload
+from erpnext_agile.task_diff import HASH_FIELDS, TaskDiffer, needs_save
+from erpnext_agile.task_tree import rebuild_task_trees
 
 try:
     from rq import get_current_job as _rq_get_current_job
@@ -13,41 +24,6 @@ except ImportError:
     _rq_get_current_job = None
 
 
-CHILD_TABLE_FIELDS = {
-    "assigned_to_users": "user",
-    "watchers": "user",
-    "custom_components": "component",
-    "custom_labels": "label",
-    "custom_fix_versions": "version",
-    "custom_affect_versions": "version",
-    "depends_on": "task",
-}
-
-def _table_signature(rows, key):
-    sig = []
-    for row in rows or []:
-        if isinstance(row, dict):
-            val = row.get(key)
-        else:
-            val = getattr(row, key, None)
-        if val:
-            sig.append(str(val).strip())
-    return sorted(set(sig))
-
-def _get_changes(doc, incoming):
-    changes = {}
-    for field, value in incoming.items():
-        current = doc.get(field)
-        if field in CHILD_TABLE_FIELDS:
-            key = CHILD_TABLE_FIELDS[field]
-            if _table_signature(current, key) != _table_signature(value, key):
-                changes[field] = value
-        else:
-            if json.dumps(current, sort_keys=True, default=str) != json.dumps(value, sort_keys=True, default=str):
-                changes[field] = value
-    return changes
-
-
 # ──────────────────────────────────────────────
 # RQ JOB PROGRESS HELPERS
 # ──────────────────────────────────────────────
@@ -106,14 +82,15 @@ def verify_connection():
         )
 
     try:
-        res = None
+        res    = None
+        client = JiraClient(domain, max_retries=2)
         if "atlassian.net" in domain:
-            res = requests.get(url, headers=base_headers, auth=(email, token))
+            res = client.get(url, headers=base_headers, auth=(email, token))
         else:
             headers = {**base_headers, "Authorization": f"Bearer {token}"}
-            res = requests.get(url, headers=headers)
+            res = client.get(url, headers=headers)
             if res.status_code == 401:
-                res = requests.get(url, headers=base_headers, auth=(email, token))
+                res = client.get(url, headers=base_headers, auth=(email, token))
 
         if res.status_code == 401:
             frappe.throw("❌ 401 Unauthorized → Invalid credentials or SSO blocking API")
@@ -138,32 +115,33 @@ def verify_connection():
 # MIGRATION ENTRY POINTS
 # ──────────────────────────────────────────────
 
+# A single job is capped by the RQ timeout; hand over to a fresh job before it hits
+MAX_JOB_RUNTIME = 6000
+
 @frappe.whitelist()
-def start_migration(project_key):
+def start_migration(project_key, resume=1):
+    # Continue an unfinished run from its checkpoint unless a fresh start is requested
+    checkpoint = load_checkpoint(project_key)
+    resume     = bool(int(resume)) and bool(checkpoint) and checkpoint.status != "Completed"
+
     # Reset control state
     frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "running")
 
-    # Initialize the reliable cache state manually before the worker even starts
-    initial_state = {
-        "project_key": project_key,
-        "status": "running",
-        "phase": "Queued in Background...",
-        "percent": 0.0,
-        "processed": 0,
-        "failed": 0,
-        "total": 0,
-        "start_time": str(now_datetime()),
-        "last_heartbeat": str(now_datetime())
-    }
-    frappe.cache().set_value(f"jira_migration_state_{project_key}", initial_state, expires_in_sec=86400)
+    # Initialize the progress hash before the worker even starts
+    get_reporter(project_key).reset(
+        phase="Queued in Background...",
+        processed=checkpoint.processed if resume else 0,
+        failed=checkpoint.failed if resume else 0,
+        total=checkpoint.total if resume else 0,
+    )
 
     frappe.enqueue(
         'erpnext_agile.jira_sync.run_migration_engine',
         queue='long', timeout=7200,
-        project_key=project_key
+        project_key=project_key, resume=resume, max_runtime=MAX_JOB_RUNTIME
     )
     
-    return "Migration started in background"
+    return "Migration resumed from checkpoint" if resume else "Migration started in background"
 
 
 # ──────────────────────────────────────────────
@@ -216,67 +194,31 @@ def extract_description(desc):
     if isinstance(desc, str):
         return desc
     if isinstance(desc, dict) and desc.get("type") == "doc":
-        return _adf_to_html(desc)
+        return render_adf(desc)
     return str(desc)
 
 
-def _adf_to_html(node):
-    if not node:
-        return ""
-    node_type  = node.get("type", "")
-    content    = node.get("content", [])
-    text       = node.get("text", "")
-    attrs      = node.get("attrs", {})
-    child_html = "".join(_adf_to_html(c) for c in content)
-
-    mapping = {
-        "doc":        child_html,
-        "paragraph":  f"<p>{child_html}</p>",
-        "text":       _apply_adf_marks(text, node.get("marks", [])),
-        "bulletList": f"<ul>{child_html}</ul>",
-        "orderedList":f"<ol>{child_html}</ol>",
-        "listItem":   f"<li>{child_html}</li>",
-        "heading":    f"<h{attrs.get('level', 2)}>{child_html}</h{attrs.get('level', 2)}>",
-        "codeBlock":  f"<pre><code>{child_html}</code></pre>",
-        "blockquote": f"<blockquote>{child_html}</blockquote>",
-        "hardBreak":  "<br>",
-        "rule":       "<hr>",
-        "mention":    f"@{attrs.get('text', attrs.get('id', ''))}",
-        "inlineCard": f'<a href="{attrs.get("url", "")}">{attrs.get("url", "")}</a>',
-    }
-    return mapping.get(node_type, child_html or text)
-
-
-def _apply_adf_marks(text, marks):
-    for mark in marks:
-        t = mark.get("type", "")
-        if   t == "strong":    text = f"<strong>{text}</strong>"
-        elif t == "em":        text = f"<em>{text}</em>"
-        elif t == "code":      text = f"<code>{text}</code>"
-        elif t == "underline": text = f"<u>{text}</u>"
-        elif t == "strike":    text = f"<s>{text}</s>"
-        elif t == "link":
-            href = mark.get("attrs", {}).get("href", "")
-            text = f'<a href="{href}">{text}</a>'
-    return text
-
-
 # ──────────────────────────────────────────────
 # TASK BUILDER
 # ──────────────────────────────────────────────
 
-def build_task_dict_from_jira(issue, domain, auth, names_map):
+def build_task_dict_from_jira(issue, domain, auth, names_map, resolver=None):
     fields   = issue.get("fields", {})
     jira_key = issue.get("key")
 
-    proj_name   = resolve_project(fields.get("project"))
+    # Batch callers share one resolver and flush it before saving; single issues flush here
+    own_resolver = resolver is None
+    resolver     = resolver or JiraReferenceResolver()
+    resolve_user = resolver.user
+
+    proj_name   = resolver.project(fields.get("project"))
     dyn         = resolve_dynamic_fields(fields, names_map)
-    sprint_name = resolve_sprint(dyn["sprint_data"], proj_name)
+    sprint_name = resolver.sprint(dyn["sprint_data"], proj_name)
 
-    fix_versions_table    = resolve_version_table(fields.get("fixVersions"), proj_name)
-    affect_versions_table = resolve_version_table(fields.get("versions"),    proj_name)
-    components_table      = resolve_components(fields.get("components"))
-    labels_table          = resolve_labels(fields.get("labels"))
+    fix_versions_table    = resolver.versions(fields.get("fixVersions"), proj_name)
+    affect_versions_table = resolver.versions(fields.get("versions"),    proj_name)
+    components_table      = resolver.components(fields.get("components"))
+    labels_table          = resolver.labels(fields.get("labels"))
 
     creator_email  = (fields.get("creator")  or {}).get("emailAddress", "Administrator")
     assignee_email = (fields.get("assignee") or {}).get("emailAddress")
@@ -309,7 +251,7 @@ def build_task_dict_from_jira(issue, domain, auth, names_map):
     time_spent     = fields.get("timespent")            or 0
     agg_time_spent = fields.get("aggregatetimespent")   or 0
 
-    depends_on = resolve_issue_links(fields.get("issuelinks", []), jira_key)
+    depends_on = resolve_issue_links(fields.get("issuelinks", []), jira_key, resolver.tasks)
 
     task_payload = {
         "doctype":   "Task",
@@ -359,6 +301,9 @@ def build_task_dict_from_jira(issue, domain, auth, names_map):
     attachments = fields.get("attachment", [])
     worklogs    = fields.get("worklog", {}).get("worklogs", [])
 
+    if own_resolver:
+        resolver.flush()
+
     return task_payload, dyn, attachments, worklogs
 
 
@@ -374,138 +319,647 @@ def _map_jira_status(raw):
 
 
 # ──────────────────────────────────────────────
-# THE MIGRATION ENGINE (STATE MACHINE)
+# PAGE PIPELINE (Prefetch pages while the DB side writes)
+# ──────────────────────────────────────────────
+
+SEARCH_PAGE_SIZE = 100
+PREFETCH_PAGES   = 4
+
+# Standard fields read by build_task_dict_from_jira and the background phases
+MAPPED_FIELDS = [
+    "summary", "status", "description", "project", "issuetype", "priority",
+    "resolution", "resolutiondate", "created", "updated", "duedate",
+    "creator", "assignee", "fixVersions", "versions", "components", "labels",
+    "timeoriginalestimate", "timeestimate", "timespent", "aggregatetimespent",
+    "issuelinks", "attachment", "worklog", "comment", "parent", "customfield_10110", "watches",
+]
+
+# Custom fields are looked up by display name, their ids differ per Jira site
+DYNAMIC_FIELD_NAMES = (
+    "sprint", "story points", "original story points", "story point estimate",
+    "epic link", "parent link", "target start", "target end",
+)
+
+def get_sync_fields(client, domain, auth):
+    """Ids of every Jira field the importer maps, instead of fetching `*all`."""
+    def _resolve():
+        res = client.get(f"{domain}/rest/api/2/field", auth=auth)
+        res.raise_for_status()
+        return [
+            f["id"] for f in res.json()
+            if str(f.get("name") or "").lower().strip() in DYNAMIC_FIELD_NAMES
+        ]
+
+    custom_ids = frappe.cache().get_value(f"jira_sync_field_ids_{domain}", generator=_resolve)
+    return MAPPED_FIELDS + [f for f in custom_ids or [] if f not in MAPPED_FIELDS]
+
+
+def get_jira_timezone(client, domain, auth):
+    """
+    The API user's profile timezone from /myself: JQL reads date literals in it.
+    Returns None when Jira does not report a usable one.
+    """
+    cache_key = f"jira_user_timezone_{domain}_{auth[0] if auth else ''}"
+    tz = frappe.cache().get_value(cache_key)
+    if tz is None:
+        try:
+            res = client.get(f"{domain}/rest/api/2/myself", auth=auth)
+            res.raise_for_status()
+            tz = res.json().get("timeZone") or ""
+            ZoneInfo(tz)
+        except Exception:
+            tz = ""
+        frappe.cache().set_value(cache_key, tz, expires_in_sec=86400)
+    return tz or None
+
+
+def has_comments(issue):
+    """Use the search payload's comment.total to skip the comments call for issues without any."""
+    comment = (issue.get("fields") or {}).get("comment")
+    return not isinstance(comment, dict) or (comment.get("total") or 0) > 0
+
+
+def issue_content_hash(issue):
+    """Stable hash of the mapped fields; `updated` alone changing is not a content change."""
+    fields = {k: v for k, v in (issue.get("fields") or {}).items() if k != "updated"}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def fetch_search_page(client, domain, auth, jql, start_at, max_results=SEARCH_PAGE_SIZE, fields=None):
+    payload = {
+        "jql":        jql,
+        "expand":     ["names"],
+        "fields":     fields or ["*all"],
+        "startAt":    start_at,
+        "maxResults": max_results,
+    }
+    res = client.post(f"{domain}/rest/api/2/search", json=payload, auth=auth)
+    res.raise_for_status()
+    return res.json()
+
+
+def iter_search_pages(client, domain, auth, jql, start_at=0, page_size=SEARCH_PAGE_SIZE,
+                      fields=None, prefetch=PREFETCH_PAGES):
+    """
+    Producer side of the migration pipeline.
+    Yields search pages in order while up to `prefetch` following pages are
+    downloaded by a thread pool. The window of pending futures is the bounded
+    queue: a new page is only requested once the consumer takes one, so at most
+    `prefetch` pages are ever held in memory regardless of DB writer speed.
+    Worker threads only do HTTP; all Frappe/DB work stays on the consumer thread.
+    """
+    first = fetch_search_page(client, domain, auth, jql, start_at, page_size, fields)
+    yield first
+
+    total = first.get("total", 0)
+    next_starts = iter(range(start_at + len(first.get("issues", [])), total, page_size))
+
+    def submit_next(pool, window):
+        nxt = next(next_starts, None)
+        if nxt is not None:
+            window.append(pool.submit(fetch_search_page, client, domain, auth, jql, nxt, page_size, fields))
+
+    with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as pool:
+        window = deque()
+        for _ in range(max(prefetch, 1)):
+            submit_next(pool, window)
+
+        try:
+            while window:
+                page = window.popleft().result()
+                submit_next(pool, window)
+                if not page.get("issues"):
+                    return
+                yield page
+        finally:
+            for future in window:
+                future.cancel()
+
+
+# ──────────────────────────────────────────────
+# PROGRESS PULSES
 # ──────────────────────────────────────────────
 def pulse_worker(project_key, phase_text=None, percent=None):
-    """Pings the cache to keep the heartbeat alive and update the UI phase dynamically."""
+    """Keeps the heartbeat alive and updates the UI phase; writes are throttled by the reporter."""
     if not project_key:
         return
-    state_key = f"jira_migration_state_{project_key}"
-    state = frappe.cache().get_value(state_key)
-    if state:
-        state["last_heartbeat"] = str(now_datetime())
-        if phase_text:
-            state["phase"] = phase_text
-        if percent is not None:
-            state["percent"] = percent
-        frappe.cache().set_value(state_key, state, expires_in_sec=86400)
-
-
-def run_migration_engine(project_key):
+    fields = {}
+    if phase_text:
+        fields["phase"] = phase_text
+    if percent is not None:
+        fields["percent"] = percent
+    get_reporter(project_key).update(**fields)
+
+
+# ──────────────────────────────────────────────
+# ISSUE KEY INDEX (issue_key -> Task name without per-item queries)
+# ──────────────────────────────────────────────
+
+class IssueKeyIndex:
+    """
+    In-memory issue_key -> Task name map shared by every migration phase.
+    Each Jira project key is loaded with a single query the first time one of
+    its issues is looked up, and inserts are recorded as they happen.
+    """
+
+    def __init__(self, project_key=None):
+        self._names  = {}
+        self._loaded = set()
+        self.hashes  = {}
+        if project_key:
+            self.load(project_key)
+
+    def load(self, project_key):
+        if project_key in self._loaded:
+            return
+        self._loaded.add(project_key)
+        for d in frappe.get_all(
+            "Task",
+            filters={"issue_key": ["like", f"{project_key}-%"]},
+            fields=["name", "issue_key", "custom_jira_content_hash"]
+        ):
+            self._names[d.issue_key] = d.name
+            self.hashes[d.issue_key] = d.custom_jira_content_hash
+
+    def get(self, issue_key):
+        if not issue_key:
+            return None
+        if issue_key not in self._names:
+            self.load(issue_key.rsplit("-", 1)[0])
+        return self._names.get(issue_key)
+
+    def add(self, issue_key, name):
+        if issue_key and name:
+            self._names[issue_key] = name
+
+    def __contains__(self, issue_key):
+        return self.get(issue_key) is not None
+
+
+# ──────────────────────────────────────────────
+# CHECKPOINTS (Resumable migrations)
+# ──────────────────────────────────────────────
+
+CHECKPOINT_PHASES = ("tasks", "attachments", "worklogs", "comments", "changelog", "hierarchy")
+QUEUED_PHASES     = ("attachments", "worklogs", "comments", "changelog")
+CHECKPOINT_FIELDS = [
+    "status", "start_at", "updated_watermark", "processed", "failed", "total", "runs",
+    *[f"{phase}_phase" for phase in CHECKPOINT_PHASES],
+]
+
+def _queue_key(phase, project_key):
+    return f"jira_migration_queue_{phase}_{project_key}"
+
+
+def push_phase_item(phase, project_key, item):
+    """Park secondary-phase work in Redis so it survives a worker restart."""
+    frappe.cache().rpush(_queue_key(phase, project_key), json.dumps(item, default=str))
+
+
+def read_phase_items(phase, project_key):
+    raw = frappe.cache().lrange(_queue_key(phase, project_key), 0, -1) or []
+    return [json.loads(v.decode() if isinstance(v, bytes) else v) for v in raw]
+
+
+def load_checkpoint(project_key):
+    """The DB row is the source of truth: it is only written in the same transaction as the tasks."""
+    if not frappe.db.exists("Jira Migration Checkpoint", project_key):
+        return None
+    values = frappe.db.get_value("Jira Migration Checkpoint", project_key, CHECKPOINT_FIELDS, as_dict=True)
+    return frappe._dict(values)
+
+
+def save_checkpoint(project_key, **values):
+    """Persist checkpoint values to the DB (committed by the caller) and mirror them into Redis."""
+    values["last_checkpoint_at"] = now_datetime()
+    if frappe.db.exists("Jira Migration Checkpoint", project_key):
+        frappe.db.set_value("Jira Migration Checkpoint", project_key, values)
+    else:
+        frappe.get_doc({
+            "doctype":     "Jira Migration Checkpoint",
+            "project_key": project_key,
+            **values,
+        }).insert(ignore_permissions=True)
+
+    state = load_checkpoint(project_key)
+    frappe.cache().set_value(f"jira_migration_checkpoint_{project_key}", state, expires_in_sec=7 * 86400)
+    return state
+
+
+def reset_checkpoint(project_key):
+    """Start a migration from scratch: clear Redis work queues and the durable checkpoint."""
+    frappe.cache().delete_value(f"jira_hierarchy_{project_key}")
+    frappe.cache().delete_value(f"jira_migration_failures_{project_key}")
+    frappe.cache().delete_value(f"jira_migration_failure_reasons_{project_key}")
+    for phase in QUEUED_PHASES:
+        frappe.cache().delete_value(_queue_key(phase, project_key))
+
+    return save_checkpoint(
+        project_key,
+        status="Running", start_at=0, updated_watermark=None,
+        processed=0, failed=0, total=0, runs=0,
+        **{f"{phase}_phase": "Pending" for phase in CHECKPOINT_PHASES},
+    )
+
+
+def _jira_datetime(value, tz=None):
+    """
+    Jira timestamps look like 2024-01-31T10:20:30.000+0000; keep the wall-clock part.
+    With `tz`, convert to that timezone first, so the value reads the way JQL dates do.
+    """
+    if not value:
+        return None
+    if tz:
+        try:
+            aware = datetime.strptime(str(value), "%Y-%m-%dT%H:%M:%S.%f%z")
+            return aware.astimezone(ZoneInfo(tz)).replace(tzinfo=None)
+        except Exception:
+            pass
+    try:
+        return get_datetime(str(value)[:19].replace("T", " "))
+    except Exception:
+        return None
+
+
+# ──────────────────────────────────────────────
+# THE MIGRATION ENGINE (STATE MACHINE)
+# ──────────────────────────────────────────────
+
+def run_migration_engine(project_key, resume=False, max_runtime=None):
+    """
+    Migrate a Jira project. With `resume`, continue from the last durable checkpoint.
+    With `max_runtime` (seconds), checkpoint and hand over to a fresh job once the
+    budget is spent, so huge projects run as a chain of shorter jobs.
+    """
     settings = frappe.get_single("Jira Data Migration Tool")
     if not settings.is_active:
         frappe.throw("Jira integration is not active.")
 
     jira_domain = settings.jira_domain
     auth        = (settings.jira_email, settings.jira_api_token)
-    headers     = {"Accept": "application/json"}
+    use_bulk    = bool(settings.use_bulk_import)
+    changelog   = bool(settings.import_changelog)
+    issue_index = IssueKeyIndex(project_key)
+    resolver    = JiraReferenceResolver(issue_index)
+    client      = start_client_run(jira_domain, auth)
+    fetcher     = SubResourceFetcher(jira_domain, auth)
+    # Watermarks are kept in the Jira user's timezone, the one delta-sync JQL is read in
+    jira_tz     = get_jira_timezone(client, jira_domain, auth)
 
     redis_hierarchy_key = f"jira_hierarchy_{project_key}"
-    failure_key         = f"jira_migration_failures_{project_key}"
 
-    frappe.cache().delete_value(redis_hierarchy_key)
-    frappe.cache().delete_value(failure_key)
+    checkpoint = load_checkpoint(project_key) if resume else None
+    if not checkpoint or checkpoint.status == "Completed":
+        checkpoint = reset_checkpoint(project_key)
 
-    # ── Local counters ──
-    processed  = 0
-    failed     = 0
-    total      = 0
-    start_time = str(now_datetime())
+    checkpoint = save_checkpoint(project_key, status="Running", runs=(checkpoint.runs or 0) + 1)
+    frappe.db.commit()
 
-    def save_progress(status="running", phase="Initializing...", percent=0.0):
-        """Write precise states directly to Frappe Cache, skipping RQ meta."""
-        state = {
-            "project_key":    project_key,
-            "processed":      processed,
-            "failed":         failed,
-            "total":          total,
-            "status":         status,
-            "phase":          phase,
-            "percent":        percent,
-            "start_time":     start_time,
-            "last_heartbeat": str(now_datetime()),
-        }
-        # Dump it straight to Redis where it can't be touched by the worker crashing
-        frappe.cache().set_value(f"jira_migration_state_{project_key}", state, expires_in_sec=86400)
+    # ── Local counters (carried over from the checkpoint) ──
+    processed  = checkpoint.processed or 0
+    failed     = checkpoint.failed or 0
+    total      = checkpoint.total or 0
+    watermark  = checkpoint.updated_watermark
+    job_start  = time.monotonic()
 
-    save_progress("running", "Preparing Migration...", 0)
+    # Counters go to Redis with HINCRBY, at most once a second, and are pushed to the tool
+    progress = get_reporter(project_key, jira_domain)
+    progress.update(force=True, processed=processed, failed=failed, total=total)
 
-    existing_tasks = {
-        d.issue_key: d.name
-        for d in frappe.db.get_all("Task", fields=["issue_key", "name"])
-    }
+    def count(done=0, errors=0):
+        nonlocal processed, failed
+        processed += done
+        failed    += errors
+        progress.incr(done, errors)
+
+    def save_progress(status="running", phase="Initializing...", percent=0.0):
+        progress.update(status=status, phase=phase, percent=percent, total=total)
+
+    def out_of_time():
+        return bool(max_runtime) and (time.monotonic() - job_start) > max_runtime
+
+    def hand_over(percent):
+        """Enqueue the next job of the chain; it resumes from the checkpoint just committed."""
+        save_progress("running", "Continuing in a new job...", percent)
+        frappe.enqueue(
+            'erpnext_agile.jira_sync.run_migration_engine',
+            queue='long', timeout=7200,
+            project_key=project_key, resume=True, max_runtime=max_runtime
+        )
+
+    save_progress("running", "Resuming Migration..." if checkpoint.runs > 1 else "Preparing Migration...", 0)
 
-    start_at         = 0
-    max_results      = 100
+    start_at         = checkpoint.start_at or 0
     BATCH_SIZE       = 150
     tasks_insert_buf = []
     tasks_update_buf = []
-    attachments_buf  = []
-    worklogs_buf     = []
-    comments_buf     = []
+
+    def commit_checkpoint(next_start_at, **extra):
+        save_checkpoint(
+            project_key, start_at=next_start_at, updated_watermark=watermark,
+            processed=processed, failed=failed, total=total, **extra
+        )
+        frappe.db.commit()
 
     try:
         # ──────────────────────────────────────────────
         # PHASE 1: FETCH & CREATE TASKS (0% - 70%)
         # ──────────────────────────────────────────────
-        while True:
-            if check_control(project_key) == "stopped":
+        if checkpoint.tasks_phase != "Completed":
+            client = get_jira_client(jira_domain, auth)
+            pages  = iter_search_pages(
+                client, jira_domain, auth,
+                f"project = '{project_key}' ORDER BY created ASC",
+                start_at=start_at,
+                fields=get_sync_fields(client, jira_domain, auth),
+            )
+
+            def halt():
+                pages.close()
+                resolver.flush()
+                count(errors=_flush_inserts(tasks_insert_buf, use_bulk, issue_index))
+                count(errors=_flush_updates(tasks_update_buf))
+                commit_checkpoint(start_at, status="Stopped")
                 save_progress("stopped", "Migration Halted by User", 0)
-                _flush_inserts(tasks_insert_buf)
-                _flush_updates(tasks_update_buf)
-                frappe.db.commit()
+
+            while True:
+                if progress.control() == "stopped":
+                    halt()
+                    return
+
+                try:
+                    data = next(pages, None)
+                except Exception:
+                    # The client already retried; fail the run so a resume restarts from the checkpoint
+                    frappe.log_error(frappe.get_traceback(), "Jira Fetch Failed")
+                    pages.close()
+                    raise
+
+                if data is None:
+                    break
+
+                issues    = data.get("issues", [])
+                names_map = data.get("names", {})
+                total     = data.get("total", 0)
+
+                if not issues:
+                    break
+
+                raw_watcher_emails_map = fetch_watcher_emails(fetcher, issues)
+
+                for issue in issues:
+                    if progress.control() == "stopped":
+                        halt()
+                        return
+
+                    jira_key     = issue.get("key")
+                    content_hash = issue_content_hash(issue)
+                    if jira_key in issue_index and issue_index.hashes.get(jira_key) == content_hash:
+                        count(done=1)
+                        continue
+
+                    try:
+                        task_dict, dyn_fields, attachments, worklogs = build_task_dict_from_jira(
+                            issue, jira_domain, auth, names_map, resolver
+                        )
+                        task_dict["custom_jira_content_hash"] = content_hash
+
+                        task_dict["watchers"] = [
+                            {"user": resolver.user(email)}
+                            for email in raw_watcher_emails_map.get(jira_key, [])
+                        ]
+
+                        if jira_key in issue_index:
+                            tasks_update_buf.append({"name": issue_index.get(jira_key), "data": task_dict})
+                        else:
+                            tasks_insert_buf.append(task_dict)
+
+                        if attachments:
+                            push_phase_item("attachments", project_key, {"jira_key": jira_key, "attachments": attachments})
+                        if worklogs:
+                            push_phase_item("worklogs", project_key, {"jira_key": jira_key, "worklogs": worklogs})
+
+                        if has_comments(issue):
+                            push_phase_item("comments", project_key, {"jira_key": jira_key})
+                        if changelog:
+                            push_phase_item("changelog", project_key, {"jira_key": jira_key})
+
+                        fields     = issue.get("fields", {})
+                        parent_data = fields.get("parent")
+                        std_parent = parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
+                        
+                        target_parent = std_parent or dyn_fields.get("epic_link") or dyn_fields.get("parent_link")
+                        if target_parent:
+                            frappe.cache().hset(redis_hierarchy_key, jira_key, target_parent)
+
+                        updated = _jira_datetime(fields.get("updated"), jira_tz)
+                        if updated and (not watermark or updated > get_datetime(watermark)):
+                            watermark = updated
+
+                        count(done=1)
+
+                    except Exception as e:
+                        frappe.log_error(frappe.get_traceback(), f"Issue Processing Failed: {jira_key}")
+                        count(errors=1)
+                        record_failure(project_key, jira_key, e)
+
+                    # Dynamic progress scaling for Phase 1 (caps at 70%); buffered by the reporter
+                    progress.update(
+                        phase="Fetching & Creating Tasks", total=total,
+                        percent=min(round((processed / total) * 70, 2), 70) if total else 0,
+                    )
+
+                start_at += len(issues)
+
+                # Batch flush; once both buffers are empty every page up to start_at is committed
+                if len(tasks_insert_buf) + len(tasks_update_buf) >= BATCH_SIZE:
+                    resolver.flush()
+                    count(errors=_flush_inserts(tasks_insert_buf, use_bulk, issue_index))
+                    count(errors=_flush_updates(tasks_update_buf))
+                    tasks_insert_buf = []
+                    tasks_update_buf = []
+                    commit_checkpoint(start_at)
+
+                    if out_of_time() and start_at < total:
+                        pages.close()
+                        hand_over(min(round((processed / total) * 70, 2), 70) if total else 0)
+                        return
+
+                if start_at >= total:
+                    break
+
+            pages.close()
+
+            # Final flush for tasks
+            resolver.flush()
+            count(errors=_flush_inserts(tasks_insert_buf, use_bulk, issue_index))
+            count(errors=_flush_updates(tasks_update_buf))
+            commit_checkpoint(start_at, tasks_phase="Completed")
+
+        # ──────────────────────────────────────────────
+        # SECONDARY PHASES (Run Sequentially with Pulses)
+        # ──────────────────────────────────────────────
+        secondary_phases = (
+            ("attachments", "Starting Attachment Sync...", 75.0,
+                lambda items: process_attachments_queue(items, auth, project_key, issue_index)),
+            ("worklogs",    "Starting Worklog Sync...",    80.0,
+                lambda items: process_worklogs_queue(items, project_key, issue_index)),
+            ("comments",    "Starting Comment Sync...",    85.0,
+                lambda items: process_comments_queue(items, jira_domain, auth, project_key, issue_index)),
+        )
+        if changelog:
+            secondary_phases += (
+                ("changelog", "Starting Changelog Import...", 88.0,
+                    lambda items: process_changelog_queue(
+                        items, fetcher, project_key, issue_index, queue_key=_queue_key("changelog", project_key)
+                    )),
+            )
+
+        for phase, label, percent, runner in secondary_phases:
+            if checkpoint.get(f"{phase}_phase") == "Completed":
+                continue
+
+            items = read_phase_items(phase, project_key)
+            if items:
+                save_progress("running", label, percent)
+                runner(items)
+
+            commit_checkpoint(start_at, **{f"{phase}_phase": "Completed"})
+            frappe.cache().delete_value(_queue_key(phase, project_key))
+
+            if out_of_time():
+                hand_over(percent)
                 return
 
-            payload = {
-                "jql":        f"project = '{project_key}' ORDER BY created ASC",
-                "expand":     ["names"],
-                "fields":     ["*all"],
-                "startAt":    start_at,
-                "maxResults": max_results,
-            }
-            try:
-                res = requests.post(
-                    f"{jira_domain}/rest/api/2/search",
-                    json=payload, auth=auth, headers=headers
-                )
-                res.raise_for_status()
-                data = res.json()
-            except Exception:
-                frappe.log_error(frappe.get_traceback(), "Jira Fetch Failed")
-                break
+        save_progress("running", "Building Task Hierarchy...", 90.0)
+        weave_hierarchies(redis_hierarchy_key, project_key)
+        build_hierarchy_from_dependencies(project_key)
+        update_parent_end_dates(project_key)
+
+        save_progress("running", "Rebuilding Tree Structure...", 95.0)
+        rebuild_task_trees({"issue_key": ["like", f"{project_key}-%"]})
+        
+        save_progress("running", "Patching Epic Links...", 98.0)
+        patch_epic_links_from_jira(project_key)
+
+        commit_checkpoint(start_at, hierarchy_phase="Completed", status="Completed")
+
+        # Everything is strictly complete. Hit 100%.
+        save_progress("completed", "Migration Complete ✅", 100.0)
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Jira Migration Engine Failed")
+        # Keep the last committed position so a resume replays only the unfinished batch
+        frappe.db.rollback()
+        save_checkpoint(project_key, status="Failed")
+        frappe.db.commit()
+        save_progress("failed", "Migration Failed (Check Logs)", 0)
+    finally:
+        fetcher.close()
+
+
+# ──────────────────────────────────────────────
+# DELTA SYNC (Only issues updated since the last run)
+# ──────────────────────────────────────────────
+
+def run_delta_sync(project_key):
+    """
+    Incremental sync for a project that finished a full migration.
+    Pulls `updated >= watermark` with the mapped field list only, and skips
+    issues whose content hash matches the one stored on the Task. Every page
+    is written and checkpointed before the next one is processed; issues that
+    fail go to the retry queue, so moving the watermark past them loses nothing.
+    """
+    settings = frappe.get_single("Jira Data Migration Tool")
+    if not settings.is_active:
+        return
+
+    checkpoint = load_checkpoint(project_key)
+    if not checkpoint or not checkpoint.updated_watermark or checkpoint.status == "Running":
+        return
 
+    jira_domain   = settings.jira_domain
+    auth          = (settings.jira_email, settings.jira_api_token)
+    hierarchy_key = f"jira_delta_hierarchy_{project_key}"
+    watermark     = get_datetime(checkpoint.updated_watermark)
+
+    stats         = {"checked": 0, "changed": 0, "failed": 0}
+    has_hierarchy = False
+    issue_index   = IssueKeyIndex(project_key)
+    resolver      = JiraReferenceResolver(issue_index)
+
+    client  = start_client_run(jira_domain, auth)
+    fetcher = SubResourceFetcher(jira_domain, auth)
+    jira_tz = get_jira_timezone(client, jira_domain, auth)
+
+    # JQL compares at minute precision in the Jira user's timezone, which is the one
+    # the watermark is stored in (see _jira_datetime); `>=` re-reads the boundary minute
+    jql = (
+        f"project = '{project_key}' AND updated >= '{watermark.strftime('%Y/%m/%d %H:%M')}' "
+        "ORDER BY updated ASC"
+    )
+    pages   = iter_search_pages(
+        client, jira_domain, auth, jql,
+        fields=get_sync_fields(client, jira_domain, auth),
+    )
+
+    try:
+        for data in pages:
             issues    = data.get("issues", [])
             names_map = data.get("names", {})
-            total     = data.get("total", 0)
-
             if not issues:
                 break
 
-            raw_watcher_emails_map = batch_fetch_watcher_emails(
-                [i.get("key") for i in issues], jira_domain, auth
-            )
+            existing = {
+                d.issue_key: d
+                for d in frappe.get_all(
+                    "Task",
+                    filters={"issue_key": ["in", [i.get("key") for i in issues]]},
+                    fields=["name", "issue_key", "custom_jira_content_hash"]
+                )
+            }
 
+            changed = []
             for issue in issues:
-                if check_control(project_key) == "stopped":
-                    save_progress("stopped", "Migration Halted by User", 0)
-                    _flush_inserts(tasks_insert_buf)
-                    _flush_updates(tasks_update_buf)
-                    frappe.db.commit()
-                    return
+                stats["checked"] += 1
+                updated = _jira_datetime((issue.get("fields") or {}).get("updated"), jira_tz)
+                if updated and updated > watermark:
+                    watermark = updated
+
+                current = existing.get(issue.get("key"))
+                content_hash = issue_content_hash(issue)
+                if current and current.custom_jira_content_hash == content_hash:
+                    continue
+                changed.append((issue, current, content_hash))
+
+            if not changed:
+                save_checkpoint(project_key, updated_watermark=watermark)
+                frappe.db.commit()
+                continue
+
+            raw_watcher_emails_map = fetch_watcher_emails(fetcher, [issue for issue, _current, _hash in changed])
 
+            tasks_insert_buf = []
+            tasks_update_buf = []
+            attachments_buf  = []
+            worklogs_buf     = []
+            comments_buf     = []
+            changelog_buf    = []
+
+            for issue, current, content_hash in changed:
                 jira_key = issue.get("key")
                 try:
                     task_dict, dyn_fields, attachments, worklogs = build_task_dict_from_jira(
-                        issue, jira_domain, auth, names_map
+                        issue, jira_domain, auth, names_map, resolver
                     )
-
+                    task_dict["custom_jira_content_hash"] = content_hash
                     task_dict["watchers"] = [
-                        {"user": resolve_user(email)}
+                        {"user": resolver.user(email)}
                         for email in raw_watcher_emails_map.get(jira_key, [])
                     ]
 
-                    if jira_key in existing_tasks:
-                        tasks_update_buf.append({"name": existing_tasks[jira_key], "data": task_dict})
+                    if current:
+                        tasks_update_buf.append({"name": current.name, "data": task_dict})
                     else:
                         tasks_insert_buf.append(task_dict)
 
@@ -513,81 +967,91 @@ def run_migration_engine(project_key):
                         attachments_buf.append({"jira_key": jira_key, "attachments": attachments})
                     if worklogs:
                         worklogs_buf.append({"jira_key": jira_key, "worklogs": worklogs})
+                    if has_comments(issue):
+                        comments_buf.append({"jira_key": jira_key})
+                    if settings.import_changelog:
+                        changelog_buf.append({"jira_key": jira_key})
 
-                    comments_buf.append({"jira_key": jira_key})
-
-                    fields     = issue.get("fields", {})
-                    parent_data = fields.get("parent")
-                    std_parent = parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
-                    
+                    parent_data   = (issue.get("fields") or {}).get("parent")
+                    std_parent    = parent_data if isinstance(parent_data, str) else (parent_data or {}).get("key")
                     target_parent = std_parent or dyn_fields.get("epic_link") or dyn_fields.get("parent_link")
                     if target_parent:
-                        frappe.cache().hset(redis_hierarchy_key, jira_key, target_parent)
+                        frappe.cache().hset(hierarchy_key, jira_key, target_parent)
+                        has_hierarchy = True
 
-                    processed += 1
+                    stats["changed"] += 1
+                except Exception as e:
+                    frappe.log_error(frappe.get_traceback(), f"Delta Sync Issue Failed: {jira_key}")
+                    stats["failed"] += 1
+                    record_failure(project_key, jira_key, e)
+
+            resolver.flush()
+            failures = {}
+            _flush_inserts(tasks_insert_buf, index=issue_index, failures=failures)
+            _flush_updates(tasks_update_buf, failures=failures)
+            for jira_key, exc in failures.items():
+                stats["changed"] -= 1
+                stats["failed"]  += 1
+                record_failure(project_key, jira_key, exc)
+
+            if attachments_buf:
+                process_attachments_queue(attachments_buf, auth, project_key, issue_index)
+            if worklogs_buf:
+                process_worklogs_queue(worklogs_buf, project_key, issue_index)
+            if comments_buf:
+                process_comments_queue(comments_buf, jira_domain, auth, project_key, issue_index)
+            if changelog_buf:
+                process_changelog_queue(changelog_buf, fetcher, project_key, issue_index)
+
+            save_checkpoint(project_key, updated_watermark=watermark)
+            frappe.db.commit()
+
+        if has_hierarchy:
+            weave_hierarchies(hierarchy_key, project_key)
+            update_parent_end_dates(project_key)
+            rebuild_task_trees({"issue_key": ["like", f"{project_key}-%"]})
+            frappe.db.commit()
 
-                except Exception:
-                    frappe.log_error(frappe.get_traceback(), f"Issue Processing Failed: {jira_key}")
-                    failed += 1
-                    frappe.cache().rpush(failure_key, jira_key)
-
-                # Dynamic progress scaling for Phase 1 (caps at 70%)
-                if (processed + failed) % 5 == 0:
-                    current_percent = min(round((processed / total) * 70, 2), 70) if total else 0
-                    save_progress("running", "Fetching & Creating Tasks", current_percent)
-
-            # Batch flush
-            if len(tasks_insert_buf) >= BATCH_SIZE:
-                failed += _flush_inserts(tasks_insert_buf)
-                tasks_insert_buf = []
-
-            if len(tasks_update_buf) >= BATCH_SIZE:
-                failed += _flush_updates(tasks_update_buf)
-                tasks_update_buf = []
-
-            start_at += len(issues)
-            if start_at >= total:
-                break
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"Jira Delta Sync Failed: {project_key}")
+    finally:
+        pages.close()
+        fetcher.close()
 
-        # Final flush for tasks
-        failed += _flush_inserts(tasks_insert_buf)
-        failed += _flush_updates(tasks_update_buf)
-        frappe.db.commit()
+    return stats
 
-        # ──────────────────────────────────────────────
-        # SECONDARY PHASES (Run Sequentially with Pulses)
-        # ──────────────────────────────────────────────
-        
-        if attachments_buf:
-            save_progress("running", "Starting Attachment Sync...", 75.0)
-            process_attachments_queue(attachments_buf, auth, project_key)
-            
-        if worklogs_buf:
-            save_progress("running", "Starting Worklog Sync...", 80.0)
-            process_worklogs_queue(worklogs_buf, project_key)
-            
-        if comments_buf:
-            save_progress("running", "Starting Comment Sync...", 85.0)
-            process_comments_queue(comments_buf, jira_domain, auth, project_key)
 
-        save_progress("running", "Building Task Hierarchy...", 90.0)
-        weave_hierarchies(redis_hierarchy_key, project_key)
-        build_hierarchy_from_dependencies(project_key)
-        update_parent_end_dates()
+def scheduled_delta_sync():
+    """Scheduler: queue a delta sync for every fully migrated project."""
+    settings = frappe.get_single("Jira Data Migration Tool")
+    if not (settings.is_active and settings.enable_delta_sync):
+        return
 
-        save_progress("running", "Rebuilding Tree Structure...", 95.0)
-        frappe.log_error("Rebuilding Task Tree NestedSet...", "Jira Hierarchy Update")
-        rebuild_tree("Task", "parent_task")
-        
-        save_progress("running", "Patching Epic Links...", 98.0)
-        patch_epic_links_from_jira(project_key)
+    project_keys = frappe.get_all(
+        "Jira Migration Checkpoint",
+        filters={"status": "Completed", "updated_watermark": ["is", "set"]},
+        pluck="project_key"
+    )
+    for project_key in project_keys:
+        _enqueue_delta_sync(project_key)
 
-        # Everything is strictly complete. Hit 100%.
-        save_progress("completed", "Migration Complete ✅", 100.0)
 
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "Jira Migration Engine Failed")
-        save_progress("failed", "Migration Failed (Check Logs)", 0)
+@frappe.whitelist()
+def start_delta_sync(project_key):
+    if not load_checkpoint(project_key):
+        frappe.throw(f"Run a full migration of {project_key} before syncing changes.")
+    _enqueue_delta_sync(project_key)
+    return "Delta sync started in background"
+
+
+def _enqueue_delta_sync(project_key):
+    frappe.enqueue(
+        'erpnext_agile.jira_sync.run_delta_sync',
+        queue='long', timeout=7200,
+        job_id=f"jira_delta_sync_{project_key}", deduplicate=True,
+        project_key=project_key
+    )
 
 
 # ──────────────────────────────────────────────
@@ -621,61 +1085,20 @@ def check_control(project_key):
 
 @frappe.whitelist()
 def get_migration_progress(project_key):
-    # Fetch directly from the cache we set
-    state = frappe.cache().get_value(f"jira_migration_state_{project_key}")
-
-    if state and state.get("project_key") == project_key:
-        processed  = int(state.get("processed", 0))
-        total      = int(state.get("total",     0))
-        failed     = int(state.get("failed",    0))
-        status     = state.get("status", "running")
-        phase      = state.get("phase", "Initializing...")
-        percent    = float(state.get("percent", 0.0))
-        heartbeat  = state.get("last_heartbeat")
-        start_time = state.get("start_time")
-
-        warning = None
-        if heartbeat and status == "running":
-            try:
-                # If 2 minutes pass without a heartbeat, the worker died.
-                if (now_datetime() - get_datetime(heartbeat)).total_seconds() > 120:
-                    warning = "Migration heartbeat expired (no progress for 2 minutes). Worker likely crashed."
-                    status = "failed"
-                    phase = "Worker Crashed/Timeout"
-            except Exception:
-                pass
-
-        eta = None
-        if start_time and processed >= 10:
-            try:
-                elapsed = (now_datetime() - get_datetime(start_time)).total_seconds()
-                if elapsed > 0:
-                    speed = processed / elapsed
-                    eta   = round(max(total - processed, 0) / speed, 2) if speed else None
-            except Exception:
-                pass
-
-        return {
-            "status":    status,
-            "phase":     phase,
-            "total":     total,
-            "processed": processed,
-            "failed":    failed,
-            "percent":   percent,
-            "eta":       eta,
-            "warning":   warning,
-        }
-
-    return {"status": "idle", "phase": "Awaiting Start...", "total": 0, "processed": 0, "failed": 0, "percent": 0, "eta": None}
+    """Fallback for clients without a realtime connection; running jobs push the same payload"""
+    return progress_payload(project_key)
 
 @frappe.whitelist()
 def pause_migration(project_key):
     frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "paused")
+    # A paused worker sleeps without heartbeats; the status keeps it from looking crashed
+    get_reporter(project_key).update(status="paused")
     return "⏸ Migration paused"
 
 @frappe.whitelist()
 def resume_migration(project_key):
     frappe.cache().hset(f"jira_migration_control_{project_key}", "state", "running")
+    get_reporter(project_key).update(status="running")
     return "▶️ Migration resumed"
 
 @frappe.whitelist()
@@ -689,241 +1112,305 @@ def stop_migration(project_key):
 # ──────────────────────────────────────────────
 
 def build_hierarchy_from_dependencies(project_key=None):
-    filter_sql = """
-    AND parent IN (
-        SELECT name FROM `tabTask`
-        WHERE issue_key IS NOT NULL AND issue_key != ''
-    )
     """
-    sql_params = {}
-
-    if project_key:
-        filter_sql = """
-        AND parent IN (
-            SELECT name FROM `tabTask`
-            WHERE issue_key IS NOT NULL AND issue_key != ''
-            AND issue_key LIKE %(proj_key)s
-        )
-        """
-        sql_params["proj_key"] = f"{project_key}%"
-
-    parent_tasks = frappe.db.sql(f"""
-        SELECT DISTINCT parent
-        FROM `tabTask Depends On`
-        WHERE parenttype = 'Task' {filter_sql}
-    """, values=sql_params, as_dict=True)
-
-    for p in parent_tasks:
-        parent_name = p.parent
-
-        if not frappe.db.get_value("Task", parent_name, "is_group"):
-            try:
-                frappe.db.set_value("Task", parent_name, "is_group", 1, update_modified=False)
-            except Exception as e:
-                frappe.log_error(f"Failed to group {parent_name}: {str(e)}", "Jira Hierarchy Debug")
-
-        children = frappe.db.get_all(
-            "Task Depends On",
-            filters={"parent": parent_name, "parenttype": "Task"},
-            fields=["task"]
-        )
+    Tasks that other Tasks depend on become groups, and children without a
+    parent are attached to the (first) Task depending on them; both with a
+    single joined UPDATE.
+    """
+    values = {"proj_key": f"{project_key}-%" if project_key else "%"}
+    dependencies = """
+        SELECT d.parent, d.task
+        FROM `tabTask Depends On` d
+        INNER JOIN `tabTask` t ON t.name = d.parent
+        WHERE d.parenttype = 'Task' AND IFNULL(d.task, '') != '' AND d.task != d.parent
+        AND IFNULL(t.issue_key, '') != '' AND t.issue_key LIKE %(proj_key)s
+    """
 
-        for child in children:
-            child_name = child.task
-            if not child_name:
-                continue
-            current_parent = frappe.db.get_value("Task", child_name, "parent_task")
-            if not current_parent:
-                try:
-                    frappe.db.set_value(
-                        "Task", child_name,
-                        {"parent_task": parent_name, "parent_issue": parent_name},
-                        update_modified=False
-                    )
-                except Exception as e:
-                    pass
+    frappe.db.sql(f"""
+        UPDATE `tabTask` p
+        INNER JOIN (SELECT DISTINCT parent FROM ({dependencies}) deps) g ON g.parent = p.name
+        SET p.is_group = 1
+        WHERE p.is_group = 0
+    """, values)
+
+    frappe.db.sql(f"""
+        UPDATE `tabTask` c
+        INNER JOIN (SELECT task, MIN(parent) AS parent FROM ({dependencies}) deps GROUP BY task) g
+            ON g.task = c.name
+        SET c.parent_task = g.parent, c.parent_issue = g.parent
+        WHERE IFNULL(c.parent_task, '') = ''
+    """, values)
 
     frappe.db.commit()
 
 
-def update_parent_end_dates():
-    parent_names = frappe.db.sql("""
-        SELECT DISTINCT parent_task
-        FROM `tabTask`
-        WHERE parent_task IS NOT NULL AND parent_task != ''
-    """, as_dict=True)
-
-    for p in parent_names:
-        parent_name = p.parent_task
-        parent_doc  = frappe.get_doc("Task", parent_name)
-        children    = frappe.get_all("Task", fields=["exp_end_date"], filters={"parent_task": parent_name})
-        if not children:
-            continue
-
-        max_end = parent_doc.exp_end_date
-        for child in children:
-            if child.exp_end_date and (max_end is None or child.exp_end_date > max_end):
-                max_end = child.exp_end_date
+MAX_TREE_DEPTH = 50
 
-        if max_end and (parent_doc.exp_end_date is None or parent_doc.exp_end_date < max_end):
-            frappe.db.set_value("Task", parent_name, "exp_end_date", max_end, update_modified=False)
+def update_parent_end_dates(project_key=None):
+    """
+    Raise each parent's exp_end_date to its latest child's. One grouped
+    UPDATE per tree level, repeated until no parent changes, so dates
+    propagate from the leaves up to the roots.
+    """
+    values = {"proj_key": f"{project_key}-%" if project_key else "%"}
+
+    for _level in range(MAX_TREE_DEPTH):
+        frappe.db.sql("""
+            UPDATE `tabTask` p
+            INNER JOIN (
+                SELECT parent_task, MAX(exp_end_date) AS max_end
+                FROM `tabTask`
+                WHERE IFNULL(parent_task, '') != '' AND exp_end_date IS NOT NULL
+                AND IFNULL(issue_key, '') LIKE %(proj_key)s
+                GROUP BY parent_task
+            ) c ON c.parent_task = p.name
+            SET p.exp_end_date = c.max_end
+            WHERE p.exp_end_date IS NULL OR p.exp_end_date < c.max_end
+        """, values)
+        if not frappe.db.sql("SELECT ROW_COUNT()")[0][0]:
+            break
 
     frappe.db.commit()
 
 
-# ──────────────────────────────────────────────
-# THREAD-SAFE BATCH WATCHER FETCH
-# ──────────────────────────────────────────────
-
-def batch_fetch_watcher_emails(issue_keys, domain, auth):
-    result = {k: [] for k in issue_keys}
-
-    def fetch_emails(key):
-        url = f"{domain}/rest/api/2/issue/{key}/watchers"
-        try:
-            r = requests.get(url, auth=auth, headers={"Accept": "application/json"}, timeout=5)
-            if r.status_code == 200:
-                watchers = r.json().get("watchers", [])
-                return key, [w.get("emailAddress") for w in watchers if w.get("emailAddress")]
-        except Exception:
-            pass
-        return key, []
-
-    with ThreadPoolExecutor(max_workers=10) as pool:
-        futures = {pool.submit(fetch_emails, k): k for k in issue_keys}
-        for future in as_completed(futures):
-            key, emails = future.result()
-            result[key] = emails
-
-    return result
-
-
 # ──────────────────────────────────────────────
 # BACKGROUND PROCESSORS (With Live UI Pulses)
 # ──────────────────────────────────────────────
 
-def process_worklogs_queue(worklogs_buffer, project_key=None):
-    total = len(worklogs_buffer)
-    for i, item in enumerate(worklogs_buffer, 1):
-        # Pulse the UI every 5 items
-        if i % 5 == 0 or i == 1:
-            pulse_worker(project_key, f"Syncing Worklogs ({i}/{total})...")
-            
-        jira_key  = item.get("jira_key")
-        worklogs  = item.get("worklogs", [])
-        task_name = frappe.db.get_value("Task", {"issue_key": jira_key}, "name")
-        if not task_name:
+def process_worklogs_queue(worklogs_buffer, project_key=None, index=None):
+    """
+    Append queued Jira worklogs to their Tasks with bulk_insert_work_logs, then
+    refresh Project User time metrics once per touched project instead of once
+    per inserted work log and assignee.
+    """
+    from erpnext_agile.bulk_task_import import bulk_insert_work_logs
+    from erpnext_agile.project_time_tracking import ProjectTimeTracker
+
+    index = index or IssueKeyIndex(project_key)
+    pulse_worker(project_key, f"Syncing Worklogs ({len(worklogs_buffer)} issues)...")
+
+    by_task = {}
+    emails  = set()
+    for item in worklogs_buffer:
+        task_name = index.get(item.get("jira_key"))
+        worklogs  = item.get("worklogs") or []
+        if not task_name or not worklogs:
             continue
+        by_task.setdefault(task_name, []).extend(worklogs)
+        emails.update(filter(None, ((wl.get("author") or {}).get("emailAddress") for wl in worklogs)))
 
-        task_doc = frappe.get_doc("Task", task_name)
-        existing_times = {wl.get("time_spent_seconds") for wl in task_doc.get("work_logs", [])}
+    users = set(frappe.get_all("User", filters={"name": ["in", list(emails)]}, pluck="name")) if emails else set()
 
-        changed = False
+    rows_by_task = {}
+    for task_name, worklogs in by_task.items():
+        rows = rows_by_task.setdefault(task_name, [])
         for wl in worklogs:
-            time_secs = wl.get("timeSpentSeconds") or 0
-            if time_secs in existing_times:
-                continue
-
+            time_secs    = wl.get("timeSpentSeconds") or 0
             author_email = (wl.get("author") or {}).get("emailAddress")
-            started      = wl.get("started", "")[:10]
             comment      = wl.get("comment", "") or ""
             if isinstance(comment, dict):
                 comment = extract_description(comment)
 
-            task_doc.append("work_logs", {
-                "user":               resolve_user(author_email) if author_email else "Administrator",
+            rows.append({
+                "user":               author_email if author_email in users else "Administrator",
                 "time_spent_seconds": time_secs,
                 "time_spent_display": format_time(time_secs) or "0m",
-                "work_date":          started or frappe.utils.today(),
+                "work_date":          (wl.get("started") or "")[:10] or frappe.utils.today(),
                 "description":        comment[:500] if comment else "Migrated from Jira",
-                "logged_at":          wl.get("started", frappe.utils.now_datetime()),
+                "logged_at":          _jira_datetime(wl.get("started")) or frappe.utils.now_datetime(),
+                "jira_worklog_id":    wl.get("id"),
             })
-            changed = True
 
-        if changed:
-            try:
-                task_doc.save(ignore_permissions=True)
-            except Exception as e:
-                frappe.log_error(f"Worklog save failed for {jira_key}: {str(e)}", "Jira Worklog Migration")
+    try:
+        projects = bulk_insert_work_logs(rows_by_task)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Worklog import failed: {str(e)}\n\n{frappe.get_traceback()}", "Jira Worklog Migration")
+        return
+
+    pulse_worker(project_key, f"Refreshing Time Metrics ({len(projects)} projects)...")
+    for project in projects:
+        try:
+            ProjectTimeTracker(project).update_all_user_time_data()
+        except Exception as e:
+            frappe.log_error(f"Time metrics refresh failed for {project}: {str(e)}", "Jira Worklog Migration")
 
     frappe.db.commit()
 
 
-def process_comments_queue(comments_buffer, domain, auth, project_key=None):
-    total = len(comments_buffer)
-    for i, item in enumerate(comments_buffer, 1):
-        # HTTP requests are slow, pulse every single time so the UI doesn't freeze
-        pulse_worker(project_key, f"Fetching Comments ({i}/{total})...")
-        
-        jira_key  = item.get("jira_key")
-        task_name = frappe.db.get_value("Task", {"issue_key": jira_key}, "name")
-        if not task_name:
-            continue
+COMMENT_WORKERS      = 8
+COMMENT_PAGE_SIZE    = 100
+COMMENT_INSERT_CHUNK = 500
 
-        try:
-            url = f"{domain}/rest/api/2/issue/{jira_key}/comment"
-            r   = requests.get(url, auth=auth, headers={"Accept": "application/json"}, timeout=20)
-            r.raise_for_status()
-            comments = r.json().get("comments", [])
-        except Exception as e:
-            continue
+def fetch_issue_comments(client, domain, auth, jira_key):
+    """Worker thread: every comment of an issue, following startAt pagination."""
+    comments, start_at = [], 0
+    while True:
+        r = client.get(
+            f"{domain}/rest/api/2/issue/{jira_key}/comment",
+            params={"startAt": start_at, "maxResults": COMMENT_PAGE_SIZE, "orderBy": "created"},
+            auth=auth
+        )
+        r.raise_for_status()
+        data = r.json()
+        page = data.get("comments", [])
+        comments.extend(page)
+        start_at += len(page)
+        if not page or start_at >= data.get("total", 0):
+            return comments
 
-        if not comments:
-            continue
 
-        existing_comms = frappe.get_all(
-            "Comment",
-            filters={"reference_doctype": "Task", "reference_name": task_name, "comment_type": "Comment"},
-            fields=["content"]
-        )
-        existing_texts = {c.content for c in existing_comms if c.content}
+def _insert_comment_rows(rows):
+    if not rows:
+        return
+    frappe.db.bulk_insert(
+        "Comment",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by",
+            "comment_type", "reference_doctype", "reference_name",
+            "content", "comment_email", "comment_by",
+        ],
+        values=rows,
+        chunk_size=COMMENT_INSERT_CHUNK,
+    )
+
+
+def _append_comments_cache(new_comments):
+    """Bulk equivalent of Comment.on_update: append new comments to the Tasks' `_comments` column."""
+    if not new_comments:
+        return
+
+    current = dict(frappe.get_all(
+        "Task",
+        filters={"name": ["in", list(new_comments)]},
+        fields=["name", "_comments"],
+        as_list=True
+    ))
 
+    updates = []
+    for task_name, added in new_comments.items():
+        try:
+            cached = json.loads(current.get(task_name) or "[]")
+        except ValueError:
+            cached = []
+        updates.append((task_name, json.dumps((cached + added)[-100:])))
+
+    for i in range(0, len(updates), COMMENT_INSERT_CHUNK):
+        chunk    = updates[i:i + COMMENT_INSERT_CHUNK]
+        case_sql = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        frappe.db.sql(f"""
+            UPDATE `tabTask`
+            SET `_comments` = CASE name {case_sql} END
+            WHERE name IN %s
+        """, [v for pair in chunk for v in pair] + [[pair[0] for pair in chunk]])
+
+
+class CommentWriter:
+    """
+    Writes Jira comments as Comment rows with multi-row INSERTs carrying the
+    original timestamps. Comments already imported (same content on the same
+    Task) are skipped using one preload query for all target Tasks.
+    """
+
+    def __init__(self, task_names, resolver):
+        self.resolver     = resolver
+        self.rows         = []
+        self.new_comments = {}
+        self.existing     = set()
+
+        task_names = list(set(task_names))
+        for i in range(0, len(task_names), 1000):
+            self.existing.update(
+                (c.reference_name, c.content)
+                for c in frappe.get_all(
+                    "Comment",
+                    filters={
+                        "reference_doctype": "Task",
+                        "reference_name":    ["in", task_names[i:i + 1000]],
+                        "comment_type":      "Comment",
+                    },
+                    fields=["reference_name", "content"]
+                )
+            )
+
+    def add(self, task_name, comments):
         for c in comments:
             body = c.get("body")
             if not body:
                 continue
 
             content = extract_description(body)
-            if content in existing_texts:
+            if (task_name, content) in self.existing:
                 continue
+            self.existing.add((task_name, content))
+
+            author    = c.get("author") or {}
+            author_id = self.resolver.user(author.get("emailAddress"))
+            created   = _jira_datetime(c.get("created")) or now_datetime()
+            name      = frappe.generate_hash(length=10)
+
+            self.rows.append((
+                name, created, created, author_id, author_id,
+                "Comment", "Task", task_name,
+                content, author_id, author.get("displayName", "Unknown User"),
+            ))
+            self.new_comments.setdefault(task_name, []).append({
+                "comment": frappe.utils.strip_html(content)[:100],
+                "by":      author_id,
+                "name":    name,
+            })
 
-            author_email = (c.get("author") or {}).get("emailAddress")
-            author_name  = (c.get("author") or {}).get("displayName", "Unknown User")
-            created_str  = c.get("created")
-            author_id = resolve_user(author_email) if author_email else "Administrator"
+        if len(self.rows) >= COMMENT_INSERT_CHUNK:
+            _insert_comment_rows(self.rows)
+            self.rows = []
 
-            try:
-                doc = frappe.get_doc({
-                    "doctype":          "Comment",
-                    "comment_type":     "Comment",
-                    "reference_doctype":"Task",
-                    "reference_name":   task_name,
-                    "content":          content,
-                    "comment_email":    resolve_user(author_email) if author_email else "Administrator",
-                    "comment_by":       author_name,
-                    "owner":            author_id,
-                })
-                doc.flags.ignore_permissions = True
-                doc.insert(ignore_permissions=True)
-                existing_texts.add(content)
-
-                if created_str:
-                    created_dt = get_datetime(created_str[:19].replace("T", " "))
-                    frappe.db.set_value("Comment", doc.name, "creation", created_dt, update_modified=False)
-                    frappe.db.set_value("Comment", doc.name, "modified", created_dt, update_modified=False)
-
-            except Exception as e:
-                pass
+    def close(self):
+        _insert_comment_rows(self.rows)
+        _append_comments_cache(self.new_comments)
+        self.rows, self.new_comments = [], {}
+        frappe.db.commit()
 
-    frappe.db.commit()
 
+def process_comments_queue(comments_buffer, domain, auth, project_key=None, index=None):
+    """Fetch comments for many issues concurrently and write them in bulk."""
+    index    = index or IssueKeyIndex(project_key)
+    resolver = JiraReferenceResolver(index)
+
+    targets = {}
+    for item in comments_buffer:
+        task_name = index.get(item.get("jira_key"))
+        if task_name:
+            targets[item.get("jira_key")] = task_name
+    if not targets:
+        return
+
+    total  = len(targets)
+    client = get_jira_client(domain, auth)
+    writer = CommentWriter(targets.values(), resolver)
+
+    with ThreadPoolExecutor(max_workers=COMMENT_WORKERS) as pool:
+        futures = {
+            pool.submit(fetch_issue_comments, client, domain, auth, jira_key): jira_key
+            for jira_key in targets
+        }
+
+        for done, future in enumerate(as_completed(futures), 1):
+            jira_key = futures[future]
+            if done % 5 == 0 or done == total:
+                pulse_worker(project_key, f"Fetching Comments ({done}/{total})...")
+
+            try:
+                writer.add(targets[jira_key], future.result())
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"Comment fetch failed: {jira_key}")
+
+    writer.close()
 
-def resolve_issue_links(issuelinks, current_issue_key):
-    if not issuelinks:
-        return []
 
-    rows = []
-    for link in issuelinks:
+def iter_dependency_links(issuelinks, current_issue_key):
+    """(issue key, summary) of every issue the current one depends on"""
+    for link in issuelinks or []:
         link_type    = link.get("type", {})
         target_issue = None
         relation     = ""
@@ -942,12 +1429,22 @@ def resolve_issue_links(issuelinks, current_issue_key):
             dep_key = target_issue.get("key")
             if dep_key == current_issue_key:
                 continue
-            dep_name = frappe.db.get_value("Task", {"issue_key": dep_key}, "name")
-            if dep_name:
-                rows.append({
-                    "task":    dep_name,
-                    "subject": target_issue.get("fields", {}).get("summary", dep_key)
-                })
+            yield dep_key, target_issue.get("fields", {}).get("summary", dep_key)
+
+
+def resolve_issue_links(issuelinks, current_issue_key, index=None):
+    if not issuelinks:
+        return []
+
+    index = index or IssueKeyIndex()
+    rows  = []
+    for dep_key, summary in iter_dependency_links(issuelinks, current_issue_key):
+        dep_name = index.get(dep_key)
+        if dep_name:
+            rows.append({
+                "task":    dep_name,
+                "subject": summary
+            })
 
     seen, unique_rows = set(), []
     for r in rows:
@@ -957,179 +1454,316 @@ def resolve_issue_links(issuelinks, current_issue_key):
     return unique_rows
 
 
-def process_attachments_queue(attachments_buffer, auth, project_key=None):
-    total = len(attachments_buffer)
-    for i, item in enumerate(attachments_buffer, 1):
-        # Pulse every time because downloading files is network-heavy
-        pulse_worker(project_key, f"Downloading Attachments ({i}/{total})...")
-        
-        jira_key  = item.get("jira_key")
-        task_name = frappe.db.get_value("Task", {"issue_key": jira_key}, "name")
-        if not task_name:
-            continue
+ATTACHMENT_WORKERS    = 8
+ATTACHMENT_HOST_RATE  = 10            # downloads started per second, per host
+ATTACHMENT_CHUNK_SIZE = 1024 * 1024   # stream bodies to disk 1 MB at a time
+ATTACHMENT_FLUSH_SIZE = 200
 
-        for att in item.get("attachments", []):
-            file_name   = att.get("filename")
-            content_url = att.get("content")
+class HostRateLimiter:
+    """Spaces out requests per host so parallel downloads stay under the server's limit."""
 
-            if frappe.db.exists("File", {
-                "attached_to_doctype": "Task",
-                "attached_to_name":    task_name,
-                "file_name":           file_name
-            }):
-                continue
+    def __init__(self, per_second=ATTACHMENT_HOST_RATE):
+        self.interval = 1.0 / per_second if per_second else 0
+        self._next    = {}
+        self._lock    = threading.Lock()
 
-            try:
-                r = requests.get(content_url, auth=auth, stream=True, timeout=30)
-                r.raise_for_status()
-                frappe.get_doc({
-                    "doctype":            "File",
-                    "file_name":          file_name,
-                    "attached_to_doctype":"Task",
-                    "attached_to_name":   task_name,
-                    "content":            r.content,
-                    "is_private":         1,
-                }).insert(ignore_permissions=True)
-            except Exception as e:
-                pass
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now   = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
 
-    frappe.db.commit()
 
+def _attachment_file_name(att):
+    """Deterministic on-disk name, so the Jira attachment id doubles as a dedupe key."""
+    safe = re.sub(r"[^\w.\-]+", "_", att.get("filename") or "attachment")
+    return f"jira_{att.get('id')}_{safe}"
 
-# ──────────────────────────────────────────────
-# RETRY FAILED (Left as async for one-offs)
-# ──────────────────────────────────────────────
 
-@frappe.whitelist()
-def retry_failed_issues(project_key):
-    failure_key = f"jira_migration_failures_{project_key}"
-    failed_keys = frappe.cache().lrange(failure_key, 0, -1)
-    if not failed_keys:
-        return "No failed issues"
+def _download_attachment(client, limiter, url, auth, path):
+    """
+    Worker thread: stream one attachment to `path` and return (md5, size).
+    Only HTTP and disk IO happen here; a file left by an interrupted run is reused.
+    """
+    if not os.path.exists(path):
+        limiter.wait(url)
+        tmp_path = f"{path}.part"
+        with client.get(url, auth=auth, stream=True) as r:
+            r.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(ATTACHMENT_CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
 
-    frappe.enqueue(
-        'erpnext_agile.jira_sync.retry_failed_worker',
-        queue='long', timeout=3600,
-        project_key=project_key,
-        failed_keys=[k.decode() if isinstance(k, bytes) else k for k in failed_keys]
-    )
-    return f"Retrying {len(failed_keys)} issues"
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(ATTACHMENT_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest(), os.path.getsize(path)
 
 
-def retry_failed_worker(project_key, failed_keys):
-    settings    = frappe.get_single("Jira Data Migration Tool")
-    jira_domain = settings.jira_domain
-    auth        = (settings.jira_email, settings.jira_api_token)
+def _insert_file_rows(rows):
+    if not rows:
+        return
+    now  = frappe.utils.now()
+    user = frappe.session.user
+    frappe.db.bulk_insert(
+        "File",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by",
+            "file_name", "file_url", "is_private", "folder",
+            "attached_to_doctype", "attached_to_name", "content_hash", "file_size",
+        ],
+        values=[
+            (frappe.generate_hash(length=10), now, now, user, user, *row)
+            for row in rows
+        ],
+    )
+    frappe.db.commit()
 
-    for key in failed_keys:
-        try:
-            res = requests.get(f"{jira_domain}/rest/api/2/issue/{key}?expand=names", auth=auth)
-            res.raise_for_status()
-            issue     = res.json()
-            names_map = issue.get("names", {})
-            run_single_issue(issue, jira_domain, auth, names_map)
-        except Exception:
-            frappe.log_error(frappe.get_traceback(), f"Retry Failed: {key}")
 
+def process_attachments_queue(attachments_buffer, auth, project_key=None, index=None):
+    """
+    Download Jira attachments with a bounded thread pool sharing the Jira client.
+    Bodies are streamed to private files in chunks, so worker memory stays flat,
+    and File rows are written in bulk. Already imported attachments are skipped
+    by Jira id (file url), by file name or by content hash, all from one preload.
+    """
+    index = index or IssueKeyIndex(project_key)
+
+    jobs = []
+    for item in attachments_buffer:
+        task_name = index.get(item.get("jira_key"))
+        if task_name:
+            jobs.extend((task_name, att) for att in item.get("attachments", []) if att.get("content"))
+    if not jobs:
+        return
 
-def run_single_issue(issue, domain, auth, names_map):
-    jira_key  = issue.get("key")
-    task_dict, dyn_fields, attachments, worklogs = build_task_dict_from_jira(
-        issue, domain, auth, names_map
+    existing = frappe.get_all(
+        "File",
+        filters={"attached_to_doctype": "Task", "attached_to_name": ["in", list({t for t, _att in jobs})]},
+        fields=["attached_to_name", "file_name", "file_url", "content_hash"]
     )
+    seen_urls   = {f.file_url for f in existing}
+    seen_names  = {(f.attached_to_name, f.file_name) for f in existing}
+    seen_hashes = {(f.attached_to_name, f.content_hash) for f in existing if f.content_hash}
 
-    raw_emails = batch_fetch_watcher_emails([jira_key], domain, auth).get(jira_key, [])
-    task_dict["watchers"] = [{"user": resolve_user(email)} for email in raw_emails]
+    files_dir = frappe.get_site_path("private", "files")
+    os.makedirs(files_dir, exist_ok=True)
 
-    existing = frappe.db.get_value("Task", {"issue_key": jira_key}, "name")
+    pending = []
+    for task_name, att in jobs:
+        disk_name = _attachment_file_name(att)
+        if f"/private/files/{disk_name}" in seen_urls or (task_name, att.get("filename")) in seen_names:
+            continue
+        seen_urls.add(f"/private/files/{disk_name}")
+        pending.append((task_name, att, disk_name))
+
+    total   = len(pending)
+    client  = get_jira_client(frappe.db.get_single_value("Jira Data Migration Tool", "jira_domain"), auth)
+    limiter = HostRateLimiter()
+    rows    = []
+
+    with ThreadPoolExecutor(max_workers=ATTACHMENT_WORKERS) as pool:
+        futures = {
+            pool.submit(
+                _download_attachment, client, limiter, att["content"], auth,
+                os.path.join(files_dir, disk_name)
+            ): (task_name, att, disk_name)
+            for task_name, att, disk_name in pending
+        }
 
-    if existing:
-        try:
-            doc = frappe.get_doc("Task", existing)
-            doc.update(task_dict)
-            doc.save(ignore_permissions=True)
-        except Exception as e:
-            if "Circular" in str(e):
-                try:
-                    frappe.clear_messages()
-                    doc        = frappe.get_doc("Task", existing)
-                    safe_data  = {**task_dict, "depends_on": []}
-                    doc.update(safe_data)
-                    doc.save(ignore_permissions=True)
-                except Exception:
-                    pass
-    else:
-        try:
-            frappe.get_doc(task_dict).insert(ignore_permissions=True)
-        except Exception as e:
-            if "Circular" in str(e):
-                try:
-                    frappe.clear_messages()
-                    frappe.get_doc({**task_dict, "depends_on": []}).insert(ignore_permissions=True)
-                except Exception:
-                    pass
+        for done, future in enumerate(as_completed(futures), 1):
+            task_name, att, disk_name = futures[future]
+            pulse_worker(project_key, f"Downloading Attachments ({done}/{total}): {att.get('filename')}")
 
-    frappe.db.commit()
+            try:
+                content_hash, size = future.result()
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"Attachment download failed: {att.get('filename')}")
+                continue
+
+            if (task_name, content_hash) in seen_hashes:
+                os.remove(os.path.join(files_dir, disk_name))
+                continue
+            seen_hashes.add((task_name, content_hash))
+
+            rows.append((
+                att.get("filename"), f"/private/files/{disk_name}", 1, "Home/Attachments",
+                "Task", task_name, content_hash, size,
+            ))
+            if len(rows) >= ATTACHMENT_FLUSH_SIZE:
+                _insert_file_rows(rows)
+                rows = []
+
+    _insert_file_rows(rows)
+
+
+# ──────────────────────────────────────────────
+# CHANGELOG (Status & sprint history, see jira_changelog.py)
+# ──────────────────────────────────────────────
 
-    if attachments:
-        frappe.enqueue('erpnext_agile.jira_sync.process_attachments_queue',
-                       attachments_buffer=[{"jira_key": jira_key, "attachments": attachments}],
-                       auth=auth, queue='long', timeout=3600)
-    if worklogs:
-        frappe.enqueue('erpnext_agile.jira_sync.process_worklogs_queue',
-                       worklogs_buffer=[{"jira_key": jira_key, "worklogs": worklogs}],
-                       queue='long', timeout=3600)
+def process_changelog_queue(changelog_buffer, fetcher, project_key=None, index=None, queue_key=None):
+    # jira_changelog imports this module
+    from erpnext_agile.jira_changelog import process_changelog_queue as _process
 
-    frappe.enqueue('erpnext_agile.jira_sync.process_comments_queue',
-                   comments_buffer=[{"jira_key": jira_key}],
-                   domain=domain, auth=auth, queue='long', timeout=3600)
+    return _process(changelog_buffer, fetcher, project_key, index, queue_key)
+
+
+# ──────────────────────────────────────────────
+# RETRY FAILED (Batched, see jira_retry.py)
+# ──────────────────────────────────────────────
+
+def record_failure(project_key, jira_key, exc):
+    # jira_retry imports this module
+    from erpnext_agile.jira_retry import record_failure as _record
+
+    _record(project_key, jira_key, exc)
+
+
+@frappe.whitelist()
+def retry_failed_issues(project_key):
+    queued = frappe.cache().llen(f"jira_migration_failures_{project_key}")
+    if not queued:
+        return "No failed issues"
+
+    checkpoint = load_checkpoint(project_key)
+    if checkpoint and checkpoint.status == "Running":
+        frappe.throw(f"Wait for the running migration of {project_key} to finish before retrying.")
+
+    frappe.enqueue(
+        'erpnext_agile.jira_retry.run_failed_retry',
+        queue='long', timeout=7200,
+        job_id=f"jira_retry_{project_key}", deduplicate=True,
+        project_key=project_key
+    )
+    return f"Retrying {queued} issues"
 
 
 # ──────────────────────────────────────────────
 # HIERARCHY
 # ──────────────────────────────────────────────
 
+HIERARCHY_TABLE = "jira_hierarchy_pairs"
+
+def _load_hierarchy_pairs(relationships):
+    """Load child -> parent issue keys into a temporary table and resolve both Task names by join."""
+    # DDL is refused inside a transaction with pending writes
+    frappe.db.commit()
+    frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{HIERARCHY_TABLE}`")
+    frappe.db.sql(f"""
+        CREATE TEMPORARY TABLE `{HIERARCHY_TABLE}` (
+            child_key   VARCHAR(140) NOT NULL PRIMARY KEY,
+            parent_key  VARCHAR(140) NOT NULL,
+            child_name  VARCHAR(140),
+            parent_name VARCHAR(140),
+            KEY parent_name (parent_name)
+        )
+    """)
+
+    pairs = [
+        (c.decode() if isinstance(c, bytes) else c, p.decode() if isinstance(p, bytes) else p)
+        for c, p in relationships.items()
+    ]
+    for i in range(0, len(pairs), 1000):
+        chunk = pairs[i:i + 1000]
+        frappe.db.sql(
+            f"INSERT IGNORE INTO `{HIERARCHY_TABLE}` (child_key, parent_key) VALUES "
+            + ", ".join(["(%s, %s)"] * len(chunk)),
+            [v for pair in chunk for v in pair]
+        )
+
+    frappe.db.sql(f"""
+        UPDATE `{HIERARCHY_TABLE}` h INNER JOIN `tabTask` t ON t.issue_key = h.child_key
+        SET h.child_name = t.name
+    """)
+    frappe.db.sql(f"""
+        UPDATE `{HIERARCHY_TABLE}` h INNER JOIN `tabTask` t ON t.issue_key = h.parent_key
+        SET h.parent_name = t.name
+    """)
+    frappe.db.sql(f"""
+        DELETE FROM `{HIERARCHY_TABLE}`
+        WHERE child_name IS NULL OR parent_name IS NULL OR child_name = parent_name
+    """)
+
+
 def weave_hierarchies(redis_key, project_key=None):
+    """Apply the Jira parent / epic links collected in Redis, then drop the queue."""
     relationships = frappe.cache().hgetall(redis_key)
     if not relationships:
         return
-        
-    total = len(relationships)
-    for i, (child, parent) in enumerate(relationships.items(), 1):
-        if i % 10 == 0 or i == 1:
-            pulse_worker(project_key, f"Mapping Epic Links ({i}/{total})...")
-            
-        child  = child.decode()  if isinstance(child,  bytes) else child
-        parent = parent.decode() if isinstance(parent, bytes) else parent
 
-        child_name  = frappe.db.get_value("Task", {"issue_key": child},  "name")
-        parent_name = frappe.db.get_value("Task", {"issue_key": parent}, "name")
+    pulse_worker(project_key, f"Mapping Epic Links ({len(relationships)})...")
+    apply_hierarchy_pairs(relationships)
+    frappe.cache().delete_key(redis_key)
 
-        if child_name and parent_name:
-            try:
-                if not frappe.db.get_value("Task", parent_name, "is_group"):
-                    frappe.db.set_value("Task", parent_name, "is_group", 1, update_modified=False)
-
-                frappe.db.set_value("Task", child_name, {
-                    "parent_task":  parent_name,
-                    "parent_issue": parent_name,
-                }, update_modified=False)
-
-                epic_doc = frappe.get_doc("Task", parent_name)
-                existing_deps = [d.task for d in epic_doc.get("depends_on", [])]
-                
-                if child_name not in existing_deps:
-                    epic_doc.append("depends_on", {
-                        "task": child_name,
-                        "subject": frappe.db.get_value("Task", child_name, "subject")
-                    })
-                    epic_doc.save(ignore_permissions=True)
-
-            except Exception as e:
-                pass
 
+def apply_hierarchy_pairs(relationships):
+    """
+    Apply child -> parent issue key pairs with set-based statements: parents
+    become groups, children get parent_task and the parents' depends_on rows
+    are added with one INSERT ... SELECT. Returns the number of children whose
+    Tasks were both found.
+    """
+    _load_hierarchy_pairs(relationships)
+    linked = frappe.db.sql(f"SELECT COUNT(*) FROM `{HIERARCHY_TABLE}`")[0][0]
+
+    frappe.db.sql(f"""
+        UPDATE `tabTask` p
+        INNER JOIN (SELECT DISTINCT parent_name FROM `{HIERARCHY_TABLE}`) h ON h.parent_name = p.name
+        SET p.is_group = 1
+        WHERE p.is_group = 0
+    """)
+
+    frappe.db.sql(f"""
+        UPDATE `tabTask` c
+        INNER JOIN `{HIERARCHY_TABLE}` h ON h.child_name = c.name
+        SET c.parent_task = h.parent_name, c.parent_issue = h.parent_name
+    """)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabTask Depends On`
+            (name, creation, modified, owner, modified_by, docstatus,
+             parent, parentfield, parenttype, idx, task, subject, project)
+        SELECT
+            LEFT(MD5(CONCAT(h.parent_name, '>', h.child_name)), 10), NOW(), NOW(), %(user)s, %(user)s, 0,
+            h.parent_name, 'depends_on', 'Task',
+            IFNULL(mx.idx, 0) + ROW_NUMBER() OVER (PARTITION BY h.parent_name ORDER BY h.child_key),
+            h.child_name, c.subject, c.project
+        FROM `{HIERARCHY_TABLE}` h
+        INNER JOIN `tabTask` c ON c.name = h.child_name
+        LEFT JOIN (
+            SELECT parent, MAX(idx) AS idx FROM `tabTask Depends On`
+            WHERE parenttype = 'Task' GROUP BY parent
+        ) mx ON mx.parent = h.parent_name
+        WHERE NOT EXISTS (
+            SELECT 1 FROM `tabTask Depends On` d
+            WHERE d.parenttype = 'Task' AND d.parent = h.parent_name AND d.task = h.child_name
+        )
+    """, {"user": frappe.session.user})
+
+    # Keep Task.depends_on_tasks in step with the rows, as Task.validate would
+    frappe.db.sql(f"""
+        UPDATE `tabTask` p
+        INNER JOIN (
+            SELECT d.parent, GROUP_CONCAT(DISTINCT d.task ORDER BY d.task SEPARATOR ',') AS tasks
+            FROM `tabTask Depends On` d
+            WHERE d.parenttype = 'Task'
+            AND d.parent IN (SELECT parent_name FROM `{HIERARCHY_TABLE}`)
+            GROUP BY d.parent
+        ) deps ON deps.parent = p.name
+        SET p.depends_on_tasks = CONCAT(deps.tasks, ',')
+    """)
+
+    # The DROP is DDL as well: commit the Task writes first, like _load_hierarchy_pairs does
     frappe.db.commit()
-    frappe.cache().delete_key(redis_key)
+    frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{HIERARCHY_TABLE}`")
+    return linked
 
 
 # ──────────────────────────────────────────────
@@ -1160,9 +1794,8 @@ def resolve_project(proj_data):
         }).insert(ignore_permissions=True).name
     return frappe.db.get_value("Project", {"project_name": name}, "name")
 
-def resolve_sprint(sprint_payload, project_name):
-    if not sprint_payload:
-        return None
+def _parse_sprint_payload(sprint_payload):
+    """Return (sprint_name, start_date, end_date) from a Jira sprint field value."""
     sprint_name = start_date = end_date = None
 
     if isinstance(sprint_payload, list) and len(sprint_payload) > 0:
@@ -1178,21 +1811,43 @@ def resolve_sprint(sprint_payload, project_name):
             m = re.search(r'endDate=([^,\]]+)', first)
             if m and m.group(1) != '<null>': end_date   = m.group(1)[:10]
 
-    if sprint_name and not frappe.db.exists("Agile Sprint", sprint_name):
-        try:
-            final_start = getdate(start_date) if start_date else frappe.utils.today()
-            final_end   = getdate(end_date)   if end_date   else frappe.utils.add_days(final_start, 14)
-            frappe.get_doc({
-                "doctype":      "Agile Sprint",
-                "sprint_name":  sprint_name,
-                "project":      project_name,
-                "sprint_state": "Active",
-                "start_date":   final_start,
-                "end_date":     final_end,
-            }).insert(ignore_permissions=True)
-        except Exception:
-            pass
-    return sprint_name
+    return sprint_name, start_date, end_date
+
+def _create_sprint(sprint_name, project_name, start_date=None, end_date=None):
+    try:
+        final_start = getdate(start_date) if start_date else frappe.utils.today()
+        final_end   = getdate(end_date)   if end_date   else frappe.utils.add_days(final_start, 14)
+        return frappe.get_doc({
+            "doctype":      "Agile Sprint",
+            "sprint_name":  sprint_name,
+            "project":      project_name,
+            "sprint_state": "Active",
+            "start_date":   final_start,
+            "end_date":     final_end,
+        }).insert(ignore_permissions=True).name
+    except Exception:
+        return None
+
+def resolve_sprint(sprint_payload, project_name):
+    if not sprint_payload:
+        return None
+    sprint_name, start_date, end_date = _parse_sprint_payload(sprint_payload)
+    if not sprint_name:
+        return None
+
+    # Sprints are named "{project_name}-{sprint_name}", so look them up by title within the project
+    existing = frappe.db.get_value("Agile Sprint", {"sprint_name": sprint_name, "project": project_name}, "name")
+    return existing or _create_sprint(sprint_name, project_name, start_date, end_date)
+
+def _create_release_version(version_name, project_name):
+    try:
+        return frappe.get_doc({
+            "doctype":      "Agile Release Version",
+            "version_name": version_name,
+            "project":      project_name,
+        }).insert(ignore_permissions=True).name
+    except Exception:
+        return None
 
 def resolve_version_table(versions_data, project_name):
     if not versions_data:
@@ -1204,15 +1859,7 @@ def resolve_version_table(versions_data, project_name):
             continue
         existing = frappe.db.exists("Agile Release Version", {"version_name": v_name, "project": project_name})
         if not existing:
-            try:
-                doc = frappe.get_doc({
-                    "doctype":      "Agile Release Version",
-                    "version_name": v_name,
-                    "project":      project_name,
-                }).insert(ignore_permissions=True)
-                existing = doc.name
-            except Exception:
-                pass
+            existing = _create_release_version(v_name, project_name)
         if existing:
             result.append({"version": existing})
     return result
@@ -1253,6 +1900,136 @@ def resolve_labels(labels_data):
 def resolve_user(email):
     return email if email and frappe.db.exists("User", email) else "Administrator"
 
+class JiraReferenceResolver:
+    """
+    Migration-scoped memo of Jira references -> ERPNext record names.
+    Each kind of reference is loaded with one query on first use, so building
+    a task dict is in-memory work. Missing sprints, versions and projects are
+    created once per distinct value; missing labels and components are queued
+    and written in one batch by `flush()`, which must run before Tasks are saved.
+    """
+
+    MASTER_FIELDS = {
+        "Agile Issue Label":     "label_name",
+        "Agile Issue Component": "component_name",
+    }
+
+    def __init__(self, issue_index=None):
+        self.tasks     = issue_index or IssueKeyIndex()
+        self._users    = None
+        self._projects = None
+        self._sprints  = {}
+        self._versions = {}
+        self._masters  = {}
+        self._pending  = {doctype: set() for doctype in self.MASTER_FIELDS}
+
+    def user(self, email):
+        if self._users is None:
+            self._users = set(frappe.get_all("User", pluck="name"))
+        return email if email and email in self._users else "Administrator"
+
+    def project(self, proj_data):
+        if not proj_data:
+            return None
+        if self._projects is None:
+            self._projects = {
+                p.project_name: p.name
+                for p in frappe.get_all("Project", fields=["name", "project_name"])
+            }
+        title = proj_data.get("name")
+        if title not in self._projects:
+            self._projects[title] = self._create(f"Project::{title}", lambda: resolve_project(proj_data))
+        return self._projects[title]
+
+    def sprint(self, sprint_payload, project_name):
+        if not sprint_payload:
+            return None
+        sprint_name, start_date, end_date = _parse_sprint_payload(sprint_payload)
+        if not sprint_name:
+            return None
+
+        if project_name not in self._sprints:
+            self._sprints[project_name] = {
+                s.sprint_name: s.name
+                for s in frappe.get_all("Agile Sprint", filters={"project": project_name}, fields=["name", "sprint_name"])
+            }
+        sprints = self._sprints[project_name]
+        if sprint_name not in sprints:
+            sprints[sprint_name] = self._create(
+                f"Agile Sprint::{project_name}::{sprint_name}",
+                lambda: _create_sprint(sprint_name, project_name, start_date, end_date)
+            )
+        return sprints[sprint_name]
+
+    def versions(self, versions_data, project_name):
+        if not versions_data:
+            return []
+        if project_name not in self._versions:
+            self._versions[project_name] = {
+                v.version_name: v.name
+                for v in frappe.get_all("Agile Release Version", filters={"project": project_name}, fields=["name", "version_name"])
+            }
+        versions = self._versions[project_name]
+
+        result = []
+        for v in versions_data:
+            v_name = v.get("name")
+            if not v_name:
+                continue
+            if v_name not in versions:
+                versions[v_name] = self._create(
+                    f"Agile Release Version::{project_name}::{v_name}",
+                    lambda: _create_release_version(v_name, project_name)
+                )
+            if versions[v_name]:
+                result.append({"version": versions[v_name]})
+        return result
+
+    def _create(self, ref, create):
+        """Create a missing record; sharded migrations override this to coordinate through Redis."""
+        return create()
+
+    def _master_rows(self, doctype, fieldname, values):
+        # Labels and components are named after their title (autoname field:...)
+        if doctype not in self._masters:
+            self._masters[doctype] = set(frappe.get_all(doctype, pluck="name"))
+        known = self._masters[doctype]
+
+        result = []
+        for value in values or []:
+            if not value:
+                continue
+            if value not in known:
+                known.add(value)
+                self._pending[doctype].add(value)
+            result.append({fieldname: value})
+        return result
+
+    def components(self, components_data):
+        return self._master_rows(
+            "Agile Issue Component", "component", [c.get("name") for c in components_data or []]
+        )
+
+    def labels(self, labels_data):
+        return self._master_rows("Agile Issue Label", "label", labels_data)
+
+    def flush(self):
+        """Create queued labels and components with one INSERT per doctype."""
+        now = frappe.utils.now()
+        user = frappe.session.user
+        for doctype, fieldname in self.MASTER_FIELDS.items():
+            pending = self._pending[doctype]
+            if not pending:
+                continue
+            frappe.db.bulk_insert(
+                doctype,
+                fields=["name", "creation", "modified", "owner", "modified_by", fieldname],
+                values=[(value, now, now, user, user, value) for value in sorted(pending)],
+                ignore_duplicates=True,
+            )
+            pending.clear()
+
+
 def map_resolution(val):
     allowed = ["Unresolved", "Done", "Won't Do", "Duplicate", "Cannot Reproduce"]
     return val if val in allowed else "Unresolved"
@@ -1262,20 +2039,33 @@ def map_resolution(val):
 # INTERNAL BATCH FLUSH HELPERS (Now with proper logging)
 # ──────────────────────────────────────────────
 
-def _flush_inserts(buf):
+def _flush_inserts(buf, bulk=False, index=None, failures=None):
+    """Insert buffered Task payloads; returns the failure count and fills `failures` (issue_key -> exception) if given."""
     fail_count = 0
+    index      = index or IssueKeyIndex()
+
+    if bulk and buf:
+        from erpnext_agile.bulk_task_import import bulk_insert_tasks
+
+        # Payloads rejected by the bulk validator go through the ORM so the real error is logged
+        inserted, rejected = bulk_insert_tasks(buf)
+        for issue_key, name in inserted.items():
+            index.add(issue_key, name)
+        buf = [payload for payload, _reason in rejected]
+
     for task_data in buf:
         ik = task_data.get("issue_key", "Unknown")
         try:
-            frappe.get_doc(task_data).insert(ignore_permissions=True)
+            index.add(ik, frappe.get_doc(task_data).insert(ignore_permissions=True).name)
         except Exception as e:
             # If it's a circular dependency, we strip dependencies and try one more time
             if "Circular" in str(e):
                 try:
                     frappe.clear_messages()
-                    frappe.get_doc({**task_data, "depends_on": []}).insert(ignore_permissions=True)
+                    index.add(ik, frappe.get_doc({**task_data, "depends_on": []}).insert(ignore_permissions=True).name)
                     continue
                 except Exception as fallback_e:
+                    e = fallback_e
                     frappe.log_error(
                         f"Fallback insert failed [{ik}]: {str(fallback_e)}\n\n{frappe.get_traceback()}", 
                         "Jira Sync Error"
@@ -1287,34 +2077,50 @@ def _flush_inserts(buf):
                     "Jira Sync Error"
                 )
             fail_count += 1
+            if failures is not None:
+                failures[ik] = e
             
     frappe.db.commit()
     return fail_count
 
 
-def _flush_updates(buf):
+def _save_changes(name, changes):
+    """Write a Task's changed fields: column writes for plain scalars, a full save otherwise."""
+    if not needs_save(changes):
+        # Hash-only changes do not count as a modification of the Task
+        frappe.db.set_value("Task", name, changes, update_modified=not set(changes) <= HASH_FIELDS)
+        return
+    doc = frappe.get_doc("Task", name)
+    doc.update(changes)
+    doc.save(ignore_permissions=True)
+
+
+def _flush_updates(buf, failures=None):
+    """Write changed fields of buffered Task payloads; `failures` is filled like in _flush_inserts."""
     fail_count = 0
+    if not buf:
+        return fail_count
+
+    differ = TaskDiffer([p["name"] for p in buf], {f for p in buf for f in p["data"]})
+
     for payload in buf:
-        ik = payload["data"].get("issue_key", "Unknown")
+        data = payload["data"]
+        ik   = data.get("issue_key", "Unknown")
         try:
-            doc     = frappe.get_doc("Task", payload["name"])
-            changes = _get_changes(doc, payload["data"])
-            if not changes:
-                continue
-            doc.update(changes)
-            doc.save(ignore_permissions=True)
+            changes = differ.changes(payload["name"], data)
+            if changes:
+                _save_changes(payload["name"], changes)
         except Exception as e:
             if "Circular" in str(e):
                 try:
                     frappe.clear_messages()
-                    doc       = frappe.get_doc("Task", payload["name"])
-                    safe_data = {**payload["data"], "depends_on": []}
-                    changes   = _get_changes(doc, safe_data)
+                    safe_data = {**data, "depends_on": []}
+                    changes   = differ.changes(payload["name"], safe_data)
                     if changes:
-                        doc.update(changes)
-                        doc.save(ignore_permissions=True)
+                        _save_changes(payload["name"], changes)
                     continue
                 except Exception as fallback_e:
+                    e = fallback_e
                     frappe.log_error(
                         f"Fallback update failed [{ik}]: {str(fallback_e)}\n\n{frappe.get_traceback()}", 
                         "Jira Sync Error"
@@ -1326,21 +2132,28 @@ def _flush_updates(buf):
                     "Jira Sync Error"
                 )
             fail_count += 1
+            if failures is not None:
+                failures[ik] = e
             
     frappe.db.commit()
     return fail_count
 
 @frappe.whitelist()
 def patch_epic_links_from_jira(project_key):
+    """
+    Re-fetch parent / Epic Link fields for a project from Jira and apply them
+    with apply_hierarchy_pairs, so every page costs one search request and the
+    Task updates run as a handful of set-based statements at the end.
+    """
     frappe.logger().info(f"Starting targeted Epic Link patch for project: {project_key}")
-    
+
     settings = frappe.get_single("Jira Data Migration Tool")
     domain = settings.jira_domain
     auth = (settings.jira_email, settings.jira_api_token)
 
     start_at = 0
-    patched_count = 0
-    
+    relationships = {}
+
     while True:
         # We only need the custom fields and parent data to map the hierarchy
         payload = {
@@ -1352,7 +2165,7 @@ def patch_epic_links_from_jira(project_key):
         }
         
         try:
-            res = requests.post(f"{domain}/rest/api/2/search", json=payload, auth=auth, headers={"Accept": "application/json"})
+            res = get_jira_client(domain, auth).post(f"{domain}/rest/api/2/search", json=payload, auth=auth)
             res.raise_for_status()
             data = res.json()
         except Exception as e:
@@ -1381,48 +2194,26 @@ def patch_epic_links_from_jira(project_key):
                 epic_val = epic_val.get("key") or epic_val.get("value")
             
             target_parent = std_parent or epic_val
-            
-            if target_parent:
-                child_name = frappe.db.get_value("Task", {"issue_key": child_key}, "name")
-                parent_name = frappe.db.get_value("Task", {"issue_key": target_parent}, "name")
-                
-                if child_name and parent_name:
-                    try:
-                        # 1. Update the hidden backend tree links
-                        frappe.db.set_value("Task", child_name, {
-                            "parent_task": parent_name,
-                            "parent_issue": parent_name
-                        }, update_modified=False)
-                        
-                        # 2. Make sure Epic is a group
-                        epic_doc = frappe.get_doc("Task", parent_name)
-                        if not epic_doc.is_group:
-                            epic_doc.db_set("is_group", 1, update_modified=False)
-                            
-                        # 3. Push to the UI child table
-                        existing_deps = [d.task for d in epic_doc.get("depends_on", [])]
-                        if child_name not in existing_deps:
-                            epic_doc.append("depends_on", {
-                                "task": child_name,
-                                "subject": frappe.db.get_value("Task", child_name, "subject")
-                            })
-                            epic_doc.flags.ignore_permissions = True
-                            epic_doc.save(ignore_version=True)
-                            patched_count += 1
-                            
-                    except Exception as e:
-                        frappe.log_error(f"Patch failed for {child_key} -> {target_parent}: {str(e)}", "Jira Patch Error")
+            if child_key and target_parent:
+                relationships[child_key] = target_parent
                         
         start_at += len(issues)
         if start_at >= data.get("total", 0):
             break
 
+    patched_count = 0
+    if relationships:
+        try:
+            patched_count = apply_hierarchy_pairs(relationships)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Epic Link patch failed for {project_key}: {str(e)}", "Jira Patch Error")
+            return f"❌ Failed to map Epic Links: {str(e)}"
+
+    # Renumber this project's trees so the Tree View renders perfectly
+    rebuild_task_trees({"issue_key": ["like", f"{project_key}-%"]})
     frappe.db.commit()
     
-    # Rebuild the NestedSet so the Tree View renders perfectly
-    from frappe.utils.nestedset import rebuild_tree
-    rebuild_tree("Task", "parent_task")
-    
     return f"✅ Fetched from Jira and successfully mapped {patched_count} child tasks to their Epics!"
 
 
@@ -0,0 +1,198 @@
+# erpnext_agile/migration_progress.py
+"""
+Low-overhead Jira migration progress
+Progress lives in one Redis hash per project key. Counters are accumulated
+in memory and flushed with HINCRBY, other fields are written at most once
+per interval, control state is read on a timer instead of per item and every
+flush is pushed to the migration tool with publish_realtime.
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint, flt, get_datetime, now_datetime
+
+from erpnext_agile.jira_client import get_client_stats
+
+FLUSH_INTERVAL = 1.0  # seconds between writes / realtime pushes
+CONTROL_INTERVAL = 2.0  # seconds between control state reads
+HEARTBEAT_TIMEOUT = 120  # seconds without a heartbeat before a run counts as crashed
+PROGRESS_EVENT = "jira_migration_progress"
+COUNTER_FIELDS = ("processed", "failed")
+JSON_FIELDS = ("http", "shards")
+
+
+def progress_key(project_key):
+	return frappe.cache().make_key(f"jira_migration_progress_{project_key}")
+
+
+def _decode(value):
+	return value.decode() if isinstance(value, bytes) else value
+
+
+def read_progress(project_key):
+	"""Raw progress hash of a project key"""
+	raw = frappe.cache().execute_command("HGETALL", progress_key(project_key)) or {}
+	return {_decode(k): _decode(v) for k, v in raw.items()}
+
+
+# ============================================
+# REPORTER
+# ============================================
+
+
+class ProgressReporter:
+	"""Buffered writer of one project's progress hash"""
+
+	def __init__(self, project_key, domain=None):
+		self.project_key = project_key
+		self.domain = domain
+		self.key = progress_key(project_key)
+		self._pending = dict.fromkeys(COUNTER_FIELDS, 0)
+		self._fields = {}
+		self._last_flush = 0.0
+		self._last_control = 0.0
+		self._control = "running"
+
+	def reset(self, **fields):
+		"""Start a new run: drop the previous hash and write the initial state"""
+		frappe.cache().execute_command("DEL", self.key)
+		self._pending = dict.fromkeys(COUNTER_FIELDS, 0)
+		self._control = "running"
+		self._last_control = 0.0
+		now = str(now_datetime())
+		values = {"processed": 0, "failed": 0, "total": 0, "percent": 0, "status": "running", **fields}
+		self.update(force=True, start_time=now, start_processed=values["processed"], **values)
+
+	def incr(self, processed=0, failed=0):
+		self._pending["processed"] += processed
+		self._pending["failed"] += failed
+		self._maybe_flush()
+
+	def update(self, force=False, **fields):
+		"""Set fields (status, phase, percent, total or absolute counters); status changes flush at once"""
+		for counter in COUNTER_FIELDS:
+			if counter in fields:
+				self._pending[counter] = 0
+		self._fields.update(fields)
+		self._maybe_flush(force or "status" in fields)
+
+	def _maybe_flush(self, force=False):
+		now = time.monotonic()
+		if force or now - self._last_flush >= FLUSH_INTERVAL:
+			self._last_flush = now
+			self.flush()
+
+	def flush(self):
+		fields = {**self._fields, "last_heartbeat": str(now_datetime())}
+		http = get_client_stats(self.domain)
+		if http:
+			fields["http"] = http
+
+		pipe = frappe.cache().pipeline()
+		pipe.hset(
+			self.key,
+			mapping={
+				k: json.dumps(v) if k in JSON_FIELDS else ("" if v is None else str(v))
+				for k, v in fields.items()
+			},
+		)
+		for counter, amount in self._pending.items():
+			if amount:
+				pipe.hincrby(self.key, counter, amount)
+		pipe.expire(self.key, 86400)
+		pipe.execute()
+
+		self._fields = {}
+		self._pending = dict.fromkeys(COUNTER_FIELDS, 0)
+
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{"project_key": self.project_key, **progress_payload(self.project_key)},
+			doctype="Jira Data Migration Tool",
+			docname="Jira Data Migration Tool",
+		)
+
+	def control(self):
+		"""check_control() at most every CONTROL_INTERVAL seconds; a stop is remembered"""
+		from erpnext_agile.jira_sync import check_control
+
+		now = time.monotonic()
+		if self._control != "stopped" and now - self._last_control >= CONTROL_INTERVAL:
+			self._control = check_control(self.project_key)
+			self._last_control = time.monotonic()
+		return self._control
+
+
+def get_reporter(project_key, domain=None):
+	"""
+	Reporter shared by every phase of a project's run within the current job.
+	Kept on frappe.local, so the next job in the same worker starts with a
+	fresh reporter instead of inheriting a remembered stop.
+	"""
+	reporters = getattr(frappe.local, "jira_progress_reporters", None)
+	if reporters is None:
+		reporters = frappe.local.jira_progress_reporters = {}
+	if project_key not in reporters:
+		reporters[project_key] = ProgressReporter(project_key, domain)
+	elif domain:
+		reporters[project_key].domain = domain
+	return reporters[project_key]
+
+
+# ============================================
+# PAYLOAD
+# ============================================
+
+
+def progress_payload(project_key):
+	"""Progress for the migration tool, with items/sec and ETA derived from the counters"""
+	state = read_progress(project_key)
+	if not state:
+		return {
+			"status": "idle",
+			"phase": "Awaiting Start...",
+			"total": 0,
+			"processed": 0,
+			"failed": 0,
+			"percent": 0,
+			"eta": None,
+			"items_per_sec": 0,
+		}
+
+	processed = cint(state.get("processed"))
+	total = cint(state.get("total"))
+	status = state.get("status") or "running"
+	phase = state.get("phase") or "Initializing..."
+	now = now_datetime()
+
+	warning = None
+	heartbeat = state.get("last_heartbeat")
+	if heartbeat and status == "running":
+		if (now - get_datetime(heartbeat)).total_seconds() > HEARTBEAT_TIMEOUT:
+			warning = "Migration heartbeat expired (no progress for 2 minutes). Worker likely crashed."
+			status = "failed"
+			phase = "Worker Crashed/Timeout"
+
+	rate = eta = None
+	if state.get("start_time"):
+		elapsed = (now - get_datetime(state["start_time"])).total_seconds()
+		done = processed - cint(state.get("start_processed"))
+		if elapsed > 0 and done > 0:
+			rate = done / elapsed
+			if total:
+				eta = round(max(total - processed, 0) / rate, 2)
+
+	return {
+		"status": status,
+		"phase": phase,
+		"total": total,
+		"processed": processed,
+		"failed": cint(state.get("failed")),
+		"percent": flt(state.get("percent")),
+		"items_per_sec": round(rate, 2) if rate else 0,
+		"eta": eta,
+		"warning": warning,
+		**{k: json.loads(state[k]) for k in JSON_FIELDS if state.get(k)},
+	}
@@ -1,6 +1,12 @@
 import frappe
 from frappe import _
 from erpnext.projects.doctype.project.project import Project
+from erpnext_agile.permission_context import get_permission_context
+from erpnext_agile.task_visibility import (
+    clear_member_projects_cache,
+    get_member_projects,
+    get_strict_projects,
+)
 
 
 class AgileProject(Project):
@@ -56,6 +62,8 @@ class AgileProject(Project):
                     'user': self.custom_project_manager
                 }).insert(ignore_permissions=True)
 
+        clear_member_projects_cache([self.owner, self.custom_project_manager])
+
 
 # ============================================
 # PERMISSION QUERY CONDITIONS FOR PROJECT
@@ -64,7 +72,7 @@ class AgileProject(Project):
 @frappe.whitelist()
 def get_project_permission_query_conditions(user):
     """Permission query for Project doctype"""
-    if "Administrator" in frappe.get_roles(user):
+    if get_permission_context(user).has_role("Administrator"):
         return ""
     # if "Projects Manager" in frappe.get_roles(user):
     #     return ""
@@ -81,20 +89,14 @@ def get_project_permission_query_conditions(user):
 def has_project_permission(doc, perm_type=None, user=None):
     """Permission validator for Project doctype"""
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_privileged():
         return True
     if doc.owner == user:
         return True
 
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.name, 'user': user}
-    )
-
-    return bool(user_in_project)
+    return ctx.in_project(doc.name)
 
 
 # ============================================
@@ -105,89 +107,73 @@ def has_project_permission(doc, perm_type=None, user=None):
 def get_task_permission_query_conditions(user):
     """
     Dynamically route permission logic based on the Task's parent Project settings.
+    Project sets come from Redis and direct involvement from the precomputed
+    `Agile Task Visibility` table, so the condition is a single indexed lookup.
     """
     
-    roles = frappe.get_roles(user)
+    roles = get_permission_context(user).roles
     user_quoted = frappe.db.escape(user)
     
     # 1. System Admins get a free pass.
     if "Administrator" in roles:
         return ""
-        
+
+    member_projects = get_member_projects(user)
+
     # 2. Project Managers get standard visibility across their projects.
     if "Projects Manager" in roles:
         return f"""
-            (`tabTask`.name IN (
-                SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted}
-            )
-            OR `tabTask`.project IN (
-                SELECT parent FROM `tabProject User` WHERE user = {user_quoted}
+            (`tabTask`.project IN ({_sql_list(member_projects)})
+            OR `tabTask`.name IN (
+                SELECT task FROM `tabAgile Task Visibility`
+                WHERE user = {user_quoted} AND is_assigned = 1
             ))
         """
 
-    # 3. Standard Users: Let SQL do the thinking based on the Project Master.
-    # We use a combined OR statement to apply the right rule based on the project's flag.
+    # 3. Standard Users:
+    #    SCENARIO A: Project has strict assignment visibility enabled (= 1):
+    #      assignees, owner, reporter, original owner and watchers can see the Task.
+    #    SCENARIO B: Project has it disabled (= 0), OR the Task has no project at all:
+    #      assignees and project members can see the Task.
+    strict_projects = set(get_strict_projects())
+    open_projects = [p for p in member_projects if p not in strict_projects]
+
     return f"""
         (
-            -- SCENARIO A: Project has strict assignment visibility enabled (= 1)
-            `tabTask`.project IN (
-                SELECT name FROM `tabProject` 
-                WHERE custom_enable_assignment_based_visibility = 1
-            )
-            AND (
-                `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted})
-                OR `tabTask`.owner = {user_quoted}
-                OR `tabTask`.reporter = {user_quoted}
-                OR `tabTask`.custom_original_owner = {user_quoted}
-                OR `tabTask`.name IN (SELECT parent FROM `tabAgile Issue Watcher` WHERE user = {user_quoted})
-            )
-        )
-        OR
-        (
-            -- SCENARIO B: Project has it disabled (= 0), OR the Task has no project at all
-            (
-                `tabTask`.project IS NULL 
-                OR `tabTask`.project IN (
-                    SELECT name FROM `tabProject` 
-                    WHERE IFNULL(custom_enable_assignment_based_visibility, 0) = 0
-                )
-            )
-            AND (
-                `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted})
-                OR `tabTask`.project IN (SELECT parent FROM `tabProject User` WHERE user = {user_quoted})
+            `tabTask`.project IN ({_sql_list(open_projects)})
+            OR `tabTask`.name IN (
+                SELECT task FROM `tabAgile Task Visibility`
+                WHERE user = {user_quoted}
+                AND (is_assigned = 1 OR project IN ({_sql_list(strict_projects)}))
             )
         )
     """
 
 
+def _sql_list(values):
+    """Escape values for an SQL IN clause, never producing an empty list"""
+    return ", ".join(frappe.db.escape(v) for v in sorted(values)) or "''"
+
+
 def has_task_permission(doc, perm_type=None, user=None):
     """
     Restrict access to only assigned users.
     Admins and Project Managers have full access.
     """
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
-        return True
-    if "Projects User" in frappe.get_roles(user):
+    if ctx.has_role("Administrator", "Projects Manager", "Projects User"):
         return True
 
     # Allow creation if user is in the project
     if perm_type == "create":
         if doc.project:
-            return frappe.db.exists('Project User', {
-                'parent': doc.project, 
-                'user': user
-            })
+            return ctx.in_project(doc.project)
         return True  # Allow if no project specified
 
     # For existing tasks, check assignment
-    if frappe.db.exists('Assigned To Users', {'parent': doc.name, 'user': user}):
-        return True
-
-    return False
+    return ctx.is_assigned(doc.name)
 
 
 # ============================================
@@ -209,7 +195,7 @@ def task_list_query_filter(filters, user):
 @frappe.whitelist()
 def get_agile_sprint_permission_query_conditions(user):
     """Permission query for Agile Sprint doctype"""
-    if "Administrator" in frappe.get_roles(user):
+    if get_permission_context(user).has_role("Administrator"):
         return ""
     # if "Projects Manager" in frappe.get_roles(user):
     #     return ""
@@ -224,22 +210,16 @@ def get_agile_sprint_permission_query_conditions(user):
 
 
 def has_agile_sprint_permission(doc, perm_type=None, user=None):
-    """Permission validator for Test Cycle doctype"""
+    """Permission validator for Agile Sprint doctype"""
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_privileged():
         return True
     if doc.owner == user:
         return True
 
-    user_in_project_sprint = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
-
-    return bool(user_in_project_sprint)
+    return ctx.in_project(doc.project)
 
 # ============================================
 # PERMISSION QUERY CONDITIONS FOR TEST CYCLE
@@ -248,7 +228,7 @@ def has_agile_sprint_permission(doc, perm_type=None, user=None):
 @frappe.whitelist()
 def get_test_cycle_permission_query_conditions(user):
     """Permission query for Test Cycle doctype"""
-    if "Administrator" in frappe.get_roles(user):
+    if get_permission_context(user).has_role("Administrator"):
         return ""
     # if "Projects Manager" in frappe.get_roles(user):
     #     return ""
@@ -269,20 +249,14 @@ def get_test_cycle_permission_query_conditions(user):
 def has_test_cycle_permission(doc, perm_type=None, user=None):
     """Permission validator for Test Cycle doctype"""
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_privileged():
         return True
     if doc.owner_user == user:
         return True
 
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
-
-    return bool(user_in_project)
+    return ctx.in_project(doc.project)
 
 
 # ============================================
@@ -292,7 +266,7 @@ def has_test_cycle_permission(doc, perm_type=None, user=None):
 @frappe.whitelist()
 def get_test_case_permission_query_conditions(user):
     """Permission query for Test Case doctype"""
-    if "Administrator" in frappe.get_roles(user):
+    if get_permission_context(user).has_role("Administrator"):
         return ""
     # if "Projects Manager" in frappe.get_roles(user):
     #     return ""
@@ -312,20 +286,14 @@ def get_test_case_permission_query_conditions(user):
 def has_test_case_permission(doc, perm_type=None, user=None):
     """Permission validator for Test Case doctype"""
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_privileged():
         return True
     if doc.owner == user:
         return True
 
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
-
-    return bool(user_in_project)
+    return ctx.in_project(doc.project)
 
 
 # =================================================
@@ -335,7 +303,7 @@ def has_test_case_permission(doc, perm_type=None, user=None):
 @frappe.whitelist()
 def get_test_execution_permission_query_conditions(user):
     """Permission query for Test Execution doctype"""
-    if "Administrator" in frappe.get_roles(user):
+    if get_permission_context(user).has_role("Administrator"):
         return ""
     # if "Projects Manager" in frappe.get_roles(user):
     #     return ""
@@ -371,10 +339,9 @@ def has_test_exec_permission(doc, perm_type=None, user=None):
     User must have access to the Test Case OR Test Cycle.
     """
     user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_privileged():
         return True
     
     if doc.owner == user:
@@ -382,30 +349,24 @@ def has_test_exec_permission(doc, perm_type=None, user=None):
 
     has_cycle_access = False
     if doc.test_cycle:
-        test_cycle = frappe.get_doc("Test Cycle", doc.test_cycle)
+        test_cycle = ctx.get_values("Test Cycle", doc.test_cycle, ["owner_user", "project"])
         
         # User is cycle owner or in the project
-        if test_cycle.owner_user == user:
+        if test_cycle and test_cycle.owner_user == user:
             has_cycle_access = True
-        elif test_cycle.project:
-            has_cycle_access = frappe.db.exists(
-                'Project User',
-                {'parent': test_cycle.project, 'user': user}
-            )
+        elif test_cycle and test_cycle.project:
+            has_cycle_access = ctx.in_project(test_cycle.project)
     
     # Check Test Case access
     has_case_access = False
     if doc.test_case:
-        test_case = frappe.get_doc("Test Case", doc.test_case)
+        test_case = ctx.get_values("Test Case", doc.test_case, ["owner", "project"])
         
         # User is case owner or in the project
-        if test_case.owner == user:
+        if test_case and test_case.owner == user:
             has_case_access = True
-        elif test_case.project:
-            has_case_access = frappe.db.exists(
-                'Project User',
-                {'parent': test_case.project, 'user': user}
-            )
+        elif test_case and test_case.project:
+            has_case_access = ctx.in_project(test_case.project)
     
     # User must have access to BOTH cycle and case (if they exist)
     if doc.test_cycle and not has_cycle_access:
@@ -414,4 +375,70 @@ def has_test_exec_permission(doc, perm_type=None, user=None):
         return False
     
     # If either cycle or case exists and user has access, allow
-    return has_cycle_access or has_case_access
\ No newline at end of file
+    return has_cycle_access or has_case_access
+
+
+# ============================================
+# BULK PERMISSION CHECKS
+# ============================================
+
+PERMISSION_CHECKS = {
+    "Project": has_project_permission,
+    "Task": has_task_permission,
+    "Agile Sprint": has_agile_sprint_permission,
+    "Test Cycle": has_test_cycle_permission,
+    "Test Case": has_test_case_permission,
+    "Test Execution": has_test_exec_permission,
+}
+
+
+def check_many(docs, perm_type="read", user=None):
+    """
+    Evaluate the has_*_permission validators for many documents at once.
+    Linked Test Cycles / Test Cases are prefetched in one query each and
+    roles / memberships are shared through the request permission context.
+
+    Returns:
+        Dict of document name -> bool
+    """
+    user = user or frappe.session.user
+    ctx = get_permission_context(user)
+    docs = [frappe._dict(d) if isinstance(d, dict) else d for d in docs]
+
+    if not ctx.is_privileged():
+        executions = [d for d in docs if d.get("doctype") == "Test Execution"]
+        if executions:
+            ctx.prefetch("Test Cycle", {d.test_cycle for d in executions}, ["owner_user", "project"])
+            ctx.prefetch("Test Case", {d.test_case for d in executions}, ["owner", "project"])
+
+    result = {}
+    for doc in docs:
+        check = PERMISSION_CHECKS.get(doc.get("doctype"))
+        result[doc.name] = bool(check(doc, perm_type, user)) if check else True
+    return result
+
+
+@frappe.whitelist()
+def get_permitted_names(doctype, names, perm_type="read"):
+    """API: Filter a list of document names down to the ones the session user may access"""
+    if isinstance(names, str):
+        names = frappe.parse_json(names)
+
+    if doctype not in PERMISSION_CHECKS or not names:
+        return list(names or [])
+
+    fields = {
+        "Project": ["name", "owner"],
+        "Task": ["name", "project"],
+        "Agile Sprint": ["name", "owner", "project"],
+        "Test Cycle": ["name", "owner_user", "project"],
+        "Test Case": ["name", "owner", "project"],
+        "Test Execution": ["name", "owner", "test_cycle", "test_case"],
+    }[doctype]
+
+    rows = frappe.get_all(doctype, filters={"name": ["in", names]}, fields=fields)
+    for row in rows:
+        row.doctype = doctype
+
+    allowed = check_many(rows, perm_type)
+    return [name for name in names if allowed.get(name)]
@@ -5,8 +5,10 @@ import re
 from frappe.desk.form.assign_to import add, clear, remove
 from erpnext.projects.doctype.task.task import Task
 from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+    flush_issue_activities,
     log_issue_activity,
 )
+from erpnext_agile.progress_rollup import rollup_parent_progress
 from frappe.utils import getdate, now_datetime, today
 
 class AgileTask(Task):
@@ -15,6 +17,7 @@ class AgileTask(Task):
         if self.is_agile:
             log_issue_activity(self.name, "created this issue")
             self.handle_assignment_for_new_tasks()
+            flush_issue_activities(self.name)
     
     def before_validate(self):
         if self.is_agile:
@@ -56,8 +59,8 @@ class AgileTask(Task):
         if self.is_agile:
             self.handle_issue_activity_update()
             
-            # Update parent task progress if this is a subtask
-            if self.parent_issue:
+            # Update parent task progress if this is (or was) a subtask
+            if self.parent_issue or self.has_value_changed("parent_issue"):
                 self.update_parent_progress()
             
             # Update sprint metrics if task is in a sprint
@@ -68,6 +71,8 @@ class AgileTask(Task):
                 self.update_sprint_statistics()
             elif self.story_points and self.has_value_changed("story_points"):
                 self.update_sprint_metrics()
+
+            flush_issue_activities(self.name)
                 
     def on_trash(self):
         """Handle cleanup on deletion"""
@@ -78,31 +83,15 @@ class AgileTask(Task):
                 self.update_sprint_metrics()
                 
     def update_parent_progress(self):
-        """Update parent task's completion percentage"""
-        if not self.parent_issue:
-            return
-        
-        # Get all subtasks
-        subtasks = frappe.get_all(
-            "Task",
-            filters={"parent_issue": self.parent_issue},
-            fields=["name", "issue_status"]
-        )
-        
-        if not subtasks:
-            return
-        
-        # Count completed subtasks
-        completed = len([
-            t for t in subtasks 
-            if frappe.db.get_value("Agile Issue Status", t.issue_status, "status_category") == "Done"
-        ])
-        
-        total = len(subtasks)
-        progress = (completed / total * 100) if total > 0 else 0
-        
-        # Update parent
-        frappe.db.set_value("Task", self.parent_issue, "progress", progress, update_modified=False)
+        """Update parent task's completion percentage and roll it up the hierarchy"""
+        if self.parent_issue:
+            rollup_parent_progress(self.parent_issue)
+
+        # The old parent lost a child, so its progress needs a refresh too
+        old_doc = self.get_doc_before_save()
+        old_parent = old_doc.parent_issue if old_doc else None
+        if old_parent and old_parent != self.parent_issue:
+            rollup_parent_progress(old_parent)
     
 
     def update_sprint_statistics(self):
@@ -231,10 +220,12 @@ class AgileTask(Task):
             "remaining_estimate": "remaining estimate",
         }
         
+        old_doc = self.get_doc_before_save()
+
         # Track specific field changes
         for field in field_maps.keys():
             if self.has_value_changed(field):
-                old_value = self.get_doc_before_save().get(field) if self.get_doc_before_save() else None
+                old_value = old_doc.get(field) if old_doc else None
                 new_value = self.get(field)
                 
                 # Format the activity message
@@ -0,0 +1,17 @@
+import frappe
+
+
+def execute():
+	"""Index tabTask.issue_key so Jira imports and key lookups avoid full table scans"""
+	ensure_issue_key_index()
+
+
+def ensure_issue_key_index():
+	if not frappe.db.has_column("Task", "issue_key"):
+		return
+
+	# The unique constraint from the custom field already provides an index named after the column
+	if frappe.db.has_index("tabTask", "issue_key") or frappe.db.has_index("tabTask", "issue_key_index"):
+		return
+
+	frappe.db.add_index("Task", ["issue_key"], index_name="issue_key_index")
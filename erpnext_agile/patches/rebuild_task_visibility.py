@@ -0,0 +1,15 @@
+import frappe
+
+from erpnext_agile.task_visibility import (
+	clear_member_projects_cache,
+	clear_strict_projects_cache,
+	rebuild_task_visibility,
+)
+
+
+def execute():
+	"""Backfill the Task visibility table used by Task permission query conditions"""
+	frappe.reload_doc("erpnext_agile", "doctype", "agile_task_visibility")
+	rebuild_task_visibility()
+	clear_member_projects_cache()
+	clear_strict_projects_cache()
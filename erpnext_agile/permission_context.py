@@ -0,0 +1,117 @@
+# erpnext_agile/permission_context.py
+"""
+Request-scoped permission context
+Memoizes roles, project memberships, assignments and linked document values
+so has_*_permission checks do not hit the database once per document.
+Assignment and role changes drop the affected contexts, so long jobs that
+keep one frappe.local do not check against stale data.
+"""
+
+import frappe
+
+from erpnext_agile.task_visibility import get_member_projects
+
+PRIVILEGED_ROLES = ("Administrator", "Projects Manager")
+
+
+class PermissionContext:
+	"""Per-user permission lookups cached for the lifetime of a request"""
+
+	def __init__(self, user):
+		self.user = user
+		self._roles = None
+		self._projects = None
+		self._assigned_tasks = None
+		self._values = {}
+
+	@property
+	def roles(self):
+		if self._roles is None:
+			self._roles = set(frappe.get_roles(self.user))
+		return self._roles
+
+	def has_role(self, *roles):
+		return any(role in self.roles for role in roles)
+
+	def is_privileged(self):
+		"""Administrator and Projects Manager bypass project level checks"""
+		return self.has_role(*PRIVILEGED_ROLES)
+
+	@property
+	def projects(self):
+		if self._projects is None:
+			self._projects = set(get_member_projects(self.user))
+		return self._projects
+
+	def in_project(self, project):
+		return bool(project) and project in self.projects
+
+	def is_assigned(self, task):
+		if self._assigned_tasks is None:
+			self._assigned_tasks = set(
+				frappe.get_all(
+					"Assigned To Users", filters={"user": self.user, "parenttype": "Task"}, pluck="parent"
+				)
+			)
+		return task in self._assigned_tasks
+
+	def get_values(self, doctype, name, fields):
+		"""Fetch (and memoize) a few fields of a linked document"""
+		if not name:
+			return None
+		key = (doctype, name)
+		if key not in self._values:
+			self._values[key] = frappe.db.get_value(doctype, name, fields, as_dict=True)
+		return self._values[key]
+
+	def prefetch(self, doctype, names, fields):
+		"""Load linked document values for many names in one query"""
+		missing = {n for n in names if n and (doctype, n) not in self._values}
+		if not missing:
+			return
+		rows = frappe.get_all(doctype, filters={"name": ["in", list(missing)]}, fields=["name", *fields])
+		for row in rows:
+			self._values[(doctype, row.name)] = row
+		for name in missing - {row.name for row in rows}:
+			self._values[(doctype, name)] = None
+
+
+def get_permission_context(user=None):
+	"""Return the memoized permission context for a user in the current request"""
+	user = user or frappe.session.user
+	contexts = getattr(frappe.local, "agile_permission_contexts", None)
+	if contexts is None:
+		contexts = frappe.local.agile_permission_contexts = {}
+	if user not in contexts:
+		contexts[user] = PermissionContext(user)
+	return contexts[user]
+
+
+def clear_permission_context(users=None):
+	"""Forget memoized permission data of `users` (all users by default), e.g. after project membership changes"""
+	if users is None:
+		frappe.local.agile_permission_contexts = {}
+		return
+	contexts = getattr(frappe.local, "agile_permission_contexts", None) or {}
+	for user in users:
+		contexts.pop(user, None)
+
+
+def on_todo_change(doc, method=None):
+	"""Hook: a Task assignment was added, cancelled, closed or deleted"""
+	if doc.reference_type == "Task" and doc.allocated_to:
+		clear_permission_context([doc.allocated_to])
+
+
+def on_task_update(doc, method=None):
+	"""Hook: forget the assignments of users added to or removed from a Task"""
+	old_doc = doc.get_doc_before_save()
+	old_users = {row.user for row in old_doc.get("assigned_to_users", [])} if old_doc else set()
+	new_users = {row.user for row in doc.get("assigned_to_users", [])}
+	if old_users != new_users:
+		clear_permission_context(old_users ^ new_users)
+
+
+def on_user_update(doc, method=None):
+	"""Hook: roles of a user may have changed"""
+	clear_permission_context([doc.name])
@@ -0,0 +1,134 @@
+# erpnext_agile/progress_rollup.py
+"""
+Hierarchical progress rollup for Epic -> Story -> Sub-task trees
+Computes parent completion with set-based queries instead of per-child lookups
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+# Parent progress is completed children / total children: a child counts
+# as 100% when its status is in the Done category and 0% otherwise.
+CHILD_SCORE_SQL = """
+    CASE WHEN s.status_category = 'Done' THEN 100 ELSE 0 END
+"""
+
+MAX_ROLLUP_DEPTH = 20
+
+
+def compute_parent_progress(parent):
+	"""Compute a parent's progress from its direct children in one aggregate query"""
+	result = frappe.db.sql(
+		f"""
+        SELECT
+            COUNT(*) AS total,
+            SUM({CHILD_SCORE_SQL}) AS score
+        FROM `tabTask` t
+        LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+        WHERE t.parent_issue = %s
+    """,
+		parent,
+		as_dict=True,
+	)
+
+	if not result or not result[0].total:
+		return None
+
+	return round(flt(result[0].score) / result[0].total, 2)
+
+
+def rollup_parent_progress(parent):
+	"""
+	Recompute progress for a parent and walk up the parent_issue chain.
+	Propagation stops as soon as a parent's stored progress does not change.
+	"""
+	visited = set()
+
+	while parent and parent not in visited and len(visited) < MAX_ROLLUP_DEPTH:
+		visited.add(parent)
+
+		current = frappe.db.get_value("Task", parent, ["progress", "parent_issue"], as_dict=True)
+		if not current:
+			return
+
+		progress = compute_parent_progress(parent)
+		if progress is None or flt(current.progress, 2) == progress:
+			return
+
+		frappe.db.set_value("Task", parent, "progress", progress, update_modified=False)
+		parent = current.parent_issue
+
+
+def rebuild_project_progress(project):
+	"""
+	Bulk mode: recompute progress for every parent in a project tree in one pass.
+	Done/total counts for every parent are accumulated in a single scan
+	of the project's tasks, then only changed values are written back.
+	"""
+	tasks = frappe.db.sql(
+		"""
+        SELECT
+            t.name, t.parent_issue, t.progress,
+            s.status_category
+        FROM `tabTask` t
+        LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+        WHERE t.project = %s
+        ORDER BY t.lft DESC
+    """,
+		project,
+		as_dict=True,
+	)
+
+	if not tasks:
+		return 0
+
+	progress = {t.name: flt(t.progress, 2) for t in tasks}
+	totals = {}
+
+	for task in tasks:
+		if not task.parent_issue:
+			continue
+
+		child_score = 100 if task.status_category == "Done" else 0
+
+		score, count = totals.get(task.parent_issue, (0, 0))
+		totals[task.parent_issue] = (score + child_score, count + 1)
+
+	for parent, (score, count) in totals.items():
+		progress[parent] = round(score / count, 2)
+
+	changed = {
+		t.name: progress[t.name] for t in tasks if t.name in totals and progress[t.name] != flt(t.progress, 2)
+	}
+
+	for chunk in _chunks(list(changed.items()), 500):
+		case_sql = " ".join(["WHEN %s THEN %s"] * len(chunk))
+		values = [v for pair in chunk for v in pair] + [[pair[0] for pair in chunk]]
+		frappe.db.sql(
+			f"""
+            UPDATE `tabTask`
+            SET progress = CASE name {case_sql} END
+            WHERE name IN %s
+        """,
+			values,
+		)
+
+	return len(changed)
+
+
+def _chunks(items, size):
+	for i in range(0, len(items), size):
+		yield items[i : i + size]
+
+
+@frappe.whitelist()
+def recalculate_project_progress(project):
+	"""API: Recompute parent progress for a whole project tree"""
+	if not frappe.has_permission("Project", "write", project):
+		frappe.throw(_("Not permitted"), frappe.PermissionError)
+
+	updated = rebuild_project_progress(project)
+	frappe.db.commit()
+
+	return {"success": True, "updated": updated}
@@ -0,0 +1,151 @@
+# erpnext_agile/task_diff.py
+"""
+Field diffing for Jira re-syncs
+Compares incoming Task payloads with stored values loaded in bulk, using
+typed comparators instead of JSON round-trips on a full Task document per
+issue. Issues whose Jira content did not change are skipped before this
+point by custom_jira_content_hash, so no second hash of the mapped payload
+is kept.
+"""
+
+import frappe
+from frappe.model import no_value_fields, table_fields
+from frappe.utils import cint, cstr, flt, get_datetime, getdate
+
+# Child tables compared by the set of one key column
+TABLE_KEYS = {
+	"assigned_to_users": "user",
+	"watchers": "user",
+	"custom_components": "component",
+	"custom_labels": "label",
+	"custom_fix_versions": "version",
+	"custom_affect_versions": "version",
+	"depends_on": "task",
+}
+
+HASH_FIELDS = {"custom_jira_content_hash"}
+
+# Changes to these go through Task.save: they drive derived fields, activity
+# logs, sprint metrics, visibility, dependent rows, parent dates, sanitizing
+# or the tree. Other scalar changes are written directly.
+HOOKED_FIELDS = {
+	"project",
+	"issue_status",
+	"status",
+	"issue_priority",
+	"priority",
+	"issue_type",
+	"is_group",
+	"current_sprint",
+	"story_points",
+	"expected_time",
+	"original_estimate",
+	"remaining_estimate",
+	"time_spent",
+	"custom_original_owner",
+	"parent_issue",
+	"parent_task",
+	"completed_on",
+	"completed_by",
+	"subject",
+	"description",
+	"exp_start_date",
+	"exp_end_date",
+}
+
+INT_TYPES = {"Int", "Check"}
+FLOAT_TYPES = {"Float", "Currency", "Percent", "Duration"}
+
+
+# ============================================
+# COMPARATORS
+# ============================================
+
+
+def normalize(df, value):
+	"""Comparable form of a field value for its fieldtype"""
+	fieldtype = df.fieldtype if df else None
+	if fieldtype in INT_TYPES:
+		return cint(value)
+	if fieldtype in FLOAT_TYPES:
+		return round(flt(value), 6)
+	if value is None or value == "":
+		return None
+	if fieldtype == "Date":
+		return getdate(value)
+	if fieldtype == "Datetime":
+		return get_datetime(value)
+	return cstr(value).strip()
+
+
+def table_signature(rows, key):
+	"""Set of key values of child rows given as dicts or documents"""
+	values = set()
+	for row in rows or []:
+		value = row.get(key) if isinstance(row, dict) else getattr(row, key, None)
+		if value:
+			values.add(cstr(value).strip())
+	return values
+
+
+# ============================================
+# DIFFER
+# ============================================
+
+
+class TaskDiffer:
+	"""
+	Current values of a batch of Tasks: one query for the scalar fields the
+	payloads carry and one per child table, instead of a get_doc per Task.
+	"""
+
+	def __init__(self, names, fields):
+		self.meta = frappe.get_meta("Task")
+		names = list(set(names))
+
+		self.fields = [
+			f
+			for f in set(fields) - set(TABLE_KEYS)
+			if self.meta.has_field(f)
+			and self.meta.get_field(f).fieldtype not in no_value_fields + table_fields
+		]
+		self.current = {
+			row.name: row
+			for row in frappe.get_all(
+				"Task", filters={"name": ["in", names]}, fields=list({"name", *self.fields})
+			)
+		}
+
+		self.tables = {name: {} for name in names}
+		for field, key in TABLE_KEYS.items():
+			if field not in fields:
+				continue
+			for row in frappe.get_all(
+				self.meta.get_field(field).options,
+				filters={"parenttype": "Task", "parentfield": field, "parent": ["in", names]},
+				fields=["parent", key],
+			):
+				if row.get(key):
+					self.tables[row.parent].setdefault(field, set()).add(cstr(row.get(key)).strip())
+
+	def changes(self, name, payload):
+		"""Fields of `payload` that differ from the stored Task"""
+		current = self.current.get(name)
+		if current is None:
+			return dict(payload)
+
+		changes = {}
+		for field, value in payload.items():
+			if field in TABLE_KEYS:
+				if self.tables[name].get(field, set()) != table_signature(value, TABLE_KEYS[field]):
+					changes[field] = value
+			elif field in current:
+				df = self.meta.get_field(field)
+				if normalize(df, current.get(field)) != normalize(df, value):
+					changes[field] = value
+		return changes
+
+
+def needs_save(changes):
+	"""Whether changes must go through Task.save rather than a direct column write"""
+	return any(f in TABLE_KEYS or f in HOOKED_FIELDS for f in changes)
@@ -0,0 +1,178 @@
+# erpnext_agile/task_tree.py
+"""
+Scoped Task tree (NestedSet) maintenance
+Renumbers lft/rgt only for the Task trees an import touched instead of
+rewriting every Task on the site with frappe's rebuild_tree, and hands out
+intervals to bulk inserted root Tasks so the tree stays valid in between
+"""
+
+import frappe
+
+UPDATE_CHUNK = 1000
+
+
+# ============================================
+# ALLOCATION
+# ============================================
+
+
+def allocate_root_intervals(count):
+	"""Reserve `count` consecutive leaf (lft, rgt) intervals after the end of the Task tree"""
+	if count <= 0:
+		return []
+	end = frappe.db.sql("SELECT IFNULL(MAX(rgt), 0) FROM `tabTask` FOR UPDATE")[0][0] or 0
+	return [(end + 2 * i + 1, end + 2 * i + 2) for i in range(count)]
+
+
+def _next_free():
+	return (frappe.db.sql("SELECT IFNULL(MAX(rgt), 0) FROM `tabTask`")[0][0] or 0) + 1
+
+
+# ============================================
+# LOADING
+# ============================================
+
+
+def collect_trees(filters):
+	"""
+	Load every Task of the trees that contain a Task matching `filters`:
+	walk up to the roots, then down through all of their descendants.
+	Returns name -> row (parent_task, lft, rgt).
+	"""
+	fields = ["name", "parent_task", "lft", "rgt"]
+	nodes = {d.name: d for d in frappe.get_all("Task", filters=filters, fields=fields)}
+
+	missing = {d.parent_task for d in nodes.values() if d.parent_task and d.parent_task not in nodes}
+	while missing:
+		found = _load_chunked("name", missing, fields)
+		nodes.update((d.name, d) for d in found)
+		# Parents that do not exist are treated as roots
+		missing = {d.parent_task for d in found if d.parent_task and d.parent_task not in nodes}
+
+	frontier = set(nodes)
+	while frontier:
+		found = [d for d in _load_chunked("parent_task", frontier, fields) if d.name not in nodes]
+		nodes.update((d.name, d) for d in found)
+		frontier = {d.name for d in found}
+
+	return nodes
+
+
+def _load_chunked(field, values, fields):
+	values = list(values)
+	rows = []
+	for i in range(0, len(values), UPDATE_CHUNK):
+		rows.extend(
+			frappe.get_all("Task", filters={field: ["in", values[i : i + UPDATE_CHUNK]]}, fields=fields)
+		)
+	return rows
+
+
+# ============================================
+# NUMBERING
+# ============================================
+
+
+def _number_tree(root, children):
+	"""Relative (lft, rgt) for one tree starting at 1, children ordered by name like rebuild_tree"""
+	positions = {}
+	counter = 1
+	stack = [(root, False)]
+	while stack:
+		name, closing = stack.pop()
+		if closing:
+			positions[name] = (positions[name], counter)
+		else:
+			positions[name] = counter
+			stack.append((name, True))
+			stack.extend((child, False) for child in sorted(children.get(name, ()), reverse=True))
+		counter += 1
+	return positions, counter - 1
+
+
+def _write_positions(positions, offset):
+	"""Multi-row CASE UPDATEs of lft/rgt, shifted by `offset`"""
+	items = list(positions.items())
+	for i in range(0, len(items), UPDATE_CHUNK):
+		chunk = items[i : i + UPDATE_CHUNK]
+		case_sql = " ".join(["WHEN %s THEN %s"] * len(chunk))
+		frappe.db.sql(
+			f"""
+            UPDATE `tabTask`
+            SET lft = CASE name {case_sql} END,
+                rgt = CASE name {case_sql} END
+            WHERE name IN %s
+        """,
+			[v for name, (lft, _rgt) in chunk for v in (name, lft + offset)]
+			+ [v for name, (_lft, rgt) in chunk for v in (name, rgt + offset)]
+			+ [[name for name, _pos in chunk]],
+		)
+
+
+def rebuild_task_trees(filters):
+	"""
+	Renumber the Task trees containing Tasks that match `filters`.
+
+	When only those trees live at the end of the tree they are laid out again
+	from their first position, the common case after an import. Otherwise each
+	tree is renumbered inside its own interval, right to left, and the rows
+	after it are shifted with one UPDATE when the tree grew. Trees without a
+	valid interval (bulk inserted children) are appended at the end.
+	"""
+	nodes = collect_trees(filters)
+	if not nodes:
+		return 0
+
+	children = {}
+	for d in nodes.values():
+		if d.parent_task in nodes:
+			children.setdefault(d.parent_task, []).append(d.name)
+	roots = [d.name for d in nodes.values() if d.parent_task not in nodes]
+	trees = {root: _number_tree(root, children) for root in roots}
+
+	def is_placed(root):
+		d = nodes[root]
+		return (d.lft or 0) > 0 and (d.rgt or 0) > (d.lft or 0)
+
+	placed = sorted((r for r in roots if is_placed(r)), key=lambda r: nodes[r].lft)
+	unplaced = sorted(r for r in roots if not is_placed(r))
+	tail = nodes[placed[0]].lft if placed else None
+
+	in_tail = sum(1 for d in nodes.values() if tail and (d.lft or 0) >= tail)
+	if not tail or frappe.db.sql("SELECT COUNT(*) FROM `tabTask` WHERE lft >= %s", tail)[0][0] == in_tail:
+		start = tail or _next_free()
+		for root in placed + unplaced:
+			positions, size = trees[root]
+			_write_positions(positions, start - 1)
+			start += size
+	else:
+		for root in reversed(placed):
+			positions, size = trees[root]
+			lft, rgt = nodes[root].lft, nodes[root].rgt
+			grow = size - (rgt - lft + 1)
+			if grow > 0:
+				frappe.db.sql(
+					"""
+                    UPDATE `tabTask`
+                    SET lft = IF(lft > %(rgt)s, lft + %(grow)s, lft),
+                        rgt = rgt + %(grow)s
+                    WHERE rgt > %(rgt)s
+                """,
+					{"rgt": rgt, "grow": grow},
+				)
+			_write_positions(positions, lft - 1)
+
+		for root in unplaced:
+			positions, _size = trees[root]
+			_write_positions(positions, _next_free() - 1)
+
+	return sum(len(positions) for positions, _size in trees.values())
+
+
+@frappe.whitelist()
+def rebuild_project_task_tree(project):
+	"""API: Renumber the Task trees of one project (System Manager only)"""
+	frappe.only_for("System Manager")
+	count = rebuild_task_trees({"project": project})
+	frappe.db.commit()
+	return {"success": True, "tasks": count}
@@ -0,0 +1,224 @@
+# erpnext_agile/task_visibility.py
+"""
+Precomputed Task visibility for permission query conditions
+Keeps `Agile Task Visibility` rows and Redis-cached project sets in sync
+so list views can filter Tasks with a single indexed lookup
+"""
+
+import frappe
+
+MEMBER_PROJECTS_CACHE_KEY = "agile_member_projects"
+STRICT_PROJECTS_CACHE_KEY = "agile_strict_projects"
+
+
+# ============================================
+# CACHED PROJECT SETS
+# ============================================
+
+
+def get_member_projects(user):
+	"""Projects the user is a Project User of (cached in Redis per user)"""
+	return (
+		frappe.cache().hget(
+			MEMBER_PROJECTS_CACHE_KEY,
+			user,
+			generator=lambda: frappe.get_all(
+				"Project User", filters={"user": user, "parenttype": "Project"}, pluck="parent", distinct=True
+			),
+		)
+		or []
+	)
+
+
+def get_strict_projects():
+	"""Projects with assignment based visibility enabled (cached in Redis)"""
+	return (
+		frappe.cache().get_value(
+			STRICT_PROJECTS_CACHE_KEY,
+			generator=lambda: frappe.get_all(
+				"Project", filters={"custom_enable_assignment_based_visibility": 1}, pluck="name"
+			),
+		)
+		or []
+	)
+
+
+def clear_member_projects_cache(users=None):
+	"""Invalidate cached project memberships for some or all users"""
+	if users is None:
+		frappe.cache().delete_value(MEMBER_PROJECTS_CACHE_KEY)
+		return
+	for user in set(filter(None, users)):
+		frappe.cache().hdel(MEMBER_PROJECTS_CACHE_KEY, user)
+
+
+def clear_strict_projects_cache():
+	frappe.cache().delete_value(STRICT_PROJECTS_CACHE_KEY)
+
+
+# ============================================
+# VISIBILITY ROWS
+# ============================================
+
+
+def get_task_audience(doc):
+	"""
+	Users directly involved in a Task mapped to whether they are assigned.
+	Owner, reporter, original owner and watchers only grant access in
+	projects with assignment based visibility; assignees always do.
+	"""
+	audience = {}
+	for user in (doc.get("owner"), doc.get("reporter"), doc.get("custom_original_owner")):
+		if user:
+			audience[user] = 0
+	for row in doc.get("watchers", []):
+		if row.user:
+			audience[row.user] = 0
+	for row in doc.get("assigned_to_users", []):
+		if row.user:
+			audience[row.user] = 1
+	return audience
+
+
+def sync_task_visibility(doc, method=None):
+	"""Hook: diff the Task's audience against its visibility rows and write only the difference"""
+	audience = get_task_audience(doc)
+	existing = frappe.get_all(
+		"Agile Task Visibility", filters={"task": doc.name}, fields=["name", "user", "project", "is_assigned"]
+	)
+
+	# Rows that no longer match (user dropped, assignment or project changed) are replaced
+	stale = [
+		row.name
+		for row in existing
+		if row.user not in audience or row.is_assigned != audience[row.user] or row.project != doc.project
+	]
+	kept = {row.user for row in existing if row.name not in stale}
+
+	if stale:
+		frappe.db.delete("Agile Task Visibility", {"name": ["in", stale]})
+
+	insert_visibility_rows(
+		[
+			(user, doc.name, doc.project, is_assigned)
+			for user, is_assigned in audience.items()
+			if user not in kept
+		]
+	)
+
+
+def insert_visibility_rows(rows):
+	"""Bulk insert (user, task, project, is_assigned) tuples"""
+	if not rows:
+		return
+
+	now = frappe.utils.now()
+	session_user = frappe.session.user
+	frappe.db.bulk_insert(
+		"Agile Task Visibility",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"user",
+			"task",
+			"project",
+			"is_assigned",
+		],
+		values=[
+			(frappe.generate_hash(length=10), now, now, session_user, session_user, *row) for row in rows
+		],
+	)
+
+
+def delete_task_visibility(doc, method=None):
+	"""Hook: drop visibility rows of a deleted Task"""
+	frappe.db.delete("Agile Task Visibility", {"task": doc.name})
+
+
+def rebuild_task_visibility(project=None):
+	"""
+	Recompute visibility rows from scratch with set-based statements.
+	Used to backfill existing sites and after bulk imports.
+	"""
+	task_filter = "AND t.project = %(project)s" if project else ""
+	values = {"project": project}
+
+	if project:
+		frappe.db.sql(
+			"""
+            DELETE FROM `tabAgile Task Visibility` WHERE project = %(project)s
+        """,
+			values,
+		)
+	else:
+		frappe.db.sql("DELETE FROM `tabAgile Task Visibility`")
+
+	rows = frappe.db.sql(
+		f"""
+        SELECT user, task, project, MAX(is_assigned) AS is_assigned
+        FROM (
+            SELECT atu.user, t.name AS task, t.project, 1 AS is_assigned
+            FROM `tabAssigned To Users` atu
+            INNER JOIN `tabTask` t ON t.name = atu.parent
+            WHERE atu.parenttype = 'Task' {task_filter}
+            UNION ALL
+            SELECT w.user, t.name, t.project, 0
+            FROM `tabAgile Issue Watcher` w
+            INNER JOIN `tabTask` t ON t.name = w.parent
+            WHERE w.parenttype = 'Task' {task_filter}
+            UNION ALL
+            SELECT t.owner, t.name, t.project, 0 FROM `tabTask` t
+            WHERE t.owner IS NOT NULL {task_filter}
+            UNION ALL
+            SELECT t.reporter, t.name, t.project, 0 FROM `tabTask` t
+            WHERE IFNULL(t.reporter, '') != '' {task_filter}
+            UNION ALL
+            SELECT t.custom_original_owner, t.name, t.project, 0 FROM `tabTask` t
+            WHERE IFNULL(t.custom_original_owner, '') != '' {task_filter}
+        ) audience
+        WHERE IFNULL(user, '') != ''
+        GROUP BY user, task, project
+    """,
+		values,
+	)
+
+	for i in range(0, len(rows), 10000):
+		insert_visibility_rows(rows[i : i + 10000])
+
+	return len(rows)
+
+
+def on_project_update(doc, method=None):
+	"""Hook: refresh cached project sets when members or visibility mode change"""
+	old_doc = doc.get_doc_before_save()
+	old_users = {row.user for row in old_doc.get("users", [])} if old_doc else set()
+	new_users = {row.user for row in doc.get("users", [])}
+
+	if old_users != new_users:
+		from erpnext_agile.permission_context import clear_permission_context
+
+		clear_member_projects_cache(old_users ^ new_users)
+		clear_permission_context()
+
+	if doc.has_value_changed("custom_enable_assignment_based_visibility"):
+		clear_strict_projects_cache()
+
+
+def on_project_trash(doc, method=None):
+	"""Hook: forget cached project sets of a deleted Project"""
+	clear_member_projects_cache(row.user for row in doc.get("users", []))
+	clear_strict_projects_cache()
+
+
+@frappe.whitelist()
+def rebuild_visibility(project=None):
+	"""API: Rebuild the Task visibility table (System Manager only)"""
+	frappe.only_for("System Manager")
+	count = rebuild_task_visibility(project)
+	clear_member_projects_cache()
+	clear_strict_projects_cache()
+	frappe.db.commit()
+	return {"success": True, "rows": count}
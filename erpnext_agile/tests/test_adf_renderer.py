@@ -0,0 +1,103 @@
+import unittest
+
+from erpnext_agile.adf_renderer import render_adf
+
+
+def doc(*content):
+	return {"type": "doc", "version": 1, "content": list(content)}
+
+
+def paragraph(*content):
+	return {"type": "paragraph", "content": list(content)}
+
+
+def text(value, *marks):
+	node = {"type": "text", "text": value}
+	if marks:
+		node["marks"] = list(marks)
+	return node
+
+
+def bullet_list(*items):
+	return {"type": "bulletList", "content": [{"type": "listItem", "content": list(item)} for item in items]}
+
+
+class TestRenderADF(unittest.TestCase):
+	def test_nested_lists_keep_their_structure(self):
+		html = render_adf(
+			doc(
+				bullet_list(
+					[paragraph(text("one"))],
+					[
+						paragraph(text("two")),
+						{
+							"type": "orderedList",
+							"attrs": {"order": 3},
+							"content": [{"type": "listItem", "content": [paragraph(text("two.a"))]}],
+						},
+					],
+				)
+			)
+		)
+		self.assertEqual(
+			html,
+			'<ul><li><p>one</p></li><li><p>two</p><ol start="3"><li><p>two.a</p></li></ol></li></ul>',
+		)
+
+	def test_marks_wrap_innermost_first(self):
+		html = render_adf(
+			doc(
+				paragraph(
+					text(
+						"bold link",
+						{"type": "strong"},
+						{"type": "link", "attrs": {"href": "https://x.io/?a=1&b=2"}},
+					),
+					text(" "),
+					text("2", {"type": "subsup", "attrs": {"type": "sup"}}),
+				)
+			)
+		)
+		self.assertEqual(
+			html,
+			'<p><a href="https://x.io/?a=1&amp;b=2"><strong>bold link</strong></a> <sup>2</sup></p>',
+		)
+
+	def test_text_and_attributes_are_escaped(self):
+		html = render_adf(
+			doc(
+				paragraph(text("<script>alert('x')</script> & more")),
+				paragraph(text("colored", {"type": "textColor", "attrs": {"color": '"><img src=x>'}})),
+				{"type": "codeBlock", "attrs": {"language": '"py'}, "content": [text("a < b")]},
+			)
+		)
+		self.assertNotIn("<script>", html)
+		self.assertNotIn("<img", html)
+		self.assertIn("&lt;script&gt;alert('x')&lt;/script&gt; &amp; more", html)
+		self.assertIn('<span style="color: &quot;&gt;&lt;img src=x&gt;">colored</span>', html)
+		self.assertIn('<pre><code class="language-&quot;py">a &lt; b</code></pre>', html)
+
+	def test_unknown_nodes_keep_their_children_or_text(self):
+		html = render_adf(
+			doc(
+				{"type": "futureBlock", "content": [paragraph(text("inside"))]},
+				{"type": "futureInline", "text": "<leaf>"},
+				# Stray strings are not nodes and must not reach the html unescaped
+				"<b>raw</b>",
+			)
+		)
+		self.assertEqual(html, "<p>inside</p>&lt;leaf&gt;")
+
+	def test_deep_nesting_does_not_hit_the_recursion_limit(self):
+		depth = 5000
+		node = paragraph(text("bottom"))
+		for _ in range(depth):
+			node = {"type": "blockquote", "content": [node]}
+
+		html = render_adf(doc(node))
+		self.assertEqual(html, "<blockquote>" * depth + "<p>bottom</p>" + "</blockquote>" * depth)
+
+	def test_repeated_documents_render_the_same(self):
+		body = doc(paragraph(text("same", {"type": "em"})))
+		self.assertEqual(render_adf(body), render_adf(body))
+		self.assertEqual(render_adf(body), "<p><em>same</em></p>")
@@ -0,0 +1,54 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.bulk_task_import import bulk_insert_work_logs
+from erpnext_agile.tests.utils import delete_tasks, make_task
+
+KEY_PREFIX = "WLTEST-"
+
+
+def worklog(worklog_id=None, seconds=3600):
+	return {
+		"user": "Administrator",
+		"time_spent_seconds": seconds,
+		"time_spent_display": "1h",
+		"work_date": "2024-03-01",
+		"description": "Migrated from Jira",
+		"logged_at": "2024-03-01 10:00:00",
+		"jira_worklog_id": worklog_id,
+	}
+
+
+class TestBulkInsertWorkLogs(FrappeTestCase):
+	def setUp(self):
+		delete_tasks(KEY_PREFIX)
+		self.task = make_task(f"{KEY_PREFIX}1").name
+		frappe.db.commit()
+
+	def tearDown(self):
+		delete_tasks(KEY_PREFIX)
+
+	def logged(self):
+		return frappe.get_all(
+			"Agile Issue Work Log",
+			filters={"parenttype": "Task", "parent": self.task},
+			fields=["jira_worklog_id", "idx"],
+			order_by="idx asc",
+		)
+
+	def test_identical_worklogs_with_distinct_ids_are_kept(self):
+		bulk_insert_work_logs({self.task: [worklog("101"), worklog("102")]})
+		rows = self.logged()
+		self.assertEqual([r.jira_worklog_id for r in rows], ["101", "102"])
+		self.assertEqual([r.idx for r in rows], [1, 2])
+
+		# Re-importing the same worklogs adds nothing
+		bulk_insert_work_logs({self.task: [worklog("101"), worklog("102")]})
+		self.assertEqual(len(self.logged()), 2)
+
+	def test_legacy_rows_without_id_match_one_worklog_each(self):
+		bulk_insert_work_logs({self.task: [worklog()]})
+
+		bulk_insert_work_logs({self.task: [worklog("101"), worklog("102"), worklog("103", seconds=60)]})
+		rows = self.logged()
+		self.assertEqual([r.jira_worklog_id for r in rows], [None, "102", "103"])
@@ -0,0 +1,50 @@
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_changelog import history_transitions
+
+
+def sprint_item(from_ids, from_names, to_ids, to_names):
+	return {"field": "Sprint", "from": from_ids, "fromString": from_names, "to": to_ids, "toString": to_names}
+
+
+class TestHistoryTransitions(FrappeTestCase):
+	def test_status_change(self):
+		history = {
+			"items": [
+				{"field": "status", "fieldId": "status", "fromString": "To Do", "toString": "In Progress"}
+			]
+		}
+		self.assertEqual(history_transitions(history), [("status", "To Do", "In Progress")])
+
+	def test_sprint_added_and_removed(self):
+		history = {"items": [sprint_item("10", "Sprint 1", "10, 11", "Sprint 1, Sprint 2")]}
+		self.assertEqual(history_transitions(history), [("sprint", [("11", "Sprint 2")], [])])
+
+		history = {"items": [sprint_item("10, 11", "Sprint 1, Sprint 2", "12", "Sprint 3")]}
+		self.assertEqual(
+			history_transitions(history),
+			[("sprint", [("12", "Sprint 3")], [("10", "Sprint 1"), ("11", "Sprint 2")])],
+		)
+
+	def test_single_sprint_name_with_a_comma(self):
+		history = {"items": [sprint_item("", "", "20", "Release 1, hardening")]}
+		self.assertEqual(history_transitions(history), [("sprint", [("20", "Release 1, hardening")], [])])
+
+	def test_ambiguous_names_leave_the_ids(self):
+		# Two sprints, three comma separated parts: names cannot be paired with ids
+		history = {"items": [sprint_item("", "", "20, 21", "Release 1, hardening, Sprint 9")]}
+		self.assertEqual(history_transitions(history), [("sprint", [("20", None), ("21", None)], [])])
+
+	def test_other_fields_are_ignored_and_order_is_kept(self):
+		history = {
+			"items": [
+				{"field": "assignee", "fromString": "a", "toString": "b"},
+				sprint_item("", "", "30", "Sprint 4"),
+				{"field": "Status", "fromString": "In Progress", "toString": "Done"},
+			]
+		}
+		self.assertEqual(
+			history_transitions(history),
+			[("sprint", [("30", "Sprint 4")], []), ("status", "In Progress", "Done")],
+		)
+		self.assertEqual(history_transitions({}), [])
@@ -0,0 +1,103 @@
+import unittest
+from email.utils import formatdate
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from erpnext_agile import jira_client
+from erpnext_agile.jira_client import BACKOFF_CAP, MIN_RATE, JiraClient, TokenBucket
+
+NOW = 1_700_000_000.0
+
+
+class FakeClock:
+	"""Stands in for the `time` module: sleeping moves the clock forward"""
+
+	def __init__(self):
+		self.now = 0.0
+		self.sleeps = []
+
+	def monotonic(self):
+		return self.now
+
+	def time(self):
+		return NOW + self.now
+
+	def sleep(self, seconds):
+		self.sleeps.append(seconds)
+		self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+	def setUp(self):
+		self.clock = FakeClock()
+		patcher = patch.object(jira_client, "time", self.clock)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_burst_is_served_without_waiting(self):
+		bucket = TokenBucket(rate=2, burst=3)
+		for _ in range(3):
+			bucket.acquire()
+		self.assertEqual(self.clock.sleeps, [])
+
+	def test_empty_bucket_waits_for_the_refill(self):
+		bucket = TokenBucket(rate=2, burst=1)
+		bucket.acquire()
+		bucket.acquire()
+		self.assertEqual(self.clock.sleeps, [0.5])
+
+	def test_throttling_halves_the_rate_down_to_the_floor(self):
+		bucket = TokenBucket(rate=8, burst=4)
+		bucket.throttled()
+		self.assertEqual(bucket.rate, 4)
+		for _ in range(5):
+			bucket.throttled()
+		self.assertEqual(bucket.rate, MIN_RATE)
+
+		# Tokens are dropped, so the next call has to wait
+		bucket.acquire()
+		self.assertEqual(self.clock.sleeps, [1.0])
+
+	def test_successes_creep_back_to_the_ceiling(self):
+		bucket = TokenBucket(rate=2, burst=4)
+		bucket.throttled()
+		for _ in range(5):
+			bucket.succeeded()
+		self.assertAlmostEqual(bucket.rate, 1.5)
+		for _ in range(20):
+			bucket.succeeded()
+		self.assertEqual(bucket.rate, 2)
+
+	def test_configure_sets_a_new_ceiling(self):
+		bucket = TokenBucket(rate=10, burst=20)
+		bucket.configure(0.2, burst=5)
+		self.assertEqual((bucket.rate, bucket.max_rate, bucket.burst), (MIN_RATE, MIN_RATE, 5))
+		self.assertEqual(bucket._tokens, 5)
+
+
+def response(retry_after=None):
+	headers = {} if retry_after is None else {"Retry-After": retry_after}
+	return SimpleNamespace(headers=headers)
+
+
+class TestRetryAfter(unittest.TestCase):
+	def setUp(self):
+		patcher = patch.object(jira_client, "time", FakeClock())
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_seconds(self):
+		self.assertEqual(JiraClient._retry_after(response("5")), 5.0)
+		self.assertEqual(JiraClient._retry_after(response("0.5")), 0.5)
+		self.assertEqual(JiraClient._retry_after(response("-3")), 0.0)
+		self.assertEqual(JiraClient._retry_after(response("3600")), BACKOFF_CAP)
+
+	def test_http_date(self):
+		self.assertEqual(JiraClient._retry_after(response(formatdate(NOW + 30, usegmt=True))), 30.0)
+		self.assertEqual(JiraClient._retry_after(response(formatdate(NOW - 30, usegmt=True))), 0.0)
+		self.assertEqual(JiraClient._retry_after(response(formatdate(NOW + 3600, usegmt=True))), BACKOFF_CAP)
+
+	def test_missing_or_unparseable(self):
+		self.assertIsNone(JiraClient._retry_after(response()))
+		self.assertIsNone(JiraClient._retry_after(response("")))
+		self.assertIsNone(JiraClient._retry_after(response("soon")))
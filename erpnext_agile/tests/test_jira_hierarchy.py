@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_sync import patch_epic_links_from_jira, weave_hierarchies
+from erpnext_agile.tests.utils import delete_tasks, make_task
+
+PROJECT_KEY = "WVTEST"
+KEY_PREFIX = f"{PROJECT_KEY}-"
+REDIS_KEY = "jira_hierarchy_test_weave"
+
+
+class TestWeaveHierarchies(FrappeTestCase):
+	def setUp(self):
+		delete_tasks(KEY_PREFIX)
+		self.tasks = {n: make_task(f"{KEY_PREFIX}{n}").name for n in range(1, 7)}
+		frappe.db.commit()
+
+	def tearDown(self):
+		frappe.cache().delete_key(REDIS_KEY)
+		delete_tasks(KEY_PREFIX)
+
+	def link(self, pairs):
+		frappe.cache().delete_key(REDIS_KEY)
+		for child, parent in pairs.items():
+			frappe.cache().hset(REDIS_KEY, child, parent)
+
+	def test_weave_sets_parents_groups_and_dependencies(self):
+		self.link(
+			{
+				f"{KEY_PREFIX}2": f"{KEY_PREFIX}1",
+				f"{KEY_PREFIX}3": f"{KEY_PREFIX}1",
+				f"{KEY_PREFIX}5": f"{KEY_PREFIX}4",
+				# Parent that was never imported: skipped
+				f"{KEY_PREFIX}6": f"{KEY_PREFIX}404",
+			}
+		)
+
+		weave_hierarchies(REDIS_KEY)
+
+		t = self.tasks
+		self.assertEqual(frappe.db.get_value("Task", t[1], "is_group"), 1)
+		self.assertEqual(frappe.db.get_value("Task", t[4], "is_group"), 1)
+		self.assertEqual(frappe.db.get_value("Task", t[6], "is_group"), 0)
+
+		for child, parent in ((2, 1), (3, 1), (5, 4)):
+			values = frappe.db.get_value("Task", t[child], ["parent_task", "parent_issue"], as_dict=True)
+			self.assertEqual(values.parent_task, t[parent])
+			self.assertEqual(values.parent_issue, t[parent])
+		self.assertFalse(frappe.db.get_value("Task", t[6], "parent_task"))
+
+		deps = frappe.get_all(
+			"Task Depends On",
+			filters={"parenttype": "Task", "parent": t[1]},
+			fields=["task", "idx"],
+			order_by="idx asc",
+		)
+		self.assertEqual(sorted(d.task for d in deps), sorted([t[2], t[3]]))
+		self.assertEqual([d.idx for d in deps], [1, 2])
+		self.assertEqual(
+			frappe.db.get_value("Task", t[1], "depends_on_tasks"),
+			",".join(sorted([t[2], t[3]])) + ",",
+		)
+		self.assertEqual(frappe.db.get_value("Task", t[4], "depends_on_tasks"), f"{t[5]},")
+
+		# The queue is consumed and no write is left uncommitted
+		self.assertFalse(frappe.cache().hgetall(REDIS_KEY))
+
+	def test_weave_is_idempotent(self):
+		pairs = {f"{KEY_PREFIX}2": f"{KEY_PREFIX}1"}
+		self.link(pairs)
+		weave_hierarchies(REDIS_KEY)
+		self.link(pairs)
+		weave_hierarchies(REDIS_KEY)
+
+		self.assertEqual(
+			frappe.db.count("Task Depends On", {"parenttype": "Task", "parent": self.tasks[1]}),
+			1,
+		)
+
+	@patch("erpnext_agile.jira_sync.frappe.get_single")
+	@patch("erpnext_agile.jira_sync.get_jira_client")
+	def test_epic_link_patch_applies_parents_from_jira(self, get_jira_client, get_single):
+		get_single.return_value = frappe._dict(
+			jira_domain="https://jira", jira_email="bot@example.com", jira_api_token="token"
+		)
+		issues = [
+			{"key": f"{KEY_PREFIX}2", "fields": {"parent": {"key": f"{KEY_PREFIX}1"}}},
+			{"key": f"{KEY_PREFIX}3", "fields": {"customfield_10110": f"{KEY_PREFIX}1"}},
+			{"key": f"{KEY_PREFIX}5", "fields": {"customfield_20000": {"key": f"{KEY_PREFIX}4"}}},
+			{"key": f"{KEY_PREFIX}6", "fields": {}},
+		]
+		response = get_jira_client.return_value.post.return_value
+		response.json.return_value = {
+			"total": len(issues),
+			"issues": issues,
+			"names": {"customfield_20000": "Epic Link"},
+		}
+
+		message = patch_epic_links_from_jira(PROJECT_KEY)
+
+		self.assertIn("mapped 3 child tasks", message)
+		get_jira_client.return_value.post.assert_called_once()
+		t = self.tasks
+		for child, parent in ((2, 1), (3, 1), (5, 4)):
+			self.assertEqual(frappe.db.get_value("Task", t[child], "parent_issue"), t[parent])
+		self.assertFalse(frappe.db.get_value("Task", t[6], "parent_issue"))
+		self.assertEqual(
+			frappe.db.count("Task Depends On", {"parenttype": "Task", "parent": t[1]}),
+			2,
+		)
@@ -0,0 +1,143 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_offline_import import iter_json_issues, iter_xml_issues, xml_item_to_issue
+
+ITEM_XML = """
+<item>
+    <title>[OFF-2] Fix login</title>
+    <project id="10000" key="OFF">Offline</project>
+    <key id="10002">OFF-2</key>
+    <summary>Fix login</summary>
+    <description>&lt;p&gt;Broken&lt;/p&gt;</description>
+    <type id="1">Bug</type>
+    <priority id="2">High</priority>
+    <status id="3">In Progress</status>
+    <resolution id="-1">Unresolved</resolution>
+    <assignee username="dev@example.com">Dev One</assignee>
+    <reporter username="-1">Anonymous</reporter>
+    <created>Mon, 5 Feb 2024 10:20:30 +0000</created>
+    <updated>Tue, 6 Feb 2024 08:00:00 +0530</updated>
+    <due></due>
+    <parent id="10001">OFF-1</parent>
+    <timespent seconds="5400">1 hour, 30 minutes</timespent>
+    <labels><label>backend</label><label>auth</label></labels>
+    <component>API</component>
+    <issuelinks>
+        <issuelinktype id="10000">
+            <name>Blocks</name>
+            <outwardlinks description="blocks">
+                <issuelink><issuekey id="10003">OFF-3</issuekey></issuelink>
+            </outwardlinks>
+            <inwardlinks description="is blocked by">
+                <issuelink><issuekey id="10004">OFF-4</issuekey></issuelink>
+            </inwardlinks>
+        </issuelinktype>
+    </issuelinks>
+    <comments>
+        <comment id="1" author="qa@example.com" created="Mon, 5 Feb 2024 11:00:00 +0000">Repro steps</comment>
+    </comments>
+    <customfields>
+        <customfield id="customfield_10020" key="com.pyxis.greenhopper.jira:gh-sprint">
+            <customfieldname>Sprint</customfieldname>
+            <customfieldvalues>
+                <customfieldvalue>Sprint 1</customfieldvalue>
+                <customfieldvalue>Sprint 2</customfieldvalue>
+            </customfieldvalues>
+        </customfield>
+        <customfield id="customfield_10016">
+            <customfieldname>Story Points</customfieldname>
+            <customfieldvalues><customfieldvalue>5.0</customfieldvalue></customfieldvalues>
+        </customfield>
+        <customfield id="customfield_10099">
+            <customfieldname>Empty</customfieldname>
+            <customfieldvalues></customfieldvalues>
+        </customfield>
+    </customfields>
+</item>
+"""
+
+ISSUES = [
+	{"key": "OFF-1", "fields": {"summary": "One", "customfield_10016": 2.5}},
+	{"key": "OFF-2", "fields": {"summary": "Two"}},
+]
+
+
+class TestXmlItemToIssue(FrappeTestCase):
+	def test_item_maps_to_the_rest_shape(self):
+		issue, names_map = xml_item_to_issue(ET.fromstring(ITEM_XML))
+		fields = issue["fields"]
+
+		self.assertEqual(issue["key"], "OFF-2")
+		self.assertEqual(fields["summary"], "Fix login")
+		self.assertEqual(fields["description"], "<p>Broken</p>")
+		self.assertEqual(fields["issuetype"], {"name": "Bug"})
+		self.assertEqual(fields["status"], {"name": "In Progress"})
+		self.assertIsNone(fields["resolution"])
+		self.assertEqual(fields["created"], "2024-02-05T10:20:30.000+0000")
+		self.assertEqual(fields["updated"], "2024-02-06T08:00:00.000+0530")
+		self.assertIsNone(fields["duedate"])
+		self.assertEqual(fields["assignee"], {"emailAddress": "dev@example.com", "displayName": "Dev One"})
+		self.assertIsNone(fields["creator"])
+		self.assertEqual(fields["project"], {"key": "OFF", "name": "Offline"})
+		self.assertEqual(fields["parent"], {"key": "OFF-1"})
+		self.assertEqual(fields["timespent"], 5400)
+		self.assertIsNone(fields["timeestimate"])
+		self.assertEqual(fields["labels"], ["backend", "auth"])
+		self.assertEqual(fields["components"], [{"name": "API"}])
+		self.assertEqual(
+			fields["issuelinks"],
+			[
+				{"type": {"inward": "blocks", "outward": "blocks"}, "outwardIssue": {"key": "OFF-3"}},
+				{
+					"type": {"inward": "is blocked by", "outward": "is blocked by"},
+					"inwardIssue": {"key": "OFF-4"},
+				},
+			],
+		)
+		self.assertEqual(fields["comment"]["total"], 1)
+		self.assertEqual(fields["comment"]["comments"][0]["author"]["emailAddress"], "qa@example.com")
+
+		self.assertEqual(names_map, {"customfield_10020": "Sprint", "customfield_10016": "Story Points"})
+		self.assertEqual(fields["customfield_10020"], [{"name": "Sprint 1"}, {"name": "Sprint 2"}])
+		self.assertEqual(fields["customfield_10016"], "5.0")
+		self.assertNotIn("customfield_10099", fields)
+
+	def test_missing_type_status_and_priority_are_left_out(self):
+		issue, _names = xml_item_to_issue(
+			ET.fromstring("<item><key>OFF-9</key><summary>Bare</summary></item>")
+		)
+		for field in ("issuetype", "status", "priority"):
+			self.assertNotIn(field, issue["fields"])
+		self.assertEqual(issue["fields"]["labels"], [])
+
+	def test_rss_export_is_streamed_item_by_item(self):
+		rss = f"<rss><channel><title>Export</title>{ITEM_XML}{ITEM_XML}</channel></rss>"
+		keys = [issue["key"] for issue, _names in iter_xml_issues(io.BytesIO(rss.encode()))]
+		self.assertEqual(keys, ["OFF-2", "OFF-2"])
+
+
+class TestIterJsonIssues(FrappeTestCase):
+	def test_plain_issue_list(self):
+		f = io.BytesIO(b"  \n" + json.dumps(ISSUES).encode())
+		parsed = list(iter_json_issues(f))
+		self.assertEqual([issue["key"] for issue, _names in parsed], ["OFF-1", "OFF-2"])
+		self.assertEqual(parsed[0][0]["fields"]["customfield_10016"], 2.5)
+		self.assertTrue(all(names == {} for _issue, names in parsed))
+
+	def test_search_page_carries_its_names_map(self):
+		page = {
+			"startAt": 0,
+			"total": 2,
+			"issues": ISSUES,
+			"names": {"customfield_10016": "Story Points"},
+		}
+		parsed = list(iter_json_issues(io.BytesIO(json.dumps(page).encode())))
+		self.assertEqual([issue["key"] for issue, _names in parsed], ["OFF-1", "OFF-2"])
+		self.assertTrue(all(names == {"customfield_10016": "Story Points"} for _issue, names in parsed))
+
+	def test_empty_list(self):
+		self.assertEqual(list(iter_json_issues(io.BytesIO(b"[]"))), [])
@@ -0,0 +1,84 @@
+import frappe
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_retry import (
+	MAX_ATTEMPTS,
+	PERMANENT,
+	TRANSIENT,
+	classify_failure,
+	clear_failures,
+	failure_queue_key,
+	pop_failed_keys,
+	read_failure_reasons,
+	record_failure,
+)
+
+PROJECT_KEY = "RETRYTEST"
+
+
+def http_error(status):
+	response = requests.Response()
+	response.status_code = status
+	return requests.HTTPError(f"{status} error", response=response)
+
+
+class TestClassifyFailure(FrappeTestCase):
+	def test_http_statuses(self):
+		for status in (400, 403, 404, 410):
+			self.assertEqual(classify_failure(http_error(status)), (f"http_{status}", PERMANENT))
+		for status in (429, 500, 503):
+			self.assertEqual(classify_failure(http_error(status)), (f"http_{status}", TRANSIENT))
+
+	def test_other_failures(self):
+		self.assertEqual(classify_failure(requests.Timeout()), ("network", TRANSIENT))
+		self.assertEqual(classify_failure(requests.ConnectionError()), ("network", TRANSIENT))
+		self.assertEqual(classify_failure(frappe.QueryDeadlockError()), ("database", TRANSIENT))
+		self.assertEqual(classify_failure(frappe.ValidationError()), ("validation", PERMANENT))
+		self.assertEqual(classify_failure(frappe.DuplicateEntryError()), ("validation", PERMANENT))
+		self.assertEqual(classify_failure(KeyError("fields")), ("error", TRANSIENT))
+
+		# An HTTPError without a response carries no status to classify
+		self.assertEqual(classify_failure(requests.HTTPError("boom")), ("error", TRANSIENT))
+
+
+class TestRecordFailure(FrappeTestCase):
+	def setUp(self):
+		clear_failures(PROJECT_KEY)
+
+	def tearDown(self):
+		clear_failures(PROJECT_KEY)
+
+	def queued(self):
+		return frappe.cache().llen(failure_queue_key(PROJECT_KEY))
+
+	def test_transient_failures_become_permanent_after_max_attempts(self):
+		for attempt in range(1, MAX_ATTEMPTS):
+			entry = record_failure(PROJECT_KEY, f"{PROJECT_KEY}-1", requests.Timeout("slow"))
+			self.assertEqual((entry["attempts"], entry["category"]), (attempt, TRANSIENT))
+		self.assertEqual(self.queued(), MAX_ATTEMPTS - 1)
+
+		entry = record_failure(PROJECT_KEY, f"{PROJECT_KEY}-1", requests.Timeout("slow"))
+		self.assertEqual((entry["attempts"], entry["category"]), (MAX_ATTEMPTS, PERMANENT))
+		self.assertEqual(self.queued(), MAX_ATTEMPTS - 1)
+
+		stored = read_failure_reasons(PROJECT_KEY)[f"{PROJECT_KEY}-1"]
+		self.assertEqual((stored["reason"], stored["message"]), ("network", "slow"))
+
+	def test_permanent_failures_are_not_queued(self):
+		entry = record_failure(PROJECT_KEY, f"{PROJECT_KEY}-2", http_error(404))
+		self.assertEqual((entry["reason"], entry["category"], entry["attempts"]), ("http_404", PERMANENT, 1))
+		self.assertEqual(self.queued(), 0)
+
+	def test_explicit_reason_and_popping_the_queue(self):
+		record_failure(PROJECT_KEY, f"{PROJECT_KEY}-3", reason="missing_parent")
+		record_failure(PROJECT_KEY, f"{PROJECT_KEY}-4")
+		record_failure(PROJECT_KEY, f"{PROJECT_KEY}-3", reason="missing_parent")
+
+		reasons = read_failure_reasons(PROJECT_KEY, [f"{PROJECT_KEY}-3", f"{PROJECT_KEY}-5"])
+		self.assertEqual(list(reasons), [f"{PROJECT_KEY}-3"])
+		self.assertEqual(reasons[f"{PROJECT_KEY}-3"]["attempts"], 2)
+
+		# Duplicate keys in one pop are returned once, in queue order
+		self.assertEqual(pop_failed_keys(PROJECT_KEY, 3), [f"{PROJECT_KEY}-3", f"{PROJECT_KEY}-4"])
+		self.assertEqual(self.queued(), 0)
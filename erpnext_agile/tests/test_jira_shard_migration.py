@@ -0,0 +1,156 @@
+import time
+from itertools import pairwise
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_shard_migration import (
+	STATE_TTL,
+	_beat,
+	_clear_shard_state,
+	_counters,
+	_key,
+	_redis,
+	finish_shard,
+	migration_alive,
+	plan_shards,
+)
+
+PROJECT_KEY = "SHARDTEST"
+
+
+class FakeResponse:
+	def __init__(self, data):
+		self.data = data
+
+	def raise_for_status(self):
+		pass
+
+	def json(self):
+		return self.data
+
+
+class FakeSearchClient:
+	"""Answers search requests from an ordered list of issues"""
+
+	def __init__(self, issues):
+		self.issues = issues
+		self.jqls = []
+
+	def post(self, url, json=None, auth=None):
+		self.jqls.append(json["jql"])
+		start = json["startAt"]
+		return FakeResponse(
+			{
+				"total": len(self.issues),
+				"issues": self.issues[start : start + json["maxResults"]],
+			}
+		)
+
+
+def make_issues(count):
+	return [
+		{
+			"key": f"{PROJECT_KEY}-{i}",
+			"fields": {"created": f"2024-01-{(i % 28) + 1:02d}T10:{i % 60:02d}:00.000+0000"},
+		}
+		for i in range(1, count + 1)
+	]
+
+
+class TestPlanShards(FrappeTestCase):
+	def test_created_ranges_cover_the_project(self):
+		issues = sorted(make_issues(100), key=lambda i: i["fields"]["created"])
+		jqls = plan_shards(FakeSearchClient(issues), "https://jira", None, PROJECT_KEY, 4)
+
+		self.assertEqual(len(jqls), 4)
+		self.assertNotIn(">=", jqls[0])
+		self.assertIn('created < "', jqls[0])
+		self.assertIn('created >= "', jqls[-1])
+		self.assertNotIn("<", jqls[-1])
+		for jql in jqls[1:-1]:
+			self.assertIn('created >= "', jql)
+			self.assertIn('created < "', jql)
+
+		# Each range starts where the previous one ends
+		for low, high in pairwise(jqls):
+			upper = low.split('created < "')[1].split('"')[0]
+			lower = high.split('created >= "')[1].split('"')[0]
+			self.assertEqual(upper, lower)
+
+	def test_key_ranges_use_issue_keys_at_the_offsets(self):
+		issues = make_issues(40)
+		jqls = plan_shards(FakeSearchClient(issues), "https://jira", None, PROJECT_KEY, 2, split_by="key")
+
+		self.assertEqual(len(jqls), 2)
+		self.assertIn(f'key < "{PROJECT_KEY}-21"', jqls[0])
+		self.assertIn(f'key >= "{PROJECT_KEY}-21"', jqls[1])
+		self.assertTrue(all(jql.endswith("ORDER BY key ASC") for jql in jqls))
+
+	def test_duplicate_boundaries_collapse(self):
+		# Every issue created in the same minute: no usable boundary
+		issues = [
+			{"key": f"{PROJECT_KEY}-{i}", "fields": {"created": "2024-01-01T10:00:00.000+0000"}}
+			for i in range(1, 21)
+		]
+		jqls = plan_shards(FakeSearchClient(issues), "https://jira", None, PROJECT_KEY, 4)
+		self.assertEqual(len(jqls), 2)
+
+	def test_empty_project_is_one_shard(self):
+		jqls = plan_shards(FakeSearchClient([]), "https://jira", None, PROJECT_KEY, 4)
+		self.assertEqual(jqls, [f"project = '{PROJECT_KEY}' ORDER BY created ASC"])
+
+
+@patch("erpnext_agile.jira_shard_migration.publish_progress")
+@patch("erpnext_agile.jira_shard_migration.frappe.enqueue")
+class TestShardBarrier(FrappeTestCase):
+	def setUp(self):
+		_clear_shard_state(PROJECT_KEY)
+		_redis("HSET", "progress", PROJECT_KEY, "shards", 3)
+		_redis("HSET", "progress", PROJECT_KEY, "remaining", 3)
+
+	def tearDown(self):
+		_clear_shard_state(PROJECT_KEY)
+
+	def test_last_shard_enqueues_the_barrier_job_once(self, enqueue, publish):
+		finish_shard(PROJECT_KEY, 0)
+		finish_shard(PROJECT_KEY, 2)
+		enqueue.assert_not_called()
+
+		finish_shard(PROJECT_KEY, 1)
+		enqueue.assert_called_once()
+		self.assertEqual(
+			enqueue.call_args.args[0], "erpnext_agile.jira_shard_migration.finish_sharded_migration"
+		)
+		self.assertEqual(enqueue.call_args.kwargs["project_key"], PROJECT_KEY)
+		self.assertEqual(publish.call_count, 3)
+
+	def test_failed_shards_are_counted(self, enqueue, publish):
+		finish_shard(PROJECT_KEY, 0, failed=True)
+		finish_shard(PROJECT_KEY, 1)
+		finish_shard(PROJECT_KEY, 2, failed=True)
+
+		counters = _counters(PROJECT_KEY)
+		self.assertEqual(counters.get("failed_shards"), "2")
+		self.assertEqual(counters.get("remaining"), "0")
+		enqueue.assert_called_once()
+
+
+class TestStaleShardState(FrappeTestCase):
+	def tearDown(self):
+		_clear_shard_state(PROJECT_KEY)
+
+	def test_state_without_recent_heartbeat_does_not_lock_the_project(self):
+		_redis("HSET", "progress", PROJECT_KEY, "remaining", 2)
+		_redis("HSET", "progress", PROJECT_KEY, "heartbeat", time.time() - 3600)
+		self.assertFalse(migration_alive(PROJECT_KEY))
+
+		_redis("HSET", "progress", PROJECT_KEY, "heartbeat", time.time())
+		self.assertTrue(migration_alive(PROJECT_KEY))
+
+	def test_shard_state_expires(self):
+		_redis("HSET", "progress", PROJECT_KEY, "remaining", 1)
+		_beat(PROJECT_KEY)
+		ttl = frappe.cache().execute_command("TTL", _key("progress", PROJECT_KEY))
+		self.assertTrue(0 < ttl <= STATE_TTL)
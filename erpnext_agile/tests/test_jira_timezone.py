@@ -0,0 +1,43 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.jira_sync import _jira_datetime, get_jira_timezone
+
+DOMAIN = "https://tztest.atlassian.net"
+AUTH = ("bot@example.com", "token")
+
+
+def myself_client(payload):
+	client = MagicMock()
+	client.get.return_value.json.return_value = payload
+	return client
+
+
+class TestJiraTimezone(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete_value(f"jira_user_timezone_{DOMAIN}_{AUTH[0]}")
+
+	def tearDown(self):
+		frappe.cache().delete_value(f"jira_user_timezone_{DOMAIN}_{AUTH[0]}")
+
+	def test_timestamps_convert_to_the_jira_user_timezone(self):
+		value = "2024-01-31T22:50:00.000+0000"
+		self.assertEqual(_jira_datetime(value), datetime(2024, 1, 31, 22, 50))
+		self.assertEqual(_jira_datetime(value, "Asia/Kolkata"), datetime(2024, 2, 1, 4, 20))
+		self.assertEqual(
+			_jira_datetime("2024-07-01T09:00:00.000+0200", "America/New_York"), datetime(2024, 7, 1, 3, 0)
+		)
+
+	def test_timezone_comes_from_myself_and_is_cached(self):
+		client = myself_client({"timeZone": "Asia/Kolkata"})
+		self.assertEqual(get_jira_timezone(client, DOMAIN, AUTH), "Asia/Kolkata")
+		self.assertEqual(get_jira_timezone(client, DOMAIN, AUTH), "Asia/Kolkata")
+		client.get.assert_called_once_with(f"{DOMAIN}/rest/api/2/myself", auth=AUTH)
+
+	def test_unknown_timezone_keeps_the_wall_clock(self):
+		tz = get_jira_timezone(myself_client({"timeZone": "Mars/Olympus"}), DOMAIN, AUTH)
+		self.assertIsNone(tz)
+		self.assertEqual(_jira_datetime("2024-01-31T22:50:00.000+0530", tz), datetime(2024, 1, 31, 22, 50))
@@ -0,0 +1,84 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.progress_rollup import (
+	compute_parent_progress,
+	rebuild_project_progress,
+	rollup_parent_progress,
+)
+from erpnext_agile.tests.utils import delete_tasks, make_task
+
+KEY_PREFIX = "ROLLTEST-"
+PROJECT_NAME = "Rollup Test Project"
+STATUSES = {"Rollup Test Done": "Done", "Rollup Test Open": "To Do"}
+
+
+class TestProgressRollup(FrappeTestCase):
+	def setUp(self):
+		delete_tasks(KEY_PREFIX)
+		for status_name, category in STATUSES.items():
+			if not frappe.db.exists("Agile Issue Status", status_name):
+				frappe.get_doc(
+					{"doctype": "Agile Issue Status", "status_name": status_name, "status_category": category}
+				).insert(ignore_permissions=True)
+
+		self.project = frappe.db.get_value("Project", {"project_name": PROJECT_NAME})
+		if not self.project:
+			self.project = (
+				frappe.get_doc({"doctype": "Project", "project_name": PROJECT_NAME})
+				.insert(ignore_permissions=True)
+				.name
+			)
+
+		# Epic -> 2 Stories -> 2 and 3 Sub-tasks
+		self.epic = self.task("E")
+		self.stories = [self.task("S1", self.epic, done=True), self.task("S2", self.epic)]
+		self.subtasks = [
+			self.task("S1-1", self.stories[0], done=True),
+			self.task("S1-2", self.stories[0], done=True),
+			self.task("S2-1", self.stories[1], done=True),
+			self.task("S2-2", self.stories[1]),
+			self.task("S2-3", self.stories[1]),
+		]
+		frappe.db.commit()
+
+	def tearDown(self):
+		delete_tasks(KEY_PREFIX)
+
+	def task(self, key, parent=None, done=False):
+		return make_task(
+			f"{KEY_PREFIX}{key}",
+			project=self.project,
+			parent_issue=parent,
+			issue_status="Rollup Test Done" if done else "Rollup Test Open",
+		).name
+
+	def parents(self):
+		return [self.epic, *self.stories]
+
+	def reset_progress(self):
+		for name in self.parents():
+			frappe.db.set_value("Task", name, "progress", 0, update_modified=False)
+
+	def stored_progress(self):
+		return {name: frappe.db.get_value("Task", name, "progress") for name in self.parents()}
+
+	def test_parent_progress_is_done_over_total(self):
+		self.assertEqual(compute_parent_progress(self.epic), 50)
+		self.assertEqual(compute_parent_progress(self.stories[0]), 100)
+		self.assertEqual(compute_parent_progress(self.stories[1]), 33.33)
+		self.assertIsNone(compute_parent_progress(self.subtasks[0]))
+
+	def test_bulk_rebuild_matches_incremental_rollup(self):
+		self.reset_progress()
+		for story in self.stories:
+			rollup_parent_progress(story)
+		rollup_parent_progress(self.epic)
+		incremental = self.stored_progress()
+
+		self.reset_progress()
+		self.assertEqual(rebuild_project_progress(self.project), 3)
+		self.assertEqual(self.stored_progress(), incremental)
+
+		# Nothing changed, so a second pass writes nothing
+		self.assertEqual(rebuild_project_progress(self.project), 0)
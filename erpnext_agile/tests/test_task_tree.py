@@ -0,0 +1,99 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.task_tree import _number_tree, rebuild_task_trees
+from erpnext_agile.tests.utils import delete_tasks, make_task
+
+KEY_PREFIX = "TREETEST-"
+OTHER_PREFIX = "TREEOTHER-"
+
+
+def interval(name):
+	return tuple(frappe.db.get_value("Task", name, ["lft", "rgt"]))
+
+
+def set_interval(name, lft, rgt):
+	frappe.db.sql("UPDATE `tabTask` SET lft = %s, rgt = %s WHERE name = %s", (lft, rgt, name))
+
+
+class TestNumberTree(FrappeTestCase):
+	def test_children_are_numbered_by_name(self):
+		positions, size = _number_tree("R", {"R": ["B", "A"], "A": ["C"]})
+		self.assertEqual(size, 8)
+		self.assertEqual(positions, {"R": (1, 8), "A": (2, 5), "C": (3, 4), "B": (6, 7)})
+
+	def test_single_node(self):
+		self.assertEqual(_number_tree("R", {}), ({"R": (1, 2)}, 2))
+
+	def test_deep_chain_does_not_recurse(self):
+		depth = 5000
+		children = {i: [i + 1] for i in range(depth)}
+		positions, size = _number_tree(0, children)
+		self.assertEqual(size, 2 * (depth + 1))
+		self.assertEqual(positions[depth], (depth + 1, depth + 2))
+
+
+class TestRebuildTaskTrees(FrappeTestCase):
+	def setUp(self):
+		delete_tasks(KEY_PREFIX)
+		delete_tasks(OTHER_PREFIX)
+
+	def tearDown(self):
+		delete_tasks(KEY_PREFIX)
+		delete_tasks(OTHER_PREFIX)
+
+	def make_tree(self, prefix, children=1):
+		root = make_task(f"{prefix}root", is_group=1).name
+		kids = [make_task(f"{prefix}{i}", parent_task=root).name for i in range(1, children + 1)]
+		return root, kids
+
+	def assertNested(self, root, kids):
+		lft, rgt = interval(root)
+		self.assertEqual(rgt - lft + 1, 2 * (len(kids) + 1))
+		for kid in kids:
+			kid_lft, kid_rgt = interval(kid)
+			self.assertTrue(lft < kid_lft < kid_rgt < rgt)
+
+	def test_tree_at_the_tail_is_laid_out_from_its_first_position(self):
+		root, kids = self.make_tree(KEY_PREFIX, 2)
+		lft, _rgt = interval(root)
+
+		# A bulk inserted child: no interval, and the root does not cover it yet
+		set_interval(kids[1], 0, 0)
+		set_interval(root, lft, lft + 3)
+
+		self.assertEqual(rebuild_task_trees({"issue_key": ["like", f"{KEY_PREFIX}%"]}), 3)
+		self.assertEqual(interval(root), (lft, lft + 5))
+		self.assertEqual(interval(kids[0]), (lft + 1, lft + 2))
+		self.assertEqual(interval(kids[1]), (lft + 3, lft + 4))
+
+	def test_tree_in_the_middle_shifts_the_rows_after_it(self):
+		root, kids = self.make_tree(KEY_PREFIX)
+		other_root, other_kids = self.make_tree(OTHER_PREFIX)
+		lft, rgt = interval(root)
+		other_before = interval(other_root)
+
+		# Attached after the fact, as weave_hierarchies does: the tree has to grow by one node
+		late = make_task(f"{KEY_PREFIX}late").name
+		frappe.db.set_value("Task", late, "parent_task", root, update_modified=False)
+
+		rebuild_task_trees({"issue_key": ["like", f"{KEY_PREFIX}%"]})
+
+		self.assertEqual(interval(root), (lft, rgt + 2))
+		self.assertNested(root, [*kids, late])
+		self.assertEqual(interval(other_root), (other_before[0] + 2, other_before[1] + 2))
+		self.assertNested(other_root, other_kids)
+
+	def test_roots_without_an_interval_are_appended(self):
+		first = make_task(f"{KEY_PREFIX}b").name
+		second = make_task(f"{KEY_PREFIX}a").name
+		set_interval(first, 0, 0)
+		set_interval(second, 0, 0)
+		end = frappe.db.sql("SELECT IFNULL(MAX(rgt), 0) FROM `tabTask`")[0][0]
+
+		rebuild_task_trees({"issue_key": ["like", f"{KEY_PREFIX}%"]})
+
+		# Ordered by name, one leaf interval each
+		ordered = sorted([first, second])
+		self.assertEqual(interval(ordered[0]), (end + 1, end + 2))
+		self.assertEqual(interval(ordered[1]), (end + 3, end + 4))
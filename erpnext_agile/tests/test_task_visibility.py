@@ -0,0 +1,149 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.overrides.project import get_task_permission_query_conditions
+from erpnext_agile.permission_context import clear_permission_context
+from erpnext_agile.task_visibility import (
+	clear_member_projects_cache,
+	clear_strict_projects_cache,
+	rebuild_task_visibility,
+	sync_task_visibility,
+)
+from erpnext_agile.tests.utils import delete_tasks, make_task
+
+KEY_PREFIX = "VISTEST-"
+USERS = {
+	"assignee": "vistest-assignee@example.com",
+	"watcher": "vistest-watcher@example.com",
+	"member": "vistest-member@example.com",
+	"outsider": "vistest-outsider@example.com",
+}
+
+
+def make_user(email):
+	if not frappe.db.exists("User", email):
+		frappe.get_doc(
+			{
+				"doctype": "User",
+				"email": email,
+				"first_name": email.split("@")[0],
+				"send_welcome_email": 0,
+			}
+		).insert(ignore_permissions=True)
+	return email
+
+
+def make_project(name, strict, members=()):
+	project = frappe.db.get_value("Project", {"project_name": name})
+	if project:
+		frappe.delete_doc("Project", project, force=True, ignore_permissions=True)
+	return (
+		frappe.get_doc(
+			{
+				"doctype": "Project",
+				"project_name": name,
+				"custom_enable_assignment_based_visibility": int(strict),
+				"users": [{"user": user} for user in members],
+			}
+		)
+		.insert(ignore_permissions=True)
+		.name
+	)
+
+
+class TestTaskVisibility(FrappeTestCase):
+	def setUp(self):
+		delete_tasks(KEY_PREFIX)
+		for email in USERS.values():
+			make_user(email)
+
+		self.strict = make_project("Visibility Test Strict", strict=True)
+		self.open = make_project("Visibility Test Open", strict=False, members=[USERS["member"]])
+
+		involvement = {
+			"assigned_to_users": [{"user": USERS["assignee"]}],
+			"watchers": [{"user": USERS["watcher"]}],
+		}
+		self.strict_task = make_task(f"{KEY_PREFIX}1", project=self.strict, **involvement).name
+		self.open_task = make_task(f"{KEY_PREFIX}2", project=self.open, **involvement).name
+		frappe.db.commit()
+
+		self.reset_caches()
+
+	def tearDown(self):
+		delete_tasks(KEY_PREFIX)
+		self.reset_caches()
+
+	def reset_caches(self):
+		clear_member_projects_cache(USERS.values())
+		clear_strict_projects_cache()
+		clear_permission_context()
+
+	def visible_tasks(self, user):
+		conditions = get_task_permission_query_conditions(user)
+		return set(
+			frappe.db.sql_list(
+				f"SELECT name FROM `tabTask` WHERE name IN %(names)s AND {conditions}",
+				{"names": [self.strict_task, self.open_task]},
+			)
+		)
+
+	def visibility_rows(self, task):
+		return {
+			row.user: row
+			for row in frappe.get_all(
+				"Agile Task Visibility",
+				filters={"task": task},
+				fields=["name", "user", "project", "is_assigned"],
+			)
+		}
+
+	def test_rebuild_matches_the_audience(self):
+		frappe.db.delete("Agile Task Visibility", {"task": ["in", [self.strict_task, self.open_task]]})
+		rebuild_task_visibility(self.strict)
+
+		rows = self.visibility_rows(self.strict_task)
+		self.assertEqual(rows[USERS["assignee"]].is_assigned, 1)
+		self.assertEqual(rows[USERS["watcher"]].is_assigned, 0)
+		self.assertNotIn(USERS["outsider"], rows)
+		self.assertEqual({row.project for row in rows.values()}, {self.strict})
+		# Scoped to the project: the other project's Task is left alone
+		self.assertFalse(self.visibility_rows(self.open_task))
+
+	def test_permission_query_per_kind_of_user(self):
+		rebuild_task_visibility(self.strict)
+		rebuild_task_visibility(self.open)
+
+		# Assignees see their Tasks in every project
+		self.assertEqual(self.visible_tasks(USERS["assignee"]), {self.strict_task, self.open_task})
+		# Watchers only count in projects with assignment based visibility
+		self.assertEqual(self.visible_tasks(USERS["watcher"]), {self.strict_task})
+		# Members see every Task of a non-strict project
+		self.assertEqual(self.visible_tasks(USERS["member"]), {self.open_task})
+		self.assertEqual(self.visible_tasks(USERS["outsider"]), set())
+
+	def test_sync_only_replaces_changed_rows(self):
+		doc = frappe.get_doc("Task", self.strict_task)
+		sync_task_visibility(doc)
+		before = self.visibility_rows(doc.name)
+
+		# The assignee becomes a watcher, the outsider starts watching
+		doc.set("assigned_to_users", [])
+		doc.append("watchers", {"user": USERS["assignee"]})
+		doc.append("watchers", {"user": USERS["outsider"]})
+		sync_task_visibility(doc)
+		after = self.visibility_rows(doc.name)
+
+		self.assertEqual(after[USERS["watcher"]].name, before[USERS["watcher"]].name)
+		self.assertEqual(after[doc.owner].name, before[doc.owner].name)
+		self.assertNotEqual(after[USERS["assignee"]].name, before[USERS["assignee"]].name)
+		self.assertEqual(after[USERS["assignee"]].is_assigned, 0)
+		self.assertEqual(after[USERS["outsider"]].is_assigned, 0)
+
+		# Moving the Task to another project replaces every row
+		doc.project = self.open
+		sync_task_visibility(doc)
+		moved = self.visibility_rows(doc.name)
+		self.assertEqual(set(moved), set(after))
+		self.assertFalse({row.name for row in moved.values()} & {row.name for row in after.values()})
+		self.assertEqual({row.project for row in moved.values()}, {self.open})
@@ -0,0 +1,30 @@
+import frappe
+
+
+def make_task(issue_key, **values):
+	"""Insert a plain (non-agile) Task carrying a Jira issue key"""
+	return frappe.get_doc(
+		{
+			"doctype": "Task",
+			"subject": values.pop("subject", issue_key),
+			"issue_key": issue_key,
+			**values,
+		}
+	).insert(ignore_permissions=True)
+
+
+def delete_tasks(key_prefix):
+	"""Remove test Tasks (and their child rows) whose issue key starts with `key_prefix`"""
+	names = frappe.get_all("Task", filters={"issue_key": ["like", f"{key_prefix}%"]}, pluck="name")
+	if names:
+		for child_doctype in (
+			"Task Depends On",
+			"Assigned To Users",
+			"Agile Issue Watcher",
+			"Agile Issue Work Log",
+		):
+			frappe.db.delete(child_doctype, {"parenttype": "Task", "parent": ["in", names]})
+		frappe.db.delete("Task Depends On", {"task": ["in", names]})
+		frappe.db.delete("Agile Task Visibility", {"task": ["in", names]})
+		frappe.db.delete("Task", {"name": ["in", names]})
+	frappe.db.commit()
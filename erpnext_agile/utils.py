@@ -319,26 +319,32 @@ def task_watcher_sync_on_mention(doc, method=None):
     Ensures mentioned users are added as watchers to the Task.
     """
     if doc.reference_doctype == "Task":
+        # Extract mentioned users from the comment content
+        mentioned_users = extract_mentions(doc.content)
+        if not mentioned_users:
+            return
+
         try:
             task = frappe.get_doc("Task", doc.reference_name)
         except frappe.DoesNotExistError:
             frappe.log(f"Task {doc.reference_name} not found for watcher sync")
             return
-        
-        # Extract mentioned users from the comment content
-        mentioned_users = extract_mentions(doc.content)
+
         existing_watchers = {watcher.user for watcher in task.watchers}
-        
-        # Add mentioned users as watchers to the task
-        for user in mentioned_users:
-            if user not in task.get("watchers", []):
-                try:
-                    if user not in existing_watchers:
-                        task.append("watchers", {"user": user})
-                    task.save(ignore_permissions=True)
-                    task.reload()  # Refresh to get updated watchers list
-                except Exception as e:
-                    frappe.log(f"Failed to add watcher {user} to task {task.name}: {str(e)}")
+        new_watchers = [
+            user for user in dict.fromkeys(mentioned_users)
+            if user and user not in existing_watchers
+        ]
+        if not new_watchers:
+            return
+
+        # Add all mentioned users in a single Task update
+        for user in new_watchers:
+            task.append("watchers", {"user": user})
+        try:
+            task.save(ignore_permissions=True)
+        except Exception as e:
+            frappe.log(f"Failed to add watchers {', '.join(new_watchers)} to task {task.name}: {str(e)}")
                     
                     
 def patch_task_versions():